@@ -23,6 +23,13 @@ module.exports = {
     batchSize: 50,
     enableQuotesFor: ["高"], // 只对"高"生成金句
   },
+
+  // 评分前为热搜标题搜索背景 (scripts/enrich-hot.py)，ENRICH_TOPICS=0 关闭
+  enrichment: {
+    enabled: process.env.ENRICH_TOPICS !== "0",
+    engines: ["baidu", "bing"],
+    budgetSeconds: 40, // 每个平台；三个平台合计不超过 2 分钟
+  },
   
   // 记忆路径
   memory: {
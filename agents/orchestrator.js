@@ -12,6 +12,7 @@ const fs = require("fs");
 const path = require("path");
 const config = require("./config");
 const bitable = require("./utils/bitable");
+const scraper = require("./utils/scraper");
 const skill2 = require("./skills/skill2-generator");
 const skill3 = require("./skills/skill3-reviewer");
 const skill4 = require("./skills/skill4-rewriter");
@@ -158,6 +159,18 @@ class Orchestrator {
 
     logger.info(`[${name}] 最新批次 ${records.length} 条，未评分 ${unrated.length} 条`);
 
+    // Step 1.5: 搜索补充背景（失败或超时只影响背景，不影响评分）
+    if (config.enrichment.enabled) {
+      try {
+        const contexts = await scraper.enrichTitles(unrated.map(r => r.title), config.enrichment);
+        for (const r of unrated) r.context = contexts.get(r.title)?.summary || "";
+        const found = unrated.filter(r => r.context).length;
+        logger.info(`[${name}] 背景搜索 ${found}/${unrated.length} 条`);
+      } catch (err) {
+        logger.warn(`[${name}] 背景搜索失败，按标题评分`, { error: err.message });
+      }
+    }
+
     // Step 2: Skill2 两阶段生成（传入偏好上下文）
     let recommendations = await skill2.process(unrated, name, preferenceContext);
 
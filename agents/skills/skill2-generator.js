@@ -14,7 +14,7 @@ class Skill2Generator {
     logger.info(`[Skill2a] ${platformName} 快速筛选 ${topics.length} 条`);
 
     const topicList = topics.map((t, i) =>
-      `${i+1}. ${t.title} | 热度:${t.hot} 增长:${t.growth} 状态:${t.status}`
+      `${i+1}. ${t.title} | 热度:${t.hot} 增长:${t.growth} 状态:${t.status}` + (t.context ? `\n   背景: ${t.context}` : "")
     ).join("\n");
 
     const userMsg = preferenceContext
@@ -47,7 +47,7 @@ class Skill2Generator {
     logger.info(`[Skill2b] ${platformName} 深度生成 ${highMidTopics.length} 条金句（高/中适配）`);
 
     const topicList = highMidTopics.map((t, i) =>
-      `${i+1}. ${t.title} (适配度:${t.rating}) | 热度:${t.hot} 增长:${t.growth}`
+      `${i+1}. ${t.title} (适配度:${t.rating}) | 热度:${t.hot} 增长:${t.growth}` + (t.context ? `\n   背景: ${t.context}` : "")
     ).join("\n");
 
     const userMsg = `为${platformName}高/中适配选题生成理由和金句：\n\n${topicList}`;
@@ -0,0 +1,202 @@
+/**
+ * 抓取服务客户端 (scripts/scraping/server.py)
+ *
+ *   const scraper = require("./utils/scraper");
+ *   const { hits } = await scraper.call("serp", { engine: "baidu", query: "..." });
+ *   await scraper.call("douyin.download", { url, out }, { priority: 1, onProgress: p => logger.debug("dy", p) });
+ *
+ * 先启动常驻进程: cd scripts && python3 -m scraping.server --warm=baidu,xhs,douyin
+ * 一条连接复用所有调用；服务端断开后下一次 call 自动重连。
+ *
+ * 不想常驻时也可以直接跑脚本，按 JSON Lines 边抓边处理 (事件格式见 scripts/scraping/output.py):
+ *   await scraper.runScript("search-more.py", [], ev => { if (ev.type === "serp_hit") handle(ev); });
+ */
+const { spawn } = require("child_process");
+const net = require("net");
+const os = require("os");
+const path = require("path");
+const logger = require("./logger");
+
+const SOCKET_PATH = process.env.SCRAPE_SERVER
+  || path.join(os.homedir(), ".cache", "mrlee-scraping", "server.sock");
+const SCRIPTS_DIR = path.join(__dirname, "..", "..", "scripts");
+
+class ScrapeClient {
+  constructor(socketPath = SOCKET_PATH) {
+    this.socketPath = socketPath;
+    this.socket = null;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.buffer = "";
+  }
+
+  connect() {
+    if (this.socket) return this.socket;
+    const socket = net.createConnection(this.socketPath);
+    socket.setEncoding("utf-8");
+    socket.on("data", chunk => this.onData(chunk));
+    socket.on("error", err => this.failAll(err));
+    socket.on("close", () => this.failAll(new Error("抓取服务连接已关闭")));
+    this.socket = socket;
+    return socket;
+  }
+
+  onData(chunk) {
+    this.buffer += chunk;
+    let nl;
+    while ((nl = this.buffer.indexOf("\n")) >= 0) {
+      const line = this.buffer.slice(0, nl);
+      this.buffer = this.buffer.slice(nl + 1);
+      if (!line.trim()) continue;
+      const msg = parseLine(line);
+      if (!msg) continue;
+      // 进度通知: { method: "progress", params: { id, job, stage, ... } }
+      if (msg.method === "progress") {
+        const call = this.pending.get(msg.params.id);
+        if (call) {
+          call.job = msg.params.job;
+          call.onProgress(msg.params);
+        }
+        continue;
+      }
+      const call = this.pending.get(msg.id);
+      if (!call) continue;
+      this.pending.delete(msg.id);
+      if (msg.error) {
+        const err = new Error(msg.error.message);
+        err.code = msg.error.code;
+        call.reject(err);
+      } else {
+        call.resolve(msg.result);
+      }
+    }
+  }
+
+  failAll(err) {
+    this.socket = null;
+    this.buffer = "";
+    for (const call of this.pending.values()) call.reject(err);
+    this.pending.clear();
+  }
+
+  /**
+   * 调用一个任务或控制方法
+   * @param {string} method - serp / xhs.search / douyin.resolve / douyin.download / login / status / ping
+   * @param {object} params
+   * @param {{priority?: number, onProgress?: function, signal?: AbortSignal}} opts - priority 越小越先执行
+   */
+  call(method, params = {}, opts = {}) {
+    const id = this.nextId++;
+    const socket = this.connect();
+    const body = { ...params };
+    if (opts.priority !== undefined) body.priority = opts.priority;
+    return new Promise((resolve, reject) => {
+      this.pending.set(id, { resolve, reject, onProgress: opts.onProgress || (() => {}), job: null });
+      if (opts.signal) {
+        opts.signal.addEventListener("abort", () => this.cancel(id), { once: true });
+      }
+      socket.write(JSON.stringify({ jsonrpc: "2.0", id, method, params: body }) + "\n");
+    });
+  }
+
+  /** 取消本连接上的一次调用（按 call id），服务端以 code -32800 拒绝该 Promise */
+  cancel(id) {
+    if (!this.socket || !this.pending.has(id)) return;
+    this.socket.write(JSON.stringify({ jsonrpc: "2.0", method: "cancel", params: { id } }) + "\n");
+  }
+
+  close() {
+    if (this.socket) this.socket.end();
+    this.socket = null;
+  }
+}
+
+/**
+ * 解析一行 JSON；混进来的非 JSON 输出（库的警告、半截写入）记日志后跳过，不抛出
+ * @returns {object|null}
+ */
+function parseLine(line) {
+  try {
+    return JSON.parse(line);
+  } catch {
+    logger.warn(`[scraper] 跳过非 JSON 行: ${line.slice(0, 200)}`);
+    return null;
+  }
+}
+
+/**
+ * 以 --jsonl 运行 scripts/ 下的一个抓取脚本，每解析出一条结果就回调一次
+ * @param {string} script - 如 "search-xhs.py"
+ * @param {string[]} args
+ * @param {function} onEvent - 收到每个事件对象 ({ v, type, ts, script, ... })
+ * @param {{python?: string, onLog?: function, input?: string}} opts - onLog 接收脚本的人类可读输出 (stderr)；input 写入脚本 stdin
+ * @returns {Promise<object>} 最后的 done 事件；脚本非零退出时 reject
+ */
+function runScript(script, args = [], onEvent = () => {}, opts = {}) {
+  return new Promise((resolve, reject) => {
+    const child = spawn(opts.python || process.env.PYTHON || "python3", [script, ...args, "--jsonl"], {
+      cwd: SCRIPTS_DIR,
+      env: { ...process.env, PYTHONUNBUFFERED: "1" },
+    });
+    child.stdin.end(opts.input || "");
+    let buffer = "";
+    let tail = "";
+    let done = null;
+    child.stdout.setEncoding("utf-8");
+    child.stdout.on("data", chunk => {
+      buffer += chunk;
+      let nl;
+      while ((nl = buffer.indexOf("\n")) >= 0) {
+        const line = buffer.slice(0, nl);
+        buffer = buffer.slice(nl + 1);
+        if (!line.trim()) continue;
+        const ev = parseLine(line);
+        if (!ev) continue;
+        if (ev.type === "done") done = ev;
+        try {
+          onEvent(ev);
+        } catch (err) {
+          // 回调出错时结束脚本并 reject，而不是让异常逃出 stream 监听器
+          child.kill();
+          reject(err);
+          return;
+        }
+      }
+    });
+    child.stderr.setEncoding("utf-8");
+    child.stderr.on("data", chunk => {
+      tail = (tail + chunk).slice(-2000);
+      if (opts.onLog) opts.onLog(chunk);
+    });
+    child.on("error", reject);
+    child.on("close", code => {
+      if (code === 0) resolve(done);
+      else reject(new Error(`${script} 退出码 ${code}: ${tail.trim().slice(-500)}`));
+    });
+  });
+}
+
+/**
+ * 为一批热搜标题搜索背景 (scripts/enrich-hot.py)，给 Skill2 评分用
+ * @param {string[]} titles
+ * @param {{engines?: string[], budgetSeconds?: number, onContext?: function}} opts
+ * @returns {Promise<Map<string, object>>} 标题 -> { summary, sources, engines, complete, ... }
+ */
+async function enrichTitles(titles, opts = {}) {
+  const contexts = new Map();
+  if (!titles.length) return contexts;
+  const args = [];
+  if (opts.engines) args.push(`--engines=${opts.engines.join(",")}`);
+  if (opts.budgetSeconds) args.push(`--budget=${opts.budgetSeconds}`);
+  await runScript("enrich-hot.py", args, ev => {
+    if (ev.type !== "context") return;
+    contexts.set(ev.title, ev);
+    if (opts.onContext) opts.onContext(ev);
+  }, { input: JSON.stringify(titles) });
+  return contexts;
+}
+
+module.exports = new ScrapeClient();
+module.exports.ScrapeClient = ScrapeClient;
+module.exports.runScript = runScript;
+module.exports.enrichTitles = enrichTitles;
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Batch-download Douyin videos from a list of share URLs.
+
+Usage: dy-batch.py [urls.txt | -] [--out=DIR] [--workers=N] [--manifest=PATH] [--jsonl]
+
+Input is a file (or stdin) of share links, pasted share texts or bare aweme
+IDs. Short links are resolved to aweme IDs concurrently over HTTP, duplicates
+collapse to one download, videos already in the local store (store.py) are
+copied out without any network, and each video is resolved + downloaded by one of
+N workers sharing a single browser pool and HTTP client. A JSON manifest of
+successes, failures, duplicates and timings is written at the end (also on
+Ctrl-C, with whatever finished). With --jsonl each resolution, download and
+failure is also streamed to stdout as it happens (scraping/output.py).
+"""
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from scraping.batch import run_all
+from scraping.douyin import DouyinResolver, ResolveError, DOWNLOAD_HEADERS, share_urls, get_aweme_id
+from scraping.download import download, SEGMENTS
+from scraping.output import out
+from scraping.replay import http_transport
+from scraping.store import VideoStore, file_sha256
+
+sys.stdout.reconfigure(line_buffering=True)
+
+def opt(name, default):
+    for a in sys.argv[1:]:
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+    return default
+
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+SOURCE = ARGS[0] if ARGS else "-"
+OUT_DIR = opt("out", "/tmp/douyin_dl")
+WORKERS = int(opt("workers", "6"))
+MANIFEST = opt("manifest", os.path.join(OUT_DIR, "manifest.json"))
+ID_CONCURRENCY = 32
+
+def read_inputs():
+    text = sys.stdin.read() if SOURCE == "-" else open(SOURCE, encoding="utf-8").read()
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        urls = share_urls(line)
+        if urls:
+            items.extend(urls)
+        elif re.fullmatch(r"\d{15,20}", line):
+            items.append(f"https://www.douyin.com/video/{line}")
+        else:
+            out.error(f"no Douyin link in: {line[:80]}", stage="input")
+            print(f"⚠️ no Douyin link in: {line[:80]}")
+    return items
+
+async def run():
+    import httpx
+    inputs = read_inputs()
+    if not inputs:
+        print(__doc__)
+        return
+    os.makedirs(OUT_DIR, exist_ok=True)
+    started = time.time()
+    manifest = {"source": SOURCE, "out_dir": OUT_DIR, "workers": WORKERS, "inputs": len(inputs),
+                "ok": [], "failed": [], "duplicates": {}}
+
+    store = VideoStore()
+    limits = httpx.Limits(max_connections=WORKERS * SEGMENTS + ID_CONCURRENCY)
+    client = httpx.AsyncClient(headers=DOWNLOAD_HEADERS, timeout=httpx.Timeout(15.0, read=60.0), follow_redirects=True,
+                               limits=limits, transport=http_transport(limits=limits))
+    try:
+        # 1. share links -> aweme IDs, all at once over HTTP
+        t0 = time.monotonic()
+        ids = await run_all(inputs, lambda url: get_aweme_id(url, client), concurrency=ID_CONCURRENCY, timeout=30)
+        unique = {}
+        for r in ids:
+            if not r.ok:
+                manifest["failed"].append({"url": r.item, "stage": "aweme_id", "error": r.error})
+                out.error(r.error, stage="aweme_id", url=r.item)
+            elif r.value in unique:
+                manifest["duplicates"].setdefault(r.value, [unique[r.value]]).append(r.item)
+            else:
+                unique[r.value] = r.item
+        manifest["id_resolve_s"] = round(time.monotonic() - t0, 2)
+        print(f"📋 {len(inputs)} links -> {len(unique)} unique videos "
+              f"({len(inputs) - len(unique) - len(manifest['failed'])} duplicates) in {manifest['id_resolve_s']}s")
+
+        # 2. resolve + download, WORKERS at a time
+        async with DouyinResolver(client=client) as resolver:
+            done = [0]
+
+            async def fetch(aweme_id):
+                url = unique[aweme_id]
+                path = os.path.join(OUT_DIR, f"{aweme_id}.mp4")
+                entry = {"aweme_id": aweme_id, "url": url, "path": path}
+                hit = store.export(aweme_id, path)
+                if hit:
+                    entry.update(status="stored", bytes=hit.size, sha256=hit.sha256, desc=hit.desc, author=hit.author)
+                    manifest["ok"].append(entry)
+                    out.download(path, hit, aweme_id=aweme_id, url=url)
+                    out.progress("download", total=len(unique), aweme_id=aweme_id, ok=True)
+                    return
+                t = time.monotonic()
+                try:
+                    res = await resolver.resolve(f"https://www.douyin.com/video/{aweme_id}")
+                    entry.update(strategy=res.strategy, desc=res.desc, author=res.author,
+                                 resolve_s=round(time.monotonic() - t, 2))
+                    out.resolution(res)
+                    t = time.monotonic()
+                    result = await download(res.play_url, path, client=client, headers=res.headers, key=aweme_id)
+                except Exception as e:
+                    stage = "resolve" if "resolve_s" not in entry else "download"
+                    error = str(e) if isinstance(e, ResolveError) else f"{type(e).__name__}: {e}"
+                    manifest["failed"].append({**entry, "stage": stage, "error": error[:500]})
+                    out.error(error[:500], stage=stage, url=url, aweme_id=aweme_id)
+                    out.progress("download", total=len(unique), aweme_id=aweme_id, ok=False)
+                    print(f"❌ {aweme_id} ({stage}): {error[:160]}")
+                    return
+                entry.update(status="downloaded", bytes=result.bytes, download_s=round(time.monotonic() - t, 2),
+                             mb_per_s=round(result.mb_per_s, 2))
+                # Hash off the event loop; the index write itself is quick
+                entry["sha256"] = await asyncio.to_thread(file_sha256, path)
+                store.add(aweme_id, path, desc=res.desc, author=res.author, source_url=url, sha256=entry["sha256"])
+                manifest["ok"].append(entry)
+                out.download(path, result, aweme_id=aweme_id, url=url, sha256=entry["sha256"])
+                out.progress("download", total=len(unique), aweme_id=aweme_id, ok=True)
+                done[0] += 1
+                print(f"✅ [{done[0]}/{len(unique)}] {aweme_id} {res.strategy} {result.summary()}")
+
+            await run_all(list(unique), fetch, concurrency=WORKERS)
+    finally:
+        await client.aclose()
+        store.close()
+        manifest["elapsed_s"] = round(time.time() - started, 2)
+        manifest["started"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started))
+        with open(MANIFEST, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        total = sum(e.get("bytes", 0) for e in manifest["ok"])
+        print(f"\n📦 {len(manifest['ok'])} ok, {len(manifest['failed'])} failed, "
+              f"{total / 1024 / 1024:.1f} MB in {manifest['elapsed_s']}s -> {MANIFEST}")
+
+asyncio.run(run())
@@ -1,57 +1,39 @@
 #!/usr/bin/env python3
-"""Download Douyin video: get cookies via Playwright, then download."""
+"""Download Douyin video: cookies from the session vault, then yt-dlp."""
 import asyncio
 import sys
-import json
 import subprocess
-from playwright.async_api import async_playwright
+import time
+from scraping import replay
+from scraping.output import out
+from scraping.session import SessionVault
 
-URL = sys.argv[1] if len(sys.argv) > 1 else ""
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+URL = ARGS[0] if ARGS else ""
+OUT = "/tmp/douyin_video.mp4"
 COOKIE_FILE = "/tmp/dy-cookies.txt"
 
 async def run():
     if not URL:
         print("Usage: dy-download.py <douyin_url>")
         return
+    if replay.mode():
+        # yt-dlp runs as a subprocess with its own network stack, so nothing would be recorded or replayed
+        out.error("yt-dlp downloads cannot be recorded or replayed; use dy-download3.py", stage="download", url=URL)
+        print("❌ SCRAPE_RECORD/SCRAPE_REPLAY do not cover yt-dlp; use dy-download3.py instead")
+        return
+
+    # Cookies come from the vault; the browser only opens when they are missing or expired
+    session = await SessionVault().get("douyin")
+    session.write_netscape(COOKIE_FILE)
+    print(f"Using {len(session.cookies)} Douyin cookies (valid for {(session.expires_at - time.time()) / 60:.0f} min) -> {COOKIE_FILE}")
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="zh-CN"
-        )
-        page = await ctx.new_page()
-        
-        # Visit douyin to get fresh cookies
-        print("Getting fresh Douyin cookies...")
-        await page.goto("https://www.douyin.com", wait_until="domcontentloaded", timeout=20000)
-        await asyncio.sleep(3)
-        
-        cookies = await ctx.cookies()
-        
-        # Write Netscape format cookie file
-        with open(COOKIE_FILE, 'w') as f:
-            f.write("# Netscape HTTP Cookie File\n")
-            for c in cookies:
-                domain = c.get('domain', '')
-                flag = "TRUE" if domain.startswith('.') else "FALSE"
-                path = c.get('path', '/')
-                secure = "TRUE" if c.get('secure') else "FALSE"
-                expires = str(int(c.get('expires', 0)))
-                name = c.get('name', '')
-                value = c.get('value', '')
-                f.write(f"{domain}\t{flag}\t{path}\t{secure}\t{expires}\t{name}\t{value}\n")
-        
-        print(f"Saved {len(cookies)} cookies to {COOKIE_FILE}")
-        await browser.close()
-    
     # Now download with yt-dlp
     print(f"\nDownloading: {URL}")
     cmd = [
         "yt-dlp", URL,
         "--cookies", COOKIE_FILE,
-        "-o", "/tmp/douyin_video.mp4",
+        "-o", OUT,
         "--no-check-certificates",
         "--force-overwrites",
     ]
@@ -60,5 +42,9 @@ async def run():
     if result.stderr:
         print(result.stderr[-1000:])
     print(f"\nReturn code: {result.returncode}")
+    if result.returncode == 0:
+        out.download(OUT, url=URL)
+    else:
+        out.error(f"yt-dlp exited {result.returncode}: {result.stderr[-300:]}", stage="download", url=URL)
 
 asyncio.run(run())
@@ -2,39 +2,54 @@
 """Download Douyin video by extracting video src from page via Playwright."""
 import asyncio
 import sys
-import subprocess
-from playwright.async_api import async_playwright
+from scraping import BrowserPool
+from scraping.artifacts import get_artifacts
+from scraping.blocked import BlockedError
+from scraping.douyin import DOWNLOAD_HEADERS, _aweme_id
+from scraping.download import download, DownloadError
+from scraping.output import out
+from scraping.ready import goto_ready
+from scraping.store import VideoStore, lookup
 
-URL = sys.argv[1] if len(sys.argv) > 1 else ""
-OUT = sys.argv[2] if len(sys.argv) > 2 else "/tmp/douyin_video.mp4"
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+URL = ARGS[0] if ARGS else ""
+OUT = ARGS[1] if len(ARGS) > 1 else "/tmp/douyin_video.mp4"
 
 async def run():
     if not URL:
-        print("Usage: dy-download2.py <douyin_share_url> [output_path]")
+        print("Usage: dy-download2.py <douyin_share_url> [output_path] [--jsonl]")
         return
+    with VideoStore() as store:
+        await fetch(store)
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="zh-CN"
-        )
-        page = await ctx.new_page()
+async def fetch(store):
+    aweme_id, hit = await lookup(URL, OUT, store)
+    if hit:
+        out.download(OUT, hit, url=URL)
+        print(f"✅ Already in store, copied to {OUT}:\n{hit.summary()}")
+        return
+
+    downloaded = False
+    async with BrowserPool() as pool:
+        page = await pool.acquire("douyin")
 
-        # Intercept network requests to capture video URLs
+        # Watch outgoing requests for video URLs (media is blocked, so there is no response to sniff)
         video_urls = []
-        async def handle_response(response):
-            url = response.url
-            ct = response.headers.get('content-type', '')
-            if 'video' in ct or '.mp4' in url or 'play' in url:
+        def handle_request(request):
+            url = request.url
+            if request.resource_type == 'media' or '.mp4' in url or 'play' in url:
                 video_urls.append(url)
 
-        page.on("response", handle_response)
+        page.on("request", handle_request)
 
         print(f"Loading: {URL}")
-        await page.goto(URL, wait_until="domcontentloaded", timeout=30000)
-        await asyncio.sleep(5)
+        try:
+            await goto_ready(page, URL, "douyin", timeout=30000)
+        except BlockedError as e:
+            out.error(e, stage="load", url=URL)
+            await get_artifacts().capture(page, f"blocked-{e.block.kind}", site="douyin", error=e)
+            print(f"🚫 Blocked: {e.block}")
+            return
 
         # Also try to find video element src
         video_src = await page.evaluate("""() => {
@@ -66,7 +81,7 @@ async def run():
             return [];
         }""")
 
-        all_urls = list(set(video_src + xg_src + [u for u in video_urls if 'mp4' in u or 'video' in u]))
+        all_urls = list(set(video_src + xg_src + [u for u in video_urls if 'mp4' in u or 'video' in u or 'douyinvod' in u]))
 
         if all_urls:
             print(f"\nFound {len(all_urls)} video URL(s):")
@@ -76,23 +91,19 @@ async def run():
             # Download the first valid URL
             best = all_urls[0]
             print(f"\nDownloading to {OUT}...")
-            result = subprocess.run([
-                "curl", "-L", "-o", OUT, "-s", "--max-time", "30",
-                "-H", "Referer: https://www.douyin.com/",
-                "-H", "User-Agent: Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                best
-            ], capture_output=True, text=True, timeout=60)
-
-            if result.returncode == 0:
-                import os
-                size = os.path.getsize(OUT) if os.path.exists(OUT) else 0
-                print(f"✅ Downloaded! Size: {size/1024/1024:.1f} MB")
-            else:
-                print(f"❌ Download failed: {result.stderr}")
+            try:
+                result = await download(best, OUT, headers=DOWNLOAD_HEADERS, key=aweme_id or _aweme_id(page.url))
+                print(f"✅ Downloaded! {result.summary()}")
+                downloaded = True
+            except DownloadError as e:
+                out.error(e, stage="download", url=URL, aweme_id=aweme_id)
+                print(f"❌ Download failed: {e}")
         else:
-            print("No video URLs found. Page might need login or has anti-bot protection.")
-            # Take screenshot for debugging
-            await page.screenshot(path="/tmp/dy-debug.png")
+            out.error("no video URLs found", stage="extract", url=URL)
+            print("No video URLs found.")
+            saved = await get_artifacts().capture(page, "no-video-url", site="douyin")
+            if saved:
+                print(f"Debug capture: {saved}.*")
             text = await page.inner_text("body")
             print(f"\nPage text (first 500 chars):\n{text[:500]}")
 
@@ -104,6 +115,8 @@ async def run():
         if title:
             print(f"\nVideo title: {title[:200]}")
 
-        await browser.close()
+        if downloaded:
+            out.download(OUT, result, aweme_id=aweme_id or _aweme_id(page.url), url=URL, desc=title.strip()[:300])
+            store.add(aweme_id or _aweme_id(page.url), OUT, desc=title.strip()[:300], source_url=URL)
 
 asyncio.run(run())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Resolve a Douyin share URL to a play URL by racing all extraction strategies, optionally download it."""
+import asyncio
+import json
+import sys
+from scraping.douyin import DouyinResolver, ResolveError
+from scraping.download import download, DownloadError
+from scraping.output import out
+from scraping.store import VideoStore, lookup
+
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+URL = ARGS[0] if ARGS else ""
+OUT = ARGS[1] if len(ARGS) > 1 else ""
+
+async def run():
+    if not URL:
+        print("Usage: dy-resolve.py <douyin_share_url> [output_path] [--jsonl]")
+        return
+    with VideoStore() as store:
+        await fetch(store)
+
+async def fetch(store):
+    if OUT:
+        _, hit = await lookup(URL, OUT, store)
+        if hit:
+            out.download(OUT, hit, url=URL)
+            print(f"✅ Already in store, copied to {OUT}:\n{hit.summary()}")
+            return
+
+    async with DouyinResolver() as resolver:
+        print(f"Strategy order: {', '.join(resolver.ordered())}")
+        try:
+            res = await resolver.resolve(URL)
+        except ResolveError as e:
+            out.error(e, stage="resolve", url=URL)
+            print(f"❌ {e}")
+            return
+
+    out.resolution(res)
+    print(f"✅ {res.strategy} won in {res.elapsed:.1f}s")
+    print(json.dumps(res.to_dict(), ensure_ascii=False, indent=2))
+
+    if OUT:
+        print(f"\nDownloading to {OUT}...")
+        try:
+            result = await download(res.play_url, OUT, headers=res.headers, key=res.aweme_id)
+        except DownloadError as e:
+            out.error(e, stage="download", url=URL, aweme_id=res.aweme_id)
+            print(f"❌ Download failed: {e}")
+            return
+        out.download(OUT, result, aweme_id=res.aweme_id, url=URL)
+        print(f"✅ Downloaded: {result.summary()}")
+        store.add(res.aweme_id, OUT, desc=res.desc, author=res.author, source_url=URL)
+
+asyncio.run(run())
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Search context for a batch of hot-search titles, for Skill2 scoring (scraping/enrich.py).
+
+Usage: enrich-hot.py [titles.json | titles.txt | -] [--engines=baidu,bing] [--budget=100] [--top=5] [--refresh]
+           [--json | --jsonl]
+
+Input is a JSON array (of titles, or of objects with a "title") or one title
+per line. --jsonl streams one "context" event per title as it completes,
+--json prints {title: context} at the end.
+"""
+import asyncio
+import json
+import sys
+from scraping.enrich import enrich, ENGINES, BUDGET, TOP
+from scraping.fetch import SerpFetcher
+from scraping.output import out
+
+def opt(name, default):
+    for a in sys.argv[1:]:
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+    return default
+
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+SOURCE = ARGS[0] if ARGS else "-"
+ENGINE_LIST = opt("engines", ",".join(ENGINES)).split(",")
+BUDGET_S = float(opt("budget", str(BUDGET)))
+TOP_N = int(opt("top", str(TOP)))
+REFRESH = "--refresh" in sys.argv
+AS_JSON = "--json" in sys.argv
+
+def read_titles():
+    text = sys.stdin.read() if SOURCE == "-" else open(SOURCE, encoding="utf-8").read()
+    try:
+        items = json.loads(text)
+    except ValueError:
+        items = text.splitlines()
+    titles = [(t.get("title", "") if isinstance(t, dict) else str(t)).strip() for t in items]
+    return [t for t in titles if t]
+
+async def run():
+    titles = read_titles()
+    if not titles:
+        print(__doc__)
+        return
+    print(f"🔎 {len(titles)} 条标题 × {len(ENGINE_LIST)} 个引擎, 时限 {BUDGET_S:.0f}s")
+    async with SerpFetcher(refresh=REFRESH) as fetcher:
+        contexts = await enrich(titles, fetcher, ENGINE_LIST, BUDGET_S, TOP_N, on_context=out.context)
+
+    if AS_JSON:
+        print(json.dumps({t: c.to_dict() for t, c in contexts.items()}, ensure_ascii=False, indent=2))
+        return
+    for title in titles:
+        ctx = contexts[title]
+        mark = "" if ctx.complete else " ⏱"
+        print(f"\n{title}{mark}  [{', '.join(f'{e}:{n}' for e, n in ctx.engines.items())}]")
+        print(f"   {ctx.summary or '(无结果)'}")
+    incomplete = sum(not c.complete for c in contexts.values())
+    print(f"\n✅ {len(contexts)} 条, 未完成 {incomplete} 条, 最后一条 {max(c.elapsed for c in contexts.values()):.1f}s")
+
+asyncio.run(run())
@@ -0,0 +1,7 @@
+"""Shared helpers for the Playwright search / download scripts in scripts/.
+
+Dependencies are listed in scripts/requirements.txt (httpx and playwright, h2 optional).
+"""
+from .pool import BrowserPool, get_pool
+
+__all__ = ["BrowserPool", "get_pool"]
@@ -0,0 +1,159 @@
+"""Debug artifacts (JPEG screenshot + HTML snapshot) kept only when they are worth having.
+
+    arts = get_artifacts()
+    async with arts.on_failure(page, "xhs-search", site="xhs"):     # captured only if the block raises
+        result = await search(page, keyword)
+    if not result.notes:
+        await arts.capture(page, "empty", site="xhs", selector="#global")   # explicit failure, clipped
+    await arts.sample(page, "ok", site="xhs")                       # success path, SCRAPE_ARTIFACTS_SAMPLE of runs
+
+SCRAPE_ARTIFACTS picks what is kept:
+  - "failure" (default): failures only
+  - "all": successes too
+  - "off": nothing
+SCRAPE_ARTIFACTS_SAMPLE (0..1) keeps that share of success-path captures in
+failure mode.
+
+The browser only takes a JPEG of the viewport, or of one element, and reads
+the HTML. Files, metadata and retention are handled by a single writer
+thread, so the caller never waits on disk. Each run (or server job) gets
+its own directory under ARTIFACT_ROOT. Writing more than
+SCRAPE_ARTIFACTS_MB or keeping anything past SCRAPE_ARTIFACTS_DAYS drops the
+oldest files first.
+"""
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from . import metrics
+from .pool import PROFILE_ROOT
+
+ARTIFACT_ROOT = os.path.join(os.path.dirname(PROFILE_ROOT), "artifacts")
+MODE = os.environ.get("SCRAPE_ARTIFACTS", "failure")
+SAMPLE = float(os.environ.get("SCRAPE_ARTIFACTS_SAMPLE", "0"))
+MAX_BYTES = int(float(os.environ.get("SCRAPE_ARTIFACTS_MB", "200")) * 1024 * 1024)
+MAX_AGE = float(os.environ.get("SCRAPE_ARTIFACTS_DAYS", "3")) * 86400
+JPEG_QUALITY = 60
+MAX_HTML = 2 * 1024 * 1024
+
+
+def _slug(text):
+    return re.sub(r"[^\w.-]+", "-", str(text)).strip("-")[:60] or "capture"
+
+
+class Artifacts:
+    def __init__(self, root=ARTIFACT_ROOT, mode=MODE, sample_rate=SAMPLE, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        self.root = root
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        script = os.path.basename(sys.argv[0] or "python").rsplit(".", 1)[0]
+        self.run = f"{time.strftime('%Y%m%d-%H%M%S')}-{_slug(script)}-{os.getpid()}"
+        self._writer = None
+        self._seq = 0
+
+    def wanted(self, failed):
+        if self.mode == "off":
+            return False
+        if failed or self.mode == "all":
+            return True
+        return random.random() < self.sample_rate
+
+    async def capture(self, page, reason, site="", selector=None, error=None, job=None, failed=True):
+        """Screenshot + HTML of `page` into this run's (or `job`'s) directory. Returns the file stem or None."""
+        if page is None or not self.wanted(failed):
+            return None
+        with metrics.span("artifact", site=site, reason=reason):
+            try:
+                if selector:
+                    image = await page.locator(selector).first.screenshot(type="jpeg", quality=JPEG_QUALITY,
+                                                                          timeout=5000)
+                else:
+                    image = await page.screenshot(type="jpeg", quality=JPEG_QUALITY, timeout=5000)
+            except Exception:
+                # Element gone or page crashed: the HTML (if any) still helps
+                image = None
+            try:
+                html = await page.content()
+            except Exception:
+                html = ""
+        self._seq += 1
+        directory = os.path.join(self.root, f"{self.run}-{_slug(job)}" if job else self.run)
+        stem = os.path.join(directory, f"{self._seq:03d}-{_slug(site)}-{_slug(reason)}")
+        meta = {"reason": reason, "site": site, "url": page.url, "selector": selector or "", "ts": time.time(),
+                "failed": failed, "error": f"{type(error).__name__}: {error}" if isinstance(error, BaseException)
+                else str(error or "")}
+        self.writer().submit(self._write, stem, image, html[:MAX_HTML], meta)
+        metrics.count("artifacts", site=site, failed=str(failed).lower())
+        return stem
+
+    async def sample(self, page, reason, site="", selector=None, job=None):
+        """Success-path capture, kept in "all" mode or for a sampled share of runs."""
+        return await self.capture(page, reason, site, selector, job=job, failed=False)
+
+    @asynccontextmanager
+    async def on_failure(self, page, reason, site="", selector=None, job=None):
+        """Capture if the block raises (cancellation excepted), then re-raise."""
+        try:
+            yield
+        except Exception as e:
+            await self.capture(page, reason, site, selector, error=e, job=job)
+            raise
+
+    def writer(self):
+        # One thread: writes stay ordered and pruning never races itself; it is joined at exit
+        if self._writer is None:
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifacts")
+        return self._writer
+
+    def _write(self, stem, image, html, meta):
+        os.makedirs(os.path.dirname(stem), exist_ok=True)
+        if image:
+            with open(stem + ".jpg", "wb") as f:
+                f.write(image)
+        if html:
+            with open(stem + ".html", "w", encoding="utf-8") as f:
+                f.write(html)
+        with open(stem + ".json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        self.prune()
+
+    def prune(self):
+        """Drop run directories older than max_age, then the oldest files until under max_bytes."""
+        try:
+            runs = list(os.scandir(self.root))
+        except OSError:
+            return
+        now = time.time()
+        files = []
+        for run in runs:
+            if not run.is_dir():
+                continue
+            entries = list(os.scandir(run.path))
+            if not entries or all(now - e.stat().st_mtime > self.max_age for e in entries):
+                shutil.rmtree(run.path, ignore_errors=True)
+                continue
+            files.extend((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries if e.is_file())
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files):
+            if total <= self.max_bytes and now - mtime <= self.max_age:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+
+_artifacts = Artifacts()
+
+
+def get_artifacts():
+    return _artifacts
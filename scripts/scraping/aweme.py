@@ -0,0 +1,289 @@
+"""Parse Douyin video data into a typed record and pick a play variant.
+
+    aweme = parse_render_data(await page.evaluate(RENDER_DATA_RAW_JS))
+    variant = aweme.best("compat")          # or "max_bitrate", "max_resolution", "smallest"
+    print(variant.url, variant.p, variant.size)
+
+Handles both shapes we meet: the URL-encoded RENDER_DATA blob on video
+pages (camelCase: bitRateList, authorInfo, stats) and the JSON from
+/aweme/v1/web/aweme/detail/ (snake_case: bit_rate, author, statistics).
+Parsing happens in Python on the raw string, so the page only has to hand
+over one script's text.
+
+ResponseCapture keeps the bodies of matching XHR/fetch responses under a
+byte budget; everything else is never read.
+"""
+import json
+import re
+from collections import deque
+from dataclasses import dataclass, field, asdict
+from urllib.parse import unquote
+
+# One string across the bridge; decoding and searching happen in Python
+RENDER_DATA_RAW_JS = "() => { const el = document.querySelector('script#RENDER_DATA'); return el ? el.textContent : null; }"
+
+DETAIL_API = re.compile(r"/aweme/v1/web/aweme/(?:detail|post)/|/aweme/v1/web/(?:mix|related)/|/web/api/v2/aweme/iteminfo")
+
+POLICIES = ("compat", "max_bitrate", "max_resolution", "smallest")
+
+
+@dataclass
+class Variant:
+    url: str
+    urls: list = field(default_factory=list)
+    width: int = 0
+    height: int = 0
+    bitrate: int = 0
+    size: int = 0
+    codec: str = "h264"
+    gear: str = ""
+    format: str = "mp4"
+    fps: int = 0
+
+    @property
+    def p(self):
+        """Short side, so a 720x1280 portrait clip is 720p."""
+        sides = [x for x in (self.width, self.height) if x]
+        return min(sides) if sides else 0
+
+    def label(self):
+        size = f"{self.size / 1024 / 1024:.1f} MB" if self.size else "? MB"
+        return f"{self.p or '?'}p {self.codec} {self.bitrate // 1000} kbps {size} [{self.gear}]"
+
+
+@dataclass
+class Stats:
+    likes: int = 0
+    comments: int = 0
+    shares: int = 0
+    collects: int = 0
+    plays: int = 0
+
+
+@dataclass
+class Music:
+    id: str = ""
+    title: str = ""
+    author: str = ""
+    url: str = ""
+
+
+@dataclass
+class Aweme:
+    aweme_id: str
+    desc: str = ""
+    author: str = ""
+    author_uid: str = ""
+    sec_uid: str = ""
+    create_time: int = 0
+    duration: float = 0.0
+    cover: str = ""
+    variants: list = field(default_factory=list)
+    stats: Stats = field(default_factory=Stats)
+    music: Music = field(default_factory=Music)
+
+    def to_dict(self):
+        return asdict(self)
+
+    def best(self, policy="compat", max_p=None):
+        """Pick a variant. compat = H.264 first (plays everywhere), then bitrate. max_p caps e.g. at 720p."""
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy {policy!r}, expected one of {POLICIES}")
+        pool = [v for v in self.variants if v.url and (not max_p or not v.p or v.p <= max_p)]
+        pool = pool or [v for v in self.variants if v.url]
+        if not pool:
+            return None
+        if policy == "smallest":
+            return min(pool, key=lambda v: (v.size or float("inf"), v.bitrate))
+        if policy == "max_resolution":
+            return max(pool, key=lambda v: (v.p, v.bitrate))
+        if policy == "compat":
+            return max(pool, key=lambda v: (v.codec == "h264", v.bitrate, v.p))
+        return max(pool, key=lambda v: (v.bitrate, v.p))
+
+
+def _https(url):
+    return "https:" + url if url.startswith("//") else url
+
+
+def _urls(addr):
+    """play_addr in any of its shapes -> list of URLs."""
+    if not addr:
+        return []
+    if isinstance(addr, str):
+        return [_https(addr)]
+    if isinstance(addr, list):
+        return [_https(a["src"] if isinstance(a, dict) else a) for a in addr if a]
+    return [_https(u) for u in addr.get("url_list") or addr.get("urlList") or []]
+
+
+def _int(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _variants(video):
+    out = []
+    for br in video.get("bit_rate") or video.get("bitRateList") or []:
+        addr = br.get("play_addr") or br.get("playAddr") or {}
+        urls = _urls(addr)
+        if not urls:
+            continue
+        meta = addr if isinstance(addr, dict) else br
+        out.append(Variant(
+            url=urls[0], urls=urls,
+            width=_int(meta.get("width") or br.get("width")),
+            height=_int(meta.get("height") or br.get("height")),
+            bitrate=_int(br.get("bit_rate") or br.get("bitRate")),
+            size=_int(meta.get("data_size") or meta.get("dataSize") or br.get("dataSize")),
+            codec="h265" if (br.get("is_h265") or br.get("isH265")) else "h264",
+            gear=br.get("gear_name") or br.get("gearName") or "",
+            format=br.get("format") or "mp4",
+            fps=_int(br.get("FPS") or br.get("fps")),
+        ))
+    if not out:
+        # Older items carry just one play_addr
+        addr = video.get("play_addr") or video.get("playAddr") or video.get("playApi")
+        urls = _urls(addr)
+        if urls:
+            meta = addr if isinstance(addr, dict) else video
+            out.append(Variant(url=urls[0], urls=urls, width=_int(meta.get("width") or video.get("width")),
+                               height=_int(meta.get("height") or video.get("height")),
+                               size=_int(meta.get("data_size") or meta.get("dataSize")), gear="default"))
+    return out
+
+
+def parse_detail(item):
+    """One aweme object (API `aweme_detail` or RENDER_DATA videoDetail) -> Aweme."""
+    if "aweme_detail" in item:
+        item = item["aweme_detail"] or {}
+    video = item.get("video") or {}
+    author = item.get("author") or item.get("authorInfo") or {}
+    stats = item.get("statistics") or item.get("stats") or {}
+    music = item.get("music") or {}
+    duration = _int(item.get("duration") or video.get("duration"))
+    cover = video.get("cover") or video.get("origin_cover") or video.get("originCover") or ""
+    return Aweme(
+        aweme_id=str(item.get("aweme_id") or item.get("awemeId") or ""),
+        desc=item.get("desc") or "",
+        author=author.get("nickname") or "",
+        author_uid=str(author.get("uid") or ""),
+        sec_uid=author.get("sec_uid") or author.get("secUid") or "",
+        create_time=_int(item.get("create_time") or item.get("createTime")),
+        # ms in both shapes
+        duration=duration / 1000 if duration > 1000 else float(duration),
+        cover=(_urls(cover) or [""])[0] if isinstance(cover, (dict, list)) else _https(cover),
+        variants=_variants(video),
+        stats=Stats(
+            likes=_int(stats.get("digg_count") or stats.get("diggCount")),
+            comments=_int(stats.get("comment_count") or stats.get("commentCount")),
+            shares=_int(stats.get("share_count") or stats.get("shareCount")),
+            collects=_int(stats.get("collect_count") or stats.get("collectCount")),
+            plays=_int(stats.get("play_count") or stats.get("playCount")),
+        ),
+        music=Music(
+            id=str(music.get("id") or music.get("mid") or ""),
+            title=music.get("title") or music.get("musicName") or "",
+            author=music.get("author") or music.get("ownerNickname") or "",
+            url=(_urls(music.get("play_url") or music.get("playUrl")) or [""])[0],
+        ),
+    )
+
+
+# Keys under which a page keeps its own video, as opposed to related/recommended lists
+MAIN_KEYS = ("videoDetail", "aweme_detail", "awemeDetail")
+
+
+def _is_aweme(node):
+    return isinstance(node, dict) and ("awemeId" in node or "aweme_id" in node) and isinstance(node.get("video"), dict)
+
+
+def _find_item(data, aweme_id=""):
+    """The page's own aweme: the one with `aweme_id`, else one under a MAIN_KEYS key, else the first breadth-first."""
+    queue = deque([("", data)])
+    main = first = None
+    while queue:
+        key, node = queue.popleft()
+        if _is_aweme(node):
+            if aweme_id and str(node.get("aweme_id") or node.get("awemeId")) == str(aweme_id):
+                return node
+            if key in MAIN_KEYS and main is None:
+                main = node
+            first = first or node
+        if isinstance(node, dict):
+            queue.extend(node.items())
+        elif isinstance(node, list):
+            queue.extend(("", n) for n in node)
+    return main or first
+
+
+def parse_render_data(raw, aweme_id=""):
+    """RENDER_DATA script text (URL-encoded JSON) -> Aweme, or None. Pass the URL's aweme_id when known."""
+    if not raw:
+        return None
+    try:
+        data = json.loads(unquote(raw) if raw.lstrip().startswith("%") else raw)
+    except ValueError:
+        return None
+    item = _find_item(data, aweme_id)
+    return parse_detail(item) if item else None
+
+
+def parse_api(body):
+    """Detail/post API JSON (str, bytes or dict) -> list of Aweme."""
+    data = json.loads(body) if isinstance(body, (str, bytes)) else body
+    if data.get("aweme_detail"):
+        return [parse_detail(data["aweme_detail"])]
+    return [parse_detail(item) for item in data.get("aweme_list") or [] if isinstance(item, dict)]
+
+
+class ResponseCapture:
+    """Keep bodies of XHR/fetch responses whose URL matches, within a byte budget.
+
+        capture = ResponseCapture(DETAIL_API).attach(page)
+        await page.goto(...)
+        for url, body in capture.bodies: ...
+    """
+
+    def __init__(self, pattern=DETAIL_API, max_bytes=8 * 1024 * 1024, max_each=2 * 1024 * 1024,
+                 types=("xhr", "fetch")):
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.max_bytes = max_bytes
+        self.max_each = max_each
+        self.types = types
+        self.used = 0
+        self.skipped = 0
+        self.bodies = []
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+        return self
+
+    async def _on_response(self, resp):
+        # Cheap checks first: URL match and declared length, before any body transfer
+        if not self.pattern.search(resp.url) or resp.request.resource_type not in self.types:
+            return
+        declared = _int(resp.headers.get("content-length"))
+        if declared > self.max_each or self.used + declared > self.max_bytes:
+            self.skipped += 1
+            return
+        try:
+            body = await resp.body()
+        except Exception:
+            return
+        if len(body) > self.max_each or self.used + len(body) > self.max_bytes:
+            self.skipped += 1
+            return
+        self.used += len(body)
+        self.bodies.append((resp.url, body))
+
+    def awemes(self):
+        out = []
+        for _url, body in self.bodies:
+            try:
+                out.extend(parse_api(body))
+            except (ValueError, AttributeError):
+                pass
+        return out
@@ -0,0 +1,73 @@
+"""Run a list of queries across several tabs at once.
+
+    results = await run_batch(pool, "baidu", SEARCHES, fetch_one, concurrency=4)
+    for r in results:          # same order as SEARCHES
+        print(r.value if r.ok else r.error)
+
+Each item runs on its own leased page, so one failing query never affects
+the others, and a batch takes roughly as long as its slowest query. run_all()
+is the same thing for workers that do not need a page (HTTP fetches etc.).
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+DEFAULT_CONCURRENCY = int(os.environ.get("SCRAPE_CONCURRENCY", "4"))
+
+
+@dataclass
+class BatchResult:
+    index: int
+    item: Any
+    value: Any = None
+    error: str = ""
+    elapsed: float = 0.0
+    exception: Any = None
+
+    @property
+    def ok(self):
+        return not self.error
+
+
+async def run_all(items, worker, concurrency=DEFAULT_CONCURRENCY, timeout=None, on_result=None):
+    """Call `await worker(item)` for every item, at most `concurrency` at a time.
+
+    Returns BatchResult objects in input order. `timeout` (seconds) caps each item.
+    `on_result(result)` is called as each item finishes, in completion order.
+    """
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(index, item):
+        async with sem:
+            start = time.monotonic()
+            result = BatchResult(index, item)
+            try:
+                coro = worker(item)
+                result.value = await (asyncio.wait_for(coro, timeout) if timeout else coro)
+            except asyncio.TimeoutError:
+                result.error = f"timeout after {timeout}s"
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+                result.exception = e
+            result.elapsed = time.monotonic() - start
+            if on_result is not None:
+                on_result(result)
+            return result
+
+    return list(await asyncio.gather(*(one(i, item) for i, item in enumerate(items))))
+
+
+async def run_batch(pool, site, items, worker, concurrency=DEFAULT_CONCURRENCY, timeout=None, on_result=None):
+    """Like run_all, but each call gets its own leased page: `await worker(page, item)`.
+
+    `site` is a pool site name, or a callable mapping an item to one.
+    """
+    site_of = site if callable(site) else (lambda _item: site)
+
+    async def with_page(item):
+        async with pool.page(site_of(item)) as page:
+            return await worker(page, item)
+
+    return await run_all(items, with_page, concurrency, timeout, on_result)
@@ -0,0 +1,493 @@
+"""Benchmarks for the search and download pipelines against local fixture servers.
+
+    python -m scraping.bench                           # all workloads, results JSON under BENCH_DIR
+    python -m scraping.bench --only=serp_single,douyin --repeat=30 --latency-ms=50
+    python -m scraping.bench --compare=old.json        # exit 1 if a stage's p50 regressed > 20%
+
+Workloads:
+  serp_single   one SERP over HTTP: fetch + offline parse
+  serp_batch    20 queries through run_all on one pooled client
+  serp_browser  Chromium launch + context, then goto_ready + extract per query
+  xhs_search    XHS-style search page: 100 notes from the paginated notes API via scrolling
+  douyin        resolve (RENDER_DATA parse, browser if available else HTTP) + segmented download
+
+The fixture server answers on 127.0.0.1 with an artificial per-request
+latency, so numbers reflect our own overhead rather than the sites'. Each
+stage reports p50/p95 and its peak RSS, each workload pages/s, MB/s and its
+starting and peak RSS. RSS is the current resident size of this process
+plus its children (Chromium included), sampled from /proc at each stage's
+start and end and every 50 ms in between, so one stage's peak is not
+carried into later ones. Browser workloads are skipped when Playwright is
+not installed.
+"""
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, quote
+
+from .pool import PROFILE_ROOT
+
+BENCH_DIR = os.path.join(os.path.dirname(PROFILE_ROOT), "bench")
+REGRESSION = 0.20
+VIDEO_BYTES = 24 * 1024 * 1024
+WORKLOADS = ("serp_single", "serp_batch", "serp_browser", "xhs_search", "douyin")
+
+
+def _baidu_page(query, results=10):
+    items = []
+    for i in range(results):
+        items.append(
+            f'<div class="result c-container" id="{i + 1}"><h3><a href="/link?url=r{i}">{query} 结果 {i + 1}</a></h3>'
+            f'<div class="c-abstract">关于{query}的第 {i + 1} 条摘要，' + "内容" * 40 + "</div>"
+            f'<span class="c-showurl">example{i}.com</span><span class="c-color-gray2">2024年5月{i + 1}日</span></div>'
+        )
+    # Real SERPs carry ~100 KB of inline script/style around the results
+    filler = "<script>var x='" + "a" * 60000 + "';</script><style>" + ".c{color:red}" * 3000 + "</style>"
+    return f'<html><head><title>{query}_百度搜索</title>{filler}</head><body><div id="content_left">{"".join(items)}</div></body></html>'
+
+
+XHS_PAGE_SIZE = 20
+XHS_PAGES = 6
+
+
+def _xhs_page(query):
+    # Like the real page: an empty feed filled from the notes API on load and on scroll
+    script = """
+let page = 1, busy = false, more = true;
+async function load() {
+    if (busy || !more) return;
+    busy = true;
+    const r = await fetch('/api/sns/web/v1/search/notes', {method: 'POST', headers: {'content-type': 'application/json'},
+                                                           body: JSON.stringify({keyword: KEYWORD, page})});
+    const d = (await r.json()).data;
+    more = d.has_more; page += 1;
+    const feed = document.querySelector('.feeds-container');
+    for (const it of d.items) {
+        const s = document.createElement('section');
+        s.className = 'note-item';
+        s.innerHTML = `<a href="/explore/${it.id}"><span class="title">${it.note_card.display_title}</span></a>` +
+            `<div class="author-wrapper"><span class="name">${it.note_card.user.nickname}</span></div>`;
+        feed.appendChild(s);
+    }
+    busy = false;
+}
+addEventListener('scroll', () => { if (innerHeight + scrollY >= document.body.scrollHeight - 400) load(); });
+load();
+"""
+    return (f"<html><head><style>section{{height:320px}}</style></head><body><div class='feeds-container'></div>"
+            f"<script>const KEYWORD = {json.dumps(query)};{script}</script></body></html>")
+
+
+def _xhs_api(query, page):
+    start = (page - 1) * XHS_PAGE_SIZE
+    items = [
+        {"id": f"{start + i:024x}", "model_type": "note", "xsec_token": f"tok{start + i}",
+         "note_card": {"display_title": f"{query} 笔记 {start + i}", "type": "normal",
+                       "user": {"nickname": f"作者{start + i}", "user_id": f"{i:024x}"},
+                       "interact_info": {"liked_count": f"{i}.{page}万"}, "cover": {"url_default": "//ci/cover.jpg"}}}
+        for i in range(XHS_PAGE_SIZE)
+    ]
+    return {"code": 0, "success": True, "data": {"has_more": page < XHS_PAGES, "items": items}}
+
+
+def _douyin_page(base, aweme_id):
+    variants = [
+        {"gearName": f"normal_{p}_0", "bitRate": br, "isH265": h265, "width": p, "height": p * 16 // 9,
+         "dataSize": VIDEO_BYTES, "playAddr": [{"src": f"{base}/media/{aweme_id}.mp4"}]}
+        for p, br, h265 in ((1080, 2500000, 1), (720, 1400000, 0), (540, 800000, 0))
+    ]
+    data = {"app": {"videoDetail": {
+        "awemeId": aweme_id, "desc": "基准测试视频", "authorInfo": {"nickname": "bench", "uid": "1"},
+        "video": {"duration": 15000, "bitRateList": variants}, "stats": {"diggCount": 1}, "music": {"title": "原声"},
+    }}}
+    rd = quote(json.dumps(data, ensure_ascii=False))
+    return f'<html><body><script id="RENDER_DATA" type="application/json">{rd}</script><video></video></body></html>'
+
+
+class FixtureServer:
+    """Threaded local server for SERP / XHS / Douyin fixtures and a Range-capable video."""
+
+    def __init__(self, latency_ms=20):
+        self.latency = latency_ms / 1000
+        rnd = random.Random(7)
+        self.video = rnd.randbytes(VIDEO_BYTES)
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, ctype="text/html; charset=utf-8", extra=None):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (extra or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_GET(self):
+                time.sleep(server.latency)
+                url = urlparse(self.path)
+                q = parse_qs(url.query)
+                if url.path == "/s":
+                    return self._send(200, _baidu_page(q.get("wd", [""])[0]).encode())
+                if url.path == "/search_result":
+                    return self._send(200, _xhs_page(q.get("keyword", [""])[0]).encode())
+                if url.path.startswith("/video/"):
+                    return self._send(200, _douyin_page(server.base, url.path.rsplit("/", 1)[1]).encode())
+                if url.path.startswith("/media/"):
+                    return self._media()
+                self._send(404, b"not found")
+
+            def do_POST(self):
+                time.sleep(server.latency)
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                if urlparse(self.path).path == "/api/sns/web/v1/search/notes":
+                    data = _xhs_api(body.get("keyword", ""), int(body.get("page", 1)))
+                    return self._send(200, json.dumps(data, ensure_ascii=False).encode(), "application/json")
+                self._send(404, b"not found")
+
+            def _media(self):
+                data = server.video
+                rng = self.headers.get("Range", "")
+                if rng.startswith("bytes="):
+                    start, _, end = rng[6:].partition("-")
+                    start, end = int(start), min(int(end) if end else len(data) - 1, len(data) - 1)
+                    return self._send(206, data[start:end + 1], "video/mp4",
+                                      {"Content-Range": f"bytes {start}-{end}/{len(data)}", "Accept-Ranges": "bytes"})
+                self._send(200, data, "video/mp4", {"Accept-Ranges": "bytes"})
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _rss_tree_kb(root):
+    """Resident KB of root and all its descendants (Linux /proc; 0 elsewhere)."""
+    children = defaultdict(list)
+    rss = {}
+    try:
+        pids = [p for p in os.listdir("/proc") if p.isdigit()]
+    except OSError:
+        return 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            children[int(fields[1])].append(int(pid))
+            rss[int(pid)] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE") // 1024
+        except (OSError, IndexError, ValueError):
+            continue
+    total, stack = 0, [root]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, ()))
+    return total
+
+
+class RssSampler:
+    """Peak RSS of the process tree overall and inside open windows (one per running stage)."""
+
+    def __init__(self, every=0.05):
+        self.every = every
+        self.start_kb = self.peak_kb = 0
+        self._windows = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_kb = self.peak_kb = _rss_tree_kb(os.getpid())
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        kb = _rss_tree_kb(os.getpid())
+        with self._lock:
+            self.peak_kb = max(self.peak_kb, kb)
+            for window in self._windows:
+                window[0] = max(window[0], kb)
+        return kb
+
+    def _run(self):
+        while not self._stop.wait(self.every):
+            self._sample()
+
+    def open(self):
+        window = [0]
+        with self._lock:
+            self._windows.append(window)
+        self._sample()
+        return window
+
+    def close(self, window):
+        """Peak KB seen while `window` was open."""
+        self._sample()
+        with self._lock:
+            self._windows.remove(window)
+        return window[0]
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    pos = (len(values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+class Run:
+    """Stage timings and volume counters for one workload."""
+
+    def __init__(self, rss=None):
+        self.rss = rss
+        self.samples = defaultdict(list)
+        self.peaks = defaultdict(int)
+        self.pages = 0
+        self.bytes = 0
+
+    @contextmanager
+    def stage(self, name):
+        # RSS is read outside the timed span
+        window = self.rss.open() if self.rss is not None else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+            if window is not None:
+                self.peaks[name] = max(self.peaks[name], self.rss.close(window))
+
+    def report(self, wall, peak_kb, start_kb=0):
+        stages = {
+            name: {"n": len(v), "p50_ms": round(percentile(v, 0.5) * 1000, 2),
+                   "p95_ms": round(percentile(v, 0.95) * 1000, 2), "mean_ms": round(sum(v) / len(v) * 1000, 2),
+                   "peak_rss_mb": round(self.peaks[name] / 1024, 1)}
+            for name, v in self.samples.items()
+        }
+        return {
+            "stages": stages, "wall_s": round(wall, 3), "pages": self.pages,
+            "pages_per_s": round(self.pages / wall, 2) if wall else 0.0,
+            "mb": round(self.bytes / 1024 / 1024, 2),
+            "mb_per_s": round(self.bytes / 1024 / 1024 / wall, 2) if wall and self.bytes else 0.0,
+            "start_rss_mb": round(start_kb / 1024, 1), "peak_rss_mb": round(peak_kb / 1024, 1),
+        }
+
+
+def _has_playwright():
+    try:
+        import playwright  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+async def serp_single(run, base, repeat):
+    from .fetch import SerpFetcher
+    from .serp import parse_html
+    async with SerpFetcher(cache=False) as fetcher:
+        client = fetcher.client()
+        for i in range(repeat):
+            with run.stage("fetch"):
+                resp = await client.get(f"{base}/s?wd=single{i}")
+            with run.stage("parse"):
+                hits = parse_html(resp.text, "baidu", base_url=str(resp.url))
+            assert len(hits) == 10, len(hits)
+            run.pages += 1
+            run.bytes += len(resp.content)
+
+
+async def serp_batch(run, base, repeat):
+    from .batch import run_all
+    from .fetch import SerpFetcher
+    async with SerpFetcher(cache=False) as fetcher:
+        for r in range(max(1, repeat // 5)):
+            urls = [f"{base}/s?wd=batch{r}-{i}" for i in range(20)]
+            with run.stage("batch20"):
+                results = await run_all(urls, lambda u: fetcher.fetch_http(u, "baidu"))
+            assert all(res.ok and not res.value[1] for res in results), [res.error or res.value[1] for res in results]
+            run.pages += len(urls)
+
+
+async def serp_browser(run, base, repeat):
+    from .pool import BrowserPool
+    from .ready import goto_ready
+    from .serp import extract
+    with run.stage("launch"):
+        pool = BrowserPool(persistent=False, vault=None)
+        await pool.start()
+    try:
+        with run.stage("context"):
+            await pool.warm("baidu")
+        for i in range(repeat):
+            async with pool.page("baidu") as page:
+                with run.stage("goto"):
+                    await goto_ready(page, f"{base}/s?wd=browser{i}", "baidu")
+                with run.stage("extract"):
+                    hits = await extract(page, "baidu")
+            assert len(hits) == 10, len(hits)
+            run.pages += 1
+    finally:
+        await pool.close()
+
+
+async def xhs_search(run, base, repeat):
+    from .pool import BrowserPool
+    from .xhs import search
+    pool = BrowserPool(persistent=False, vault=None)
+    try:
+        with run.stage("context"):
+            await pool.warm("xhs")
+        for i in range(repeat):
+            async with pool.page("xhs") as page:
+                with run.stage("search"):
+                    result = await search(page, f"xhs{i}", notes=100, base=base)
+            assert len(result.notes) == 100 and result.source == "api", (len(result.notes), result.source)
+            run.pages += result.api_pages
+    finally:
+        await pool.close()
+
+
+async def douyin(run, base, repeat):
+    import httpx
+    from .aweme import RENDER_DATA_RAW_JS, parse_render_data
+    from .download import download
+    tmp = os.path.join(BENCH_DIR, "tmp")
+    os.makedirs(tmp, exist_ok=True)
+    pool = None
+    if _has_playwright():
+        from .pool import BrowserPool
+        from .ready import goto_ready
+        pool = BrowserPool(persistent=False, vault=None)
+    limits = httpx.Limits(max_connections=16)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        try:
+            for i in range(max(1, repeat // 4)):
+                url = f"{base}/video/7{i:018d}"
+                with run.stage("resolve"):
+                    if pool is not None:
+                        async with pool.page("douyin") as page:
+                            await goto_ready(page, url, "douyin")
+                            raw = await page.evaluate(RENDER_DATA_RAW_JS)
+                    else:
+                        html = (await client.get(url)).text
+                        raw = html.split('type="application/json">', 1)[1].split("</script>", 1)[0]
+                    variant = parse_render_data(raw).best("compat")
+                path = os.path.join(tmp, "bench.mp4")
+                with run.stage("download"):
+                    result = await download(variant.url, path, client=client)
+                assert result.bytes == VIDEO_BYTES
+                os.remove(path)
+                run.pages += 1
+                run.bytes += result.bytes
+        finally:
+            if pool is not None:
+                await pool.close()
+
+
+BROWSER = {"serp_browser", "xhs_search"}
+
+
+async def run_benchmarks(only=WORKLOADS, repeat=20, latency_ms=20):
+    results = {}
+    with FixtureServer(latency_ms) as server:
+        for name in only:
+            if name in BROWSER and not _has_playwright():
+                results[name] = {"skipped": "playwright not installed"}
+                print(f"{name:13s} skipped (playwright not installed)")
+                continue
+            with RssSampler() as rss:
+                run = Run(rss)
+                start = time.perf_counter()
+                await globals()[name](run, server.base, repeat)
+                wall = time.perf_counter() - start
+            results[name] = run.report(wall, rss.peak_kb, rss.start_kb)
+            print_workload(name, results[name])
+    return results
+
+
+def print_workload(name, res):
+    extra = f"  {res['mb_per_s']} MB/s" if res["mb_per_s"] else ""
+    print(f"{name:13s} {res['pages']} pages in {res['wall_s']}s ({res['pages_per_s']}/s){extra}  "
+          f"RSS {res['start_rss_mb']} -> peak {res['peak_rss_mb']} MB")
+    for stage, s in res["stages"].items():
+        print(f"    {stage:10s} p50 {s['p50_ms']:9.2f} ms   p95 {s['p95_ms']:9.2f} ms   n={s['n']:<4d} "
+              f"peak RSS {s['peak_rss_mb']} MB")
+
+
+def compare(old, new, threshold=REGRESSION):
+    """Stages whose p50 got slower than threshold -> list of (workload, stage, old_ms, new_ms)."""
+    regressions = []
+    for name, res in new["results"].items():
+        before = old.get("results", {}).get(name, {}).get("stages", {})
+        for stage, s in res.get("stages", {}).items():
+            if stage in before and before[stage]["p50_ms"] > 0:
+                change = s["p50_ms"] / before[stage]["p50_ms"] - 1
+                print(f"{name:13s} {stage:10s} {before[stage]['p50_ms']:9.2f} -> {s['p50_ms']:9.2f} ms  {change:+.0%}")
+                if change > threshold:
+                    regressions.append((name, stage, before[stage]["p50_ms"], s["p50_ms"]))
+    return regressions
+
+
+def main(argv):
+    opts = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    only = opts["only"].split(",") if "only" in opts else list(WORKLOADS)
+    unknown = [w for w in only if w not in WORKLOADS]
+    if unknown:
+        print(f"unknown workload(s): {', '.join(unknown)}; choose from {', '.join(WORKLOADS)}")
+        return 2
+    repeat = int(opts.get("repeat", "20"))
+    latency = float(opts.get("latency-ms", "20"))
+    results = asyncio.run(run_benchmarks(only, repeat, latency))
+    report = {
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+        "platform": platform.platform(), "cpus": os.cpu_count(), "repeat": repeat, "latency_ms": latency,
+        "results": results,
+    }
+    out = opts.get("out") or os.path.join(BENCH_DIR, time.strftime("bench-%Y%m%d-%H%M%S.json"))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults -> {out}")
+    if "compare" in opts:
+        with open(opts["compare"]) as f:
+            old = json.load(f)
+        print(f"\n=== vs {opts['compare']} ===")
+        regressions = compare(old, report)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) regressed more than {REGRESSION:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
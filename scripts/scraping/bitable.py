@@ -0,0 +1,375 @@
+"""Bulk writes into Feishu Bitable: batched, retried, upserted on a natural key.
+
+    async with BitableClient() as bt:
+        writer = bt.writer(table_id, key="链接")          # flushes at 500 rows or after 5 s
+        for hit in hits:
+            await writer.add({"标题": hit.title, "链接": {"link": hit.url, "text": hit.title}})
+        print(await writer.close())        # {'created': 412, 'updated': 88, 'merged': 3, ...}
+
+One client holds one pooled HTTP connection set and one tenant_access_token.
+The token is cached on disk until shortly before it expires, so back-to-back
+script runs don't each log in again. Rows go out through batch_create /
+batch_update, MAX_BATCH per request. Writes to one table are serialised,
+because Bitable reports concurrent writes to a table as conflicts.
+
+Upsert: the table's existing key values are read once with records/search,
+giving key -> record_id. A row whose key is already there becomes an update,
+anything else a create. Rows repeating a key within one run are merged into
+one. Each create batch sends a client_token that stays the same across
+retries, so a retry after a lost response cannot insert twice.
+
+Transient failures are retried with jittered exponential backoff: network
+errors, HTTP 429/5xx, and Bitable's rate-limit, conflict and not-ready
+codes. An expired token is refreshed once. Anything else raises FeishuError.
+
+Credentials come from FEISHU_APP_ID / FEISHU_APP_SECRET / BITABLE_APP_TOKEN,
+read from the environment or the repo's .env (as the Node side does).
+FEISHU_BASE_URL points the client at a mock server.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+
+from . import metrics
+from .pool import PROFILE_ROOT
+from .throttle import throttle
+
+BASE_URL = "https://open.feishu.cn"
+ENV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", ".env")
+TOKEN_PATH = os.path.join(os.path.dirname(PROFILE_ROOT), "feishu-token.json")
+# Refresh this long before the server-side expiry
+TOKEN_MARGIN = 300
+
+# Records per batch_create / batch_update / search page
+MAX_BATCH = 500
+RETRIES = 5
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# A writer sends a partial batch once its oldest buffered row has waited this long
+MAX_BUFFER_AGE = 5.0
+
+# Worth retrying: too many requests, write conflict, data not ready, internal timeout
+RETRY_CODES = {1254290, 1254291, 1254607, 1255040}
+RATE_CODES = {1254290}
+# Missing / invalid / expired tenant token
+TOKEN_CODES = {99991661, 99991663, 99991668}
+
+
+class FeishuError(Exception):
+    def __init__(self, code, msg, path=""):
+        self.code = code
+        self.msg = msg
+        super().__init__(f"{path}: code {code} {msg}".strip(": "))
+
+
+def load_env(path=ENV_PATH):
+    """KEY=VALUE lines from .env into os.environ, without overriding what is already set."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#") or "=" not in line:
+            continue
+        name, value = line.split("=", 1)
+        os.environ.setdefault(name.strip(), value.strip().strip("'\""))
+
+
+def key_text(value):
+    """Bitable cell -> comparable key string (text segments, link cells, numbers)."""
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return str(value.get("link") or value.get("text") or "")
+    if isinstance(value, list):
+        # Text cells come back as [{"type": "text", "text": ...}, ...]
+        return "".join(key_text(v) for v in value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+
+def chunks(items, size=MAX_BATCH):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class BitableClient:
+    def __init__(self, app_token=None, app_id=None, app_secret=None, base_url=None, client=None,
+                 token_path=TOKEN_PATH, timeout=30.0, max_connections=8):
+        load_env()
+        self.app_token = app_token or os.environ.get("BITABLE_APP_TOKEN", "")
+        self.app_id = app_id or os.environ.get("FEISHU_APP_ID", "")
+        self.app_secret = app_secret or os.environ.get("FEISHU_APP_SECRET", "")
+        self.base_url = (base_url or os.environ.get("FEISHU_BASE_URL") or BASE_URL).rstrip("/")
+        self.token_path = token_path
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = client
+        self._own_client = client is None
+        self._token = None
+        self._token_lock = asyncio.Lock()
+        self._table_locks = defaultdict(asyncio.Lock)
+        self._indexes = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def client(self):
+        if self._client is None:
+            import httpx
+            limits = httpx.Limits(max_connections=self.max_connections,
+                                  max_keepalive_connections=self.max_connections)
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits)
+        return self._client
+
+    async def close(self):
+        if self._client is not None and self._own_client:
+            await self._client.aclose()
+        self._client = None
+
+    def _load_token(self):
+        try:
+            with open(self.token_path) as f:
+                entry = json.load(f).get(self.app_id) or {}
+        except (OSError, ValueError):
+            return None
+        if entry.get("base_url", BASE_URL) == self.base_url and entry.get("expires_at", 0) > time.time():
+            return entry
+        return None
+
+    def _save_token(self, entry):
+        try:
+            with open(self.token_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+        cached[self.app_id] = entry
+        os.makedirs(os.path.dirname(self.token_path), exist_ok=True)
+        tmp = self.token_path + ".tmp"
+        # The token is a credential: owner-only, written whole
+        with open(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+            json.dump(cached, f)
+        os.replace(tmp, self.token_path)
+
+    async def token(self, refresh=False):
+        """tenant_access_token from memory, the disk cache, or a fresh login."""
+        async with self._token_lock:
+            if not refresh and self._token and self._token["expires_at"] > time.time():
+                return self._token["token"]
+            entry = None if refresh else self._load_token()
+            if entry is None:
+                if not self.app_id or not self.app_secret:
+                    raise FeishuError(-1, "FEISHU_APP_ID / FEISHU_APP_SECRET not set")
+                path = "/open-apis/auth/v3/tenant_access_token/internal"
+                data = await self._send("POST", path, {"app_id": self.app_id, "app_secret": self.app_secret})
+                entry = {"token": data["tenant_access_token"], "base_url": self.base_url,
+                         "expires_at": time.time() + int(data.get("expire", 7200)) - TOKEN_MARGIN}
+                self._save_token(entry)
+                metrics.count("feishu_token_refresh")
+            self._token = entry
+            return entry["token"]
+
+    async def _send(self, method, path, body=None, params=None, token=None):
+        """One API call with retries for transient failures. Returns the JSON envelope."""
+        import httpx
+        url = self.base_url + path
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        for attempt in range(RETRIES + 1):
+            delay = None
+            async with throttle(url) as slot:
+                try:
+                    resp = await self.client().request(method, url, json=body, params=params, headers=headers)
+                except httpx.TransportError as e:
+                    slot.error()
+                    error = FeishuError(-1, f"{type(e).__name__}: {e}", path)
+                else:
+                    slot.status(resp.status_code)
+                    try:
+                        data = resp.json()
+                    except ValueError:
+                        data = {"code": -1, "msg": f"HTTP {resp.status_code}: {resp.text[:200]}"}
+                    code = data.get("code", -1)
+                    if code == 0 and resp.status_code < 400:
+                        return data
+                    error = FeishuError(code, data.get("msg", ""), path)
+                    if code in TOKEN_CODES:
+                        raise error
+                    if code in RATE_CODES:
+                        slot.blocked(f"code {code}")
+                    if not (resp.status_code == 429 or resp.status_code >= 500 or code in RETRY_CODES):
+                        raise error
+                    reset = resp.headers.get("x-ogw-ratelimit-reset", "")
+                    delay = float(reset) if reset.replace(".", "", 1).isdigit() else None
+            if attempt == RETRIES:
+                raise error
+            metrics.count("feishu_retries", code=str(error.code))
+            if delay is not None:
+                # Never before the server's reset time: jitter only pushes the retry later
+                await asyncio.sleep(delay * (1 + random.random() / 2))
+            else:
+                await asyncio.sleep(min(MAX_BACKOFF, BACKOFF * 2 ** attempt) * (0.5 + random.random() / 2))
+
+    async def request(self, method, path, body=None, params=None):
+        """Authenticated call; a rejected token is refreshed and the call repeated once."""
+        try:
+            return await self._send(method, path, body, params, await self.token())
+        except FeishuError as e:
+            if e.code not in TOKEN_CODES:
+                raise
+        return await self._send(method, path, body, params, await self.token(refresh=True))
+
+    def _records_path(self, table_id, action=""):
+        return f"/open-apis/bitable/v1/apps/{self.app_token}/tables/{table_id}/records" + (f"/{action}" if action else "")
+
+    async def search(self, table_id, field_names=None, page_size=MAX_BATCH):
+        """Every record in the table (only `field_names` if given), following page tokens."""
+        records, page_token = [], ""
+        body = {"automatic_fields": False}
+        if field_names:
+            body["field_names"] = list(field_names)
+        while True:
+            params = {"page_size": page_size}
+            if page_token:
+                params["page_token"] = page_token
+            data = (await self.request("POST", self._records_path(table_id, "search"), body, params)).get("data") or {}
+            records.extend(data.get("items") or [])
+            page_token = data.get("page_token") or ""
+            if not data.get("has_more") or not page_token:
+                return records
+
+    async def batch_create(self, table_id, rows):
+        """rows: list of field dicts -> created record dicts, in order. At most MAX_BATCH rows."""
+        # Same token on every retry of this batch: the server applies it at most once
+        params = {"client_token": str(uuid.uuid4())}
+        body = {"records": [{"fields": fields} for fields in rows]}
+        data = await self.request("POST", self._records_path(table_id, "batch_create"), body, params)
+        return (data.get("data") or {}).get("records") or []
+
+    async def batch_update(self, table_id, updates):
+        """updates: list of {"record_id", "fields"}. At most MAX_BATCH."""
+        data = await self.request("POST", self._records_path(table_id, "batch_update"), {"records": updates})
+        return (data.get("data") or {}).get("records") or []
+
+    async def key_index(self, table_id, key, refresh=False):
+        """key value -> record_id for the whole table, read once per client."""
+        cache_key = (table_id, key)
+        if refresh or cache_key not in self._indexes:
+            index = {}
+            for rec in await self.search(table_id, [key]):
+                k = key_text((rec.get("fields") or {}).get(key))
+                if k:
+                    index.setdefault(k, rec["record_id"])
+            self._indexes[cache_key] = index
+        return self._indexes[cache_key]
+
+    async def upsert(self, table_id, rows, key):
+        """Create or update `rows` (field dicts) by the value of field `key`.
+
+        Returns counts: created, updated, merged (rows folded into an
+        earlier row with the same key). Rows without a key are created.
+        """
+        stats = {"created": 0, "updated": 0, "merged": 0}
+        if not rows:
+            return stats
+        async with self._table_locks[table_id]:
+            with metrics.span("bitable_upsert", table=table_id) as s:
+                index = await self.key_index(table_id, key)
+                by_key, keyless = {}, []
+                for fields in rows:
+                    k = key_text(fields.get(key))
+                    if not k:
+                        keyless.append(fields)
+                    elif k in by_key:
+                        by_key[k].update(fields)
+                        stats["merged"] += 1
+                    else:
+                        by_key[k] = dict(fields)
+                updates = [{"record_id": index[k], "fields": f} for k, f in by_key.items() if k in index]
+                creates = [(k, f) for k, f in by_key.items() if k not in index] + [("", f) for f in keyless]
+                for batch in chunks(creates):
+                    created = await self.batch_create(table_id, [f for _, f in batch])
+                    for (k, _), rec in zip(batch, created):
+                        if k:
+                            index[k] = rec["record_id"]
+                    stats["created"] += len(batch)
+                for batch in chunks(updates):
+                    await self.batch_update(table_id, batch)
+                    stats["updated"] += len(batch)
+                s.set(**{k: str(v) for k, v in stats.items()})
+        metrics.count("bitable_rows", stats["created"], table=table_id, op="create")
+        metrics.count("bitable_rows", stats["updated"], table=table_id, op="update")
+        return stats
+
+    def writer(self, table_id, key, batch_size=MAX_BATCH, max_age=MAX_BUFFER_AGE):
+        return BitableWriter(self, table_id, key, batch_size, max_age)
+
+
+class BitableWriter:
+    """Buffers rows for one table and upserts them a full batch at a time.
+
+    A slow producer (a collector piped into to-bitable.py) would otherwise keep
+    rows buffered until batch_size arrive, so a timer also flushes whatever is
+    buffered once the oldest row has waited max_age seconds (None: size only).
+    A failed timed flush is raised by the next add(), flush() or close().
+    """
+
+    def __init__(self, client, table_id, key, batch_size=MAX_BATCH, max_age=MAX_BUFFER_AGE):
+        self.client = client
+        self.table_id = table_id
+        self.key = key
+        self.batch_size = min(batch_size, MAX_BATCH)
+        self.max_age = max_age
+        self.rows = []
+        self.stats = {"created": 0, "updated": 0, "merged": 0, "flushes": 0}
+        self._timer = None
+        self._error = None
+
+    async def add(self, fields):
+        self._raise_timer_error()
+        self.rows.append(fields)
+        if len(self.rows) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None and self.max_age is not None:
+            self._timer = asyncio.ensure_future(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.max_age)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            self._error = e
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _raise_timer_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    async def flush(self):
+        self._cancel_timer()
+        self._raise_timer_error()
+        rows, self.rows = self.rows, []
+        if not rows:
+            return
+        for name, n in (await self.client.upsert(self.table_id, rows, self.key)).items():
+            self.stats[name] += n
+        self.stats["flushes"] += 1
+
+    async def close(self):
+        await self.flush()
+        return dict(self.stats)
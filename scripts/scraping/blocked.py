@@ -0,0 +1,188 @@
+"""Recognise block pages (captcha, login wall, "访问异常") the moment the document arrives.
+
+    block = await detect(page, "xhs", status=resp.status)     # one evaluate()
+    if block:
+        raise BlockedError(block)
+
+goto_ready() runs this right after domcontentloaded and again if a block
+marker shows up while waiting, so a blocked attempt fails in milliseconds
+with a typed result instead of sitting out the full readiness wait. The
+throttle is told, so the domain backs off.
+
+A site's signatures match on:
+  - final URL: a redirect to a captcha or login host
+  - DOM markers: slider and captcha containers
+  - response status
+  - text: only on short pages or in the title, because a real result page
+    can mention "验证码" in a snippet
+"""
+import re
+from dataclasses import dataclass, asdict
+
+# Block pages are small; a page with more visible text than this is content
+MAX_BLOCK_TEXT = 3000
+MAX_BLOCK_HTML = 60000
+
+
+@dataclass
+class Block:
+    site: str
+    kind: str           # captcha, login, rate_limit, forbidden
+    reason: str         # which signature matched
+    url: str = ""
+    status: int = 0
+
+    def to_dict(self):
+        return asdict(self)
+
+    def __str__(self):
+        return f"{self.site} {self.kind} ({self.reason})"
+
+
+class BlockedError(Exception):
+    def __init__(self, block):
+        self.block = block
+        super().__init__(f"blocked: {block}")
+
+
+@dataclass
+class Signature:
+    kind: str
+    url: str = ""
+    selector: str = ""
+    text: str = ""
+    status: tuple = ()
+
+    def __post_init__(self):
+        self.url_re = re.compile(self.url) if self.url else None
+        self.text_re = re.compile(self.text, re.I) if self.text else None
+
+
+COMMON = [
+    Signature("rate_limit", status=(429,)),
+    Signature("forbidden", status=(403,)),
+    Signature("rate_limit", text=r"访问过于频繁|访问频次异常|Too Many Requests|请求过于频繁"),
+]
+
+SIGNATURES = {
+    "baidu": [
+        Signature("captcha", url=r"wappass\.baidu\.com|/static/captcha/|antispider"),
+        Signature("captcha", selector="#passMod_captcha, .passMod_slide-btn, .vcode-spin, #seccodeInput"),
+        Signature("captcha", text=r"百度安全验证|访问异常"),
+        Signature("rate_limit", text=r"网络不给力，请稍后重试"),
+    ],
+    "sogou": [
+        Signature("captcha", url=r"/antispider/"),
+        Signature("captcha", selector="#seccodeImage, form[name=authform]"),
+        Signature("captcha", text=r"请输入验证码|您的访问出错了|访问异常"),
+    ],
+    "weixin": [
+        Signature("captcha", url=r"/antispider/"),
+        Signature("captcha", selector="#seccodeImage, form[name=authform]"),
+        Signature("captcha", text=r"请输入验证码|您的访问出错了|访问异常"),
+    ],
+    "bing": [
+        Signature("captcha", selector="#challenge, #turnstile-widget"),
+        Signature("captcha", text=r"验证你是人类|Verify you are human|请解决以下难题"),
+    ],
+    "google": [
+        Signature("captcha", url=r"/sorry/index|/sorry/image"),
+        Signature("captcha", selector="#captcha-form, #recaptcha"),
+        Signature("captcha", text=r"unusual traffic|异常流量"),
+    ],
+    "xhs": [
+        # 461 is XHS's "solve a captcha" status
+        Signature("captcha", status=(461,)),
+        Signature("captcha", url=r"/website-login/captcha|/web-login/captcha|verifyType="),
+        Signature("captcha", selector=".red-captcha, #red-captcha, [class*=captcha-slider], [class*=verify-slider]"),
+        Signature("captcha", text=r"请通过验证|拖动滑块|安全验证"),
+        Signature("login", url=r"/website-login/|/login\?"),
+        Signature("login", text=r"登录后查看搜索结果|登录后查看更多"),
+        Signature("rate_limit", text=r"安全限制|IP存在风险"),
+    ],
+    "douyin": [
+        Signature("captcha", url=r"verify\.snssdk\.com|verifycenter|/captcha/"),
+        Signature("captcha", selector="#captcha_container, .captcha_verify_container, #verify-bar-box, .vc-captcha-verify"),
+        Signature("captcha", text=r"验证码中间页|请完成下列验证后继续|拖动滑块|按住左边按钮拖动"),
+        Signature("rate_limit", text=r"访问太频繁|操作过于频繁"),
+    ],
+}
+
+# search/notes and usersearch "success": false codes
+XHS_API_CODES = {
+    300011: "login",       # 当前账号存在异常
+    300012: "rate_limit",  # IP存在风险
+    300013: "rate_limit",  # 访问频次异常
+    300015: "captcha",
+    -100: "login",         # 登录已过期
+    -101: "login",         # 无登录信息
+}
+
+
+def signatures_for(site):
+    return SIGNATURES.get(site, []) + COMMON
+
+
+def selectors_for(site):
+    return [s.selector for s in signatures_for(site) if s.selector]
+
+
+def classify(site, url="", status=0, title="", text="", selectors=(), short=True):
+    """Pure check over what we already know about a page. Returns a Block or None.
+
+    `selectors` are the marker selectors found on the page. `short` says
+    whether text signatures may look at the body (title is always checked).
+    """
+    for sig in signatures_for(site):
+        if sig.status and status in sig.status:
+            return Block(site, sig.kind, f"status {status}", url, status)
+        if sig.url_re and url and sig.url_re.search(url):
+            return Block(site, sig.kind, f"url {sig.url_re.search(url).group(0)}", url, status)
+        if sig.selector and sig.selector in selectors:
+            return Block(site, sig.kind, f"selector {sig.selector.split(',')[0]}", url, status)
+        if sig.text_re:
+            m = sig.text_re.search(title) or (short and sig.text_re.search(text))
+            if m:
+                return Block(site, sig.kind, f"text {m.group(0)}", url, status)
+    return None
+
+
+def classify_html(site, url, status, html):
+    """Same check for an HTTP body (no DOM): URL, status and text of small pages or the <title>."""
+    m = re.search(r"<title[^>]*>(.*?)</title>", html[:20000], re.S | re.I)
+    title = m.group(1).strip() if m else ""
+    return classify(site, url, status, title, html[:MAX_BLOCK_HTML], (), short=len(html) <= MAX_BLOCK_HTML)
+
+
+def classify_api(site, status, data):
+    """XHS-style API JSON ({"success": false, "code": ...}) -> Block or None."""
+    if status == 461:
+        return Block(site, "captcha", "status 461", "", status)
+    if not isinstance(data, dict) or data.get("success", True) or data.get("code", 0) == 0:
+        return None
+    kind = XHS_API_CODES.get(data.get("code"))
+    if kind is None:
+        return None
+    return Block(site, kind, f"api code {data.get('code')} {data.get('msg', '')}".strip(), "", status)
+
+
+DETECT_JS = r"""([sels, maxText]) => {
+    const body = document.body;
+    const n = body ? body.textContent.length : 0;
+    // innerText forces layout, so only read it when the page is small enough to be a block page
+    const text = body && n < maxText * 8 ? body.innerText : '';
+    return {
+        url: location.href, title: document.title, text: text.slice(0, maxText), short: !!body && text.length <= maxText,
+        hits: sels.filter(s => { try { return !!document.querySelector(s); } catch (e) { return false; } }),
+    };
+}"""
+
+
+async def detect(page, site, status=0):
+    """Classify a live page with one evaluate(). Returns a Block or None."""
+    try:
+        info = await page.evaluate(DETECT_JS, [selectors_for(site), MAX_BLOCK_TEXT])
+    except Exception:
+        # Navigated away or closed mid-check; the caller's own wait will tell
+        return classify(site, page.url, status)
+    return classify(site, info["url"], status, info["title"], info["text"], info["hits"], info["short"])
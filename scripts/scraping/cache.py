@@ -0,0 +1,117 @@
+"""On-disk SERP cache keyed by engine + normalized query.
+
+SQLite file next to the browser profiles. Payloads are zlib-compressed JSON,
+each engine has its own TTL, and the file is kept under max_bytes by
+evicting least-recently-used rows. Scripts pass --refresh to bypass reads
+(fresh results are still written back).
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+import zlib
+from urllib.parse import urlparse, parse_qs
+
+from .pool import PROFILE_ROOT
+
+CACHE_PATH = os.path.join(os.path.dirname(PROFILE_ROOT), "serp-cache.sqlite")
+MAX_BYTES = 200 * 1024 * 1024
+
+HOUR = 3600
+TTL = {"baidu": 6 * HOUR, "sogou": 6 * HOUR, "bing": 6 * HOUR, "weixin": 12 * HOUR, "google": 12 * HOUR, "default": 6 * HOUR}
+
+QUERY_PARAMS = ("wd", "word", "query", "q", "keyword")
+
+
+def normalize_query(query):
+    """Collapse width, case, quote style and whitespace so trivial variants share a key.
+
+    Queries arrive URL-decoded, so "+" is content ("C++"), not an encoded space.
+    """
+    q = unicodedata.normalize("NFKC", query).casefold()
+    q = q.replace("“", '"').replace("”", '"').replace("'", '"')
+    q = re.sub(r"\s+", " ", q)
+    return q.strip()
+
+
+def query_from_url(url):
+    params = parse_qs(urlparse(url).query)
+    for name in QUERY_PARAMS:
+        if params.get(name):
+            return params[name][0]
+    return url
+
+
+class SerpCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, ttl=None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = dict(TTL, **(ttl or {}))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS serp ("
+            " engine TEXT, qkey TEXT, query TEXT, payload BLOB, size INTEGER,"
+            " created REAL, accessed REAL, PRIMARY KEY (engine, qkey))"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS serp_accessed ON serp (accessed)")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def get(self, engine, query):
+        key = normalize_query(query)
+        row = self.db.execute("SELECT payload, created FROM serp WHERE engine=? AND qkey=?", (engine, key)).fetchone()
+        if row is None:
+            return None
+        payload, created = row
+        now = time.time()
+        if now - created > self.ttl.get(engine, self.ttl["default"]):
+            self.db.execute("DELETE FROM serp WHERE engine=? AND qkey=?", (engine, key))
+            self.db.commit()
+            return None
+        self.db.execute("UPDATE serp SET accessed=? WHERE engine=? AND qkey=?", (now, engine, key))
+        self.db.commit()
+        return json.loads(zlib.decompress(payload))
+
+    def put(self, engine, query, value):
+        payload = zlib.compress(json.dumps(value, ensure_ascii=False).encode(), 6)
+        now = time.time()
+        self.db.execute(
+            "INSERT OR REPLACE INTO serp VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (engine, normalize_query(query), query, payload, len(payload), now, now),
+        )
+        self.db.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop expired rows, then least-recently-used rows until under max_bytes."""
+        now = time.time()
+        for engine, ttl in self.ttl.items():
+            if engine != "default":
+                self.db.execute("DELETE FROM serp WHERE engine=? AND created < ?", (engine, now - ttl))
+        known = [e for e in self.ttl if e != "default"]
+        self.db.execute(
+            f"DELETE FROM serp WHERE engine NOT IN ({','.join('?' * len(known))}) AND created < ?",
+            (*known, now - self.ttl["default"]),
+        )
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM serp").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            freed = 0
+            victims = []
+            for engine, qkey, size in self.db.execute("SELECT engine, qkey, size FROM serp ORDER BY accessed"):
+                victims.append((engine, qkey))
+                freed += size
+                if freed >= excess:
+                    break
+            self.db.executemany("DELETE FROM serp WHERE engine=? AND qkey=?", victims)
+        self.db.commit()
+
+    def stats(self):
+        rows = self.db.execute("SELECT engine, COUNT(*), SUM(size) FROM serp GROUP BY engine").fetchall()
+        return {engine: {"entries": n, "bytes": size} for engine, n, size in rows}
@@ -0,0 +1,374 @@
+"""Douyin play-URL resolver that races our extraction strategies.
+
+    async with DouyinResolver() as resolver:
+        res = await resolver.resolve("https://v.douyin.com/xxxx/")
+        print(res.play_url, res.strategy)
+
+Strategies (the same ones the dy-download*.py scripts use one at a time):
+  page_video   <video> src + sniffed media requests        (dy-download2.py)
+  render_data  parsed RENDER_DATA, best variant by policy (dy-download3.py)
+  ytdlp        vault cookies + `yt-dlp -g`                 (dy-download.py)
+  f2           AwemeIdFetcher + fetch_one_video            (dy-f2-download.py)
+
+They start in order of past performance, staggered by HEDGE_DELAY (a failure
+launches the next one immediately). The first URL that passes a 1 KB range
+probe wins and the rest are cancelled. Per-strategy success and latency are
+kept in STATS_PATH so the fastest reliable strategy goes first next time.
+With SCRAPE_RECORD / SCRAPE_REPLAY set, ytdlp and f2 are left out: their
+traffic bypasses the archive (see replay.py).
+"""
+import asyncio
+import json
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, field, asdict
+from urllib.parse import urljoin
+
+from . import metrics, replay
+from .aweme import RENDER_DATA_RAW_JS, parse_render_data
+from .pool import BrowserPool, USER_AGENT, PROFILE_ROOT
+from .ready import goto_ready
+from .replay import http_transport
+from .session import SessionVault
+from .throttle import throttle
+
+STATS_PATH = os.path.join(os.path.dirname(PROFILE_ROOT), "douyin-strategies.json")
+HEDGE_DELAY = 1.5
+STRATEGIES = ["page_video", "render_data", "ytdlp", "f2"]
+# yt-dlp and f2 fetch through their own HTTP stacks, out of reach of record/replay
+OWN_NETWORK = {"ytdlp", "f2"}
+MIN_VIDEO_BYTES = 100 * 1024
+
+DOWNLOAD_HEADERS = {"Referer": "https://www.douyin.com/", "User-Agent": USER_AGENT}
+
+VIDEO_HOSTS = re.compile(r"douyinvod|ixigua|bytevcloudtp|v\d+-dy|/aweme/v1/play")
+SHARE_URL = re.compile(r"https?://[\w.-]*(?:douyin|iesdouyin)\.com/[^\s，。！]*")
+
+
+class ResolveError(Exception):
+    def __init__(self, url, errors):
+        self.errors = errors
+        super().__init__(f"could not resolve {url}: " + "; ".join(f"{k}: {v}" for k, v in errors.items()))
+
+
+@dataclass
+class Resolution:
+    url: str
+    play_url: str
+    strategy: str
+    elapsed: float
+    aweme_id: str = ""
+    desc: str = ""
+    author: str = ""
+    headers: dict = field(default_factory=lambda: dict(DOWNLOAD_HEADERS))
+
+    def to_dict(self):
+        return asdict(self)
+
+
+PAGE_VIDEO_JS = """() => {
+    const srcs = [];
+    document.querySelectorAll('video').forEach(v => {
+        if (v.src) srcs.push(v.src);
+        v.querySelectorAll('source').forEach(s => { if (s.src) srcs.push(s.src); });
+    });
+    return srcs.filter(s => s.startsWith('http'));
+}"""
+
+RENDER_DATA_JS = r"""() => {
+    const fix = u => u.replace(/\\u002F/g, '/');
+    const el = document.querySelector('script#RENDER_DATA');
+    if (el) {
+        try {
+            const str = decodeURIComponent(el.textContent);
+            const m = str.match(/"play_addr"[^}]*"url_list"\s*:\s*\["([^"]+)"/)
+                || str.match(/"playApi"\s*:\s*"([^"]+)"/)
+                || str.match(/(https?:\/\/[^"]*douyinvod[^"]*)/);
+            if (m) return fix(m[1]);
+        } catch (e) {}
+    }
+    for (const s of document.querySelectorAll('script')) {
+        const text = s.textContent || '';
+        if (text.length < 100 || !/play_?[aA]ddr|douyinvod/.test(text)) continue;
+        let decoded = text;
+        if (text.includes('%22')) { try { decoded = decodeURIComponent(text); } catch (e) {} }
+        const m = decoded.match(/(https?:\/\/[^"'\s]*(?:douyinvod|v\d+-dy)[^"'\s]*)/);
+        if (m) return fix(m[1]);
+    }
+    return null;
+}"""
+
+INFO_JS = r"""() => {
+    const el = document.querySelector('[data-e2e="video-desc"], [class*="title"] h1, h1');
+    const au = document.querySelector('[data-e2e="video-author-title"], [data-e2e="video-author-name"]');
+    return {desc: el ? el.innerText.trim().slice(0, 300) : '', author: au ? au.innerText.trim() : ''};
+}"""
+
+
+def _aweme_id(url):
+    m = re.search(r"/(?:video|note)/(\d{8,})|modal_id=(\d{8,})|aweme_id=(\d{8,})", url)
+    return next((g for g in m.groups() if g), "") if m else ""
+
+
+def share_urls(text):
+    """Douyin links in pasted text, e.g. "7.43 复制打开抖音，看看【...】 https://v.douyin.com/xxxx/ ..."."""
+    return SHARE_URL.findall(text)
+
+
+async def get_aweme_id(url, client=None, max_hops=5):
+    """Share / short link -> aweme ID.
+
+    Reads the ID from the URL itself, else follows redirects one hop at a time
+    (v.douyin.com -> iesdouyin.com/share/video/<id>) without loading any page,
+    and only then falls back to f2's AwemeIdFetcher.
+    """
+    found = _aweme_id(url)
+    if found:
+        return found
+    if client is None:
+        import httpx
+        async with httpx.AsyncClient(headers=DOWNLOAD_HEADERS, timeout=10.0, transport=http_transport()) as client:
+            return await get_aweme_id(url, client, max_hops)
+    hop = url
+    for _ in range(max_hops):
+        if found:
+            return found
+        async with throttle(hop) as slot:
+            resp = await client.get(hop, follow_redirects=False)
+            slot.status(resp.status_code)
+        location = resp.headers.get("location")
+        if not location:
+            break
+        hop = urljoin(hop, location)
+        found = _aweme_id(hop)
+    if found:
+        return found
+    try:
+        from f2.apps.douyin.utils import AwemeIdFetcher
+    except ImportError:
+        raise ValueError(f"no aweme ID in {url}") from None
+    return await AwemeIdFetcher.get_aweme_id(url)
+
+
+class DouyinResolver:
+    """Resolve share/video URLs to a validated play URL by racing strategies."""
+
+    def __init__(self, pool=None, client=None, strategies=None, stats_path=STATS_PATH, vault=None, policy="compat"):
+        self.pool = pool
+        self.policy = policy
+        self.vault = vault or (pool.vault if pool is not None and pool.vault is not None else SessionVault())
+        self._own_pool = pool is None
+        self._client = client
+        self._own_client = client is None
+        self.stats_path = stats_path
+        self.stats = self._load_stats()
+        self.strategies = strategies or [s for s in STRATEGIES if not (replay.mode() and s in OWN_NETWORK)]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._own_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._own_pool and self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        self._save_stats()
+
+    def client(self):
+        if self._client is None:
+            self._client = self.vault.client("douyin", headers=DOWNLOAD_HEADERS, timeout=15.0)
+        return self._client
+
+    def _pool(self):
+        if self.pool is None:
+            self.pool = BrowserPool()
+        return self.pool
+
+    def _load_stats(self):
+        try:
+            with open(self.stats_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_stats(self):
+        os.makedirs(os.path.dirname(self.stats_path), exist_ok=True)
+        with open(self.stats_path, "w") as f:
+            json.dump(self.stats, f, indent=2)
+
+    def _record(self, name, ok, elapsed):
+        metrics.count("resolve_attempts", strategy=name, outcome="ok" if ok else "fail")
+        s = self.stats.setdefault(name, {"ok": 0, "fail": 0, "latency": None})
+        s["ok" if ok else "fail"] += 1
+        if ok:
+            s["latency"] = elapsed if s["latency"] is None else 0.7 * s["latency"] + 0.3 * elapsed
+
+    def ordered(self):
+        """Strategies sorted by success rate per second of latency (unknown ones first to learn)."""
+        def score(name):
+            s = self.stats.get(name)
+            if not s or s["latency"] is None:
+                return float("inf") if not s else 0.0
+            rate = (s["ok"] + 1) / (s["ok"] + s["fail"] + 2)
+            return rate / max(s["latency"], 0.5)
+        return sorted(self.strategies, key=score, reverse=True)
+
+    async def validate(self, play_url):
+        """Range-probe the first KB; reject HTML error pages and tiny files."""
+        # Streamed so a server that ignores Range does not make us read the whole video
+        async with self.client().stream("GET", play_url, headers={"Range": "bytes=0-1023"}) as resp:
+            if resp.status_code not in (200, 206):
+                raise ValueError(f"probe status {resp.status_code}")
+            ctype = resp.headers.get("content-type", "")
+            if "text/html" in ctype or "json" in ctype:
+                raise ValueError(f"probe content-type {ctype}")
+            total = resp.headers.get("content-range", "").rpartition("/")[2] or resp.headers.get("content-length", "")
+            if total.isdigit() and int(total) < MIN_VIDEO_BYTES:
+                raise ValueError(f"only {total} bytes")
+            return str(resp.url)
+
+    async def page_video(self, url, info):
+        async with self._pool().page("douyin", discard=True) as page:
+            sniffed = []
+
+            def on_request(req):
+                if req.resource_type == "media" or VIDEO_HOSTS.search(req.url):
+                    sniffed.append(req.url)
+
+            page.on("request", on_request)
+            await goto_ready(page, url, "douyin", timeout=30000)
+            info.update(await page.evaluate(INFO_JS))
+            info.setdefault("final_url", page.url)
+            for _ in range(20):
+                srcs = await page.evaluate(PAGE_VIDEO_JS)
+                candidates = srcs + [u for u in sniffed if VIDEO_HOSTS.search(u)]
+                if candidates:
+                    return candidates[0]
+                await asyncio.sleep(0.25)
+        raise ValueError("no <video> src or media request")
+
+    async def render_data(self, url, info):
+        async with self._pool().page("douyin", discard=True) as page:
+            await goto_ready(page, url, "douyin", timeout=30000)
+            info.setdefault("final_url", page.url)
+            aweme = parse_render_data(await page.evaluate(RENDER_DATA_RAW_JS), _aweme_id(page.url) or _aweme_id(url))
+            variant = aweme.best(self.policy) if aweme else None
+            if variant:
+                info.update(aweme_id=aweme.aweme_id, desc=aweme.desc, author=aweme.author)
+                return variant.url
+            # No structured item (layout change): regex over the page's scripts
+            found = await page.evaluate(RENDER_DATA_JS)
+        if not found:
+            raise ValueError("no play URL in RENDER_DATA/scripts")
+        return found
+
+    async def ytdlp(self, url, info):
+        session = await self.vault.get("douyin", self._pool())
+        # One cookie file per call: concurrent resolves (dy-batch workers) must not rewrite it under a running
+        # yt-dlp, which also writes the jar back on exit
+        with tempfile.NamedTemporaryFile("w", prefix="dy-cookies-", suffix=".txt", delete=False) as f:
+            cookie_file = f.name
+        try:
+            session.write_netscape(cookie_file)
+            proc = await asyncio.create_subprocess_exec(
+                "yt-dlp", "-g", "--no-check-certificates", "--cookies", cookie_file, url,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                out, err = await proc.communicate()
+            except asyncio.CancelledError:
+                proc.kill()
+                # Reap it even though we are being cancelled, or it lingers as a zombie with an open transport
+                await asyncio.shield(proc.wait())
+                raise
+        finally:
+            os.remove(cookie_file)
+        lines = [l for l in out.decode().splitlines() if l.startswith("http")]
+        if proc.returncode != 0 or not lines:
+            raise ValueError(f"yt-dlp exit {proc.returncode}: {err.decode()[-200:].strip()}")
+        return lines[0]
+
+    async def f2(self, url, info):
+        from f2.apps.douyin.handler import DouyinHandler
+        from f2.apps.douyin.utils import AwemeIdFetcher
+        aweme_id = await AwemeIdFetcher.get_aweme_id(url)
+        info["aweme_id"] = aweme_id
+        handler = DouyinHandler({
+            "headers": DOWNLOAD_HEADERS, "proxies": {"http://": None, "https://": None},
+            "cookie": "", "timeout": 20, "path": "/tmp/douyin_dl", "naming": "{create}_{desc}",
+            "folderize": False, "mode": "post", "url": url, "interval": "all", "lyric": False, "original": True,
+        })
+        detail = await handler.fetch_one_video(aweme_id)
+        info["desc"] = getattr(detail, "desc", "") or ""
+        info["author"] = getattr(detail, "nickname", "") or ""
+        play = getattr(detail, "video_play_addr", None) or getattr(detail, "play_addr", None)
+        if isinstance(play, (list, tuple)):
+            play = play[0] if play else None
+        if not play:
+            raise ValueError("f2 returned no play address")
+        return str(play)
+
+    async def _attempt(self, name, url):
+        """Run one strategy. Returns (play_url, info), where info is the metadata this strategy found.
+
+        Each attempt fills its own info dict, so the Resolution carries the winner's desc/author,
+        never those of a strategy that lost the race.
+        """
+        start = time.monotonic()
+        info = {}
+        try:
+            found = await getattr(self, name)(url, info)
+            play_url = await self.validate(found)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._record(name, False, time.monotonic() - start)
+            raise
+        self._record(name, True, time.monotonic() - start)
+        return play_url, info
+
+    async def resolve(self, url, timeout=60.0):
+        with metrics.span("resolve", site="douyin") as s:
+            res = await self._resolve(url, timeout)
+            s.set(strategy=res.strategy)
+        return res
+
+    async def _resolve(self, url, timeout):
+        start = time.monotonic()
+        queue = self.ordered()
+        running = {}
+        errors = {}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        try:
+            while queue or running:
+                if queue:
+                    name = queue.pop(0)
+                    running[asyncio.ensure_future(self._attempt(name, url))] = name
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                wait_for = min(HEDGE_DELAY, remaining) if queue else remaining
+                done, _ = await asyncio.wait(running, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        play_url, info = task.result()
+                        aweme_id = info.get("aweme_id") or _aweme_id(info.get("final_url", "")) or _aweme_id(url)
+                        return Resolution(url, play_url, name, time.monotonic() - start,
+                                          aweme_id, info.get("desc", ""), info.get("author", ""))
+                    errors[name] = f"{type(task.exception()).__name__}: {str(task.exception())[:160]}"
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+        for name in running.values():
+            errors.setdefault(name, "timed out")
+        raise ResolveError(url, errors)
@@ -0,0 +1,245 @@
+"""Segmented, resumable HTTP downloads (replaces the curl --max-time subprocess).
+
+    result = await download(play_url, "/tmp/douyin_video.mp4", headers=DOWNLOAD_HEADERS)
+    print(result.summary())
+
+The file is split into Range segments fetched in parallel over one pooled
+client and written straight to their offsets in `<path>.part`, so memory
+stays at one chunk per segment. Progress is checkpointed in
+`<path>.part.json`; re-running the same download continues where it
+stopped. A checkpoint is only resumed for the same content: same `key`
+(the aweme ID, or the URL without its signature params), same size and,
+when the server sends one, the same ETag/Last-Modified. Anything else
+starts over. Every segment must deliver exactly its byte count and the
+final size must match Content-Length (and `expected`, if given) before the
+.part file is renamed into place. Servers without range support fall back
+to a single streamed request. Transport errors surface as DownloadError.
+"""
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from . import metrics
+from .replay import http_transport
+
+CHUNK = 256 * 1024
+MIN_SEGMENT = 2 * 1024 * 1024
+SEGMENTS = 4
+RETRIES = 3
+CHECKPOINT_EVERY = 1.0
+# Query params that change on every re-signed CDN URL for the same file
+VOLATILE_PARAMS = {"x-expires", "x-signature", "expires", "expire", "signature", "sign", "sig", "auth_key", "token",
+                   "l", "logid", "ts", "btag", "__vid", "policy"}
+
+
+class DownloadError(Exception):
+    pass
+
+
+@dataclass
+class DownloadResult:
+    path: str
+    bytes: int
+    elapsed: float
+    segments: int
+    resumed: int = 0
+
+    @property
+    def mb_per_s(self):
+        fetched = self.bytes - self.resumed
+        return fetched / 1024 / 1024 / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        extra = f", resumed {self.resumed / 1024 / 1024:.1f} MB" if self.resumed else ""
+        return (f"{self.bytes / 1024 / 1024:.1f} MB in {self.elapsed:.1f}s "
+                f"({self.mb_per_s:.1f} MB/s, {self.segments} segment(s){extra})")
+
+
+def content_key(url):
+    """URL -> identity that survives re-signing: host-less path plus the query params that select content."""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query) if k.lower() not in VOLATILE_PARAMS)
+    return parts.path + ("?" + urlencode(query) if query else "")
+
+
+async def probe(client, url, headers=None):
+    """Returns (total_size or None, final_url, ranges_supported, validator) without reading the body.
+
+    validator is the ETag, else Last-Modified, else "".
+    """
+    async with client.stream("GET", url, headers={**(headers or {}), "Range": "bytes=0-0"}) as resp:
+        validator = resp.headers.get("etag") or resp.headers.get("last-modified") or ""
+        if resp.status_code == 206:
+            total = resp.headers.get("content-range", "").rpartition("/")[2]
+            return (int(total) if total.isdigit() else None), str(resp.url), True, validator
+        if resp.status_code == 200:
+            length = resp.headers.get("content-length")
+            return (int(length) if length and length.isdigit() else None), str(resp.url), False, validator
+        raise DownloadError(f"probe failed: HTTP {resp.status_code}")
+
+
+def _plan(total, segments, min_segment):
+    n = max(1, min(segments, total // min_segment or 1))
+    size = -(-total // n)
+    return [[start, min(start + size, total) - 1, 0] for start in range(0, total, size)]
+
+
+class _Checkpoint:
+    def __init__(self, path, url, total, parts, key="", validator=""):
+        self.path = path
+        self.url = url
+        self.total = total
+        self.parts = parts
+        self.key = key
+        self.validator = validator
+        self.progress = None
+        self._last = 0.0
+
+    @classmethod
+    def load(cls, path, total, key, validator):
+        """The checkpoint at `path` if it is for the same content, else None."""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("total") != total or data.get("key") != key:
+            return None
+        if validator and data.get("validator") and data["validator"] != validator:
+            return None
+        return cls(path, data.get("url"), total, data["parts"], key, validator)
+
+    def save(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last < CHECKPOINT_EVERY:
+            return
+        self._last = now
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"url": self.url, "key": self.key, "validator": self.validator, "total": self.total,
+                       "parts": self.parts}, f)
+        os.replace(tmp, self.path)
+        if self.progress is not None:
+            self.progress(sum(p[2] for p in self.parts), self.total)
+
+
+async def _fetch_segment(client, url, headers, fd, part, checkpoint):
+    start, end, _ = part
+    for attempt in range(RETRIES):
+        offset = start + part[2]
+        if offset > end:
+            return
+        try:
+            rng = {"Range": f"bytes={offset}-{end}"}
+            async with client.stream("GET", url, headers={**headers, **rng}) as resp:
+                if resp.status_code != 206:
+                    raise DownloadError(f"segment {start}-{end}: HTTP {resp.status_code}")
+                async for chunk in resp.aiter_bytes(CHUNK):
+                    if offset + len(chunk) > end + 1:
+                        raise DownloadError(f"segment {start}-{end}: server sent too much")
+                    os.pwrite(fd, chunk, offset)
+                    offset += len(chunk)
+                    part[2] = offset - start
+                    checkpoint.save()
+            if offset != end + 1:
+                raise DownloadError(f"segment {start}-{end}: short by {end + 1 - offset} bytes")
+            return
+        except Exception as e:  # DownloadError, OSError or a transport error from the client
+            err = e
+        metrics.count("download_retries")
+        if attempt < RETRIES - 1:
+            await asyncio.sleep(0.5 * 2 ** attempt)
+    raise DownloadError(f"segment {start}-{end} failed after {RETRIES} attempts: {err}") from err
+
+
+async def _single_stream(client, url, headers, part_path, expected):
+    written = 0
+    with open(part_path, "wb") as f:
+        async with client.stream("GET", url, headers=headers) as resp:
+            if resp.status_code != 200:
+                raise DownloadError(f"HTTP {resp.status_code}")
+            length = resp.headers.get("content-length")
+            async for chunk in resp.aiter_bytes(CHUNK):
+                f.write(chunk)
+                written += len(chunk)
+    if length and length.isdigit() and written != int(length):
+        raise DownloadError(f"got {written} of {length} bytes")
+    if expected is not None and written != expected:
+        raise DownloadError(f"got {written} bytes, expected {expected}")
+    return written
+
+
+async def download(url, path, client=None, headers=None, segments=SEGMENTS, min_segment=MIN_SEGMENT, expected=None,
+                   progress=None, key=None):
+    """Download url to path. Returns DownloadResult; raises DownloadError on size mismatch, repeated failure
+    or a transport error.
+
+    progress(done_bytes, total_bytes) is called at each checkpoint (about once a second) for ranged downloads.
+    key names the content (e.g. the aweme ID) so a partial file is only resumed for the same video; it
+    defaults to content_key(url).
+    """
+    with metrics.span("download") as s:
+        result = await _download(url, path, client, headers, segments, min_segment, expected, progress,
+                                 key or content_key(url))
+        s.set(segments=result.segments)
+    metrics.count("download_bytes", result.bytes - result.resumed)
+    return result
+
+
+async def _download(url, path, client, headers, segments, min_segment, expected, progress, key):
+    import httpx
+    headers = headers or {}
+    own_client = client is None
+    if own_client:
+        limits = httpx.Limits(max_connections=segments + 2)
+        client = httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=60.0), follow_redirects=True, limits=limits,
+                                   transport=http_transport(limits=limits))
+    start = time.monotonic()
+    part_path = path + ".part"
+    ckpt_path = part_path + ".json"
+    try:
+        try:
+            total, final_url, ranged, validator = await probe(client, url, headers)
+        except httpx.HTTPError as e:
+            raise DownloadError(f"probe failed: {type(e).__name__}: {e}") from e
+        if expected is not None and total is not None and total != expected:
+            raise DownloadError(f"server reports {total} bytes, expected {expected}")
+        if not ranged or not total:
+            try:
+                size = await _single_stream(client, final_url, headers, part_path, expected)
+            except httpx.HTTPError as e:
+                raise DownloadError(f"{type(e).__name__}: {e}") from e
+            os.replace(part_path, path)
+            return DownloadResult(path, size, time.monotonic() - start, 1)
+
+        checkpoint = _Checkpoint.load(ckpt_path, total, key, validator) if os.path.exists(part_path) else None
+        if checkpoint is None:
+            checkpoint = _Checkpoint(ckpt_path, url, total, _plan(total, segments, min_segment), key, validator)
+            with open(part_path, "wb") as f:
+                f.truncate(total)
+        resumed = sum(p[2] for p in checkpoint.parts)
+        checkpoint.progress = progress
+
+        fd = os.open(part_path, os.O_WRONLY)
+        try:
+            tasks = [_fetch_segment(client, final_url, headers, fd, p, checkpoint) for p in checkpoint.parts]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            os.close(fd)
+            checkpoint.save(force=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0] if isinstance(errors[0], DownloadError) else DownloadError(str(errors[0]))
+
+        size = os.path.getsize(part_path)
+        if size != total or sum(p[1] - p[0] + 1 for p in checkpoint.parts) != total:
+            raise DownloadError(f"size {size} != {total}")
+        os.replace(part_path, path)
+        os.remove(ckpt_path)
+        return DownloadResult(path, total, time.monotonic() - start, len(checkpoint.parts), resumed)
+    finally:
+        if own_client:
+            await client.aclose()
@@ -0,0 +1,134 @@
+"""Search context for a batch of hot-search titles, inside a fixed time budget.
+
+    async with SerpFetcher() as fetcher:
+        contexts = await enrich(titles, fetcher, budget=40)
+    contexts["某明星官宣"].summary      # "… / … / …", ≤ MAX_SUMMARY chars
+
+Titles are cleaned (#话题# marks, brackets) and deduplicated on the cache's
+normalized query, so reposted variants are searched once. Every
+(title, engine) search is started up front, in title order. The shared
+throttle paces each engine and the SERP cache answers repeats from earlier
+runs. When a title's searches are all back, its hits are fused with
+merge.merge() and condensed: the top few results' snippets become one short
+summary plus a source list. The record is handed to `on_context` at once.
+When the budget runs out, the searches still waiting are cancelled. Titles
+get whatever arrived, marked complete=False, so one slow engine cannot hold
+up the batch.
+"""
+import asyncio
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, asdict, field
+
+from . import metrics
+from .cache import normalize_query
+from .merge import merge
+
+ENGINES = ("baidu", "bing")
+BUDGET = 100.0
+TOP = 5
+MAX_SUMMARY = 240
+MAX_SOURCES = 3
+
+
+@dataclass
+class Context:
+    title: str
+    query: str
+    summary: str = ""
+    sources: list = field(default_factory=list)   # [{"title", "url", "source", "date"}]
+    engines: dict = field(default_factory=dict)   # engine -> hit count, or the error
+    complete: bool = True
+    elapsed: float = 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def query_for(title):
+    """Hot-search title -> search query: drop #tag# marks, 【】 labels and trailing hot/new badges."""
+    q = re.sub(r"[#＃]", " ", title)
+    q = re.sub(r"【[^】]*】|\[[^\]]*\]", " ", q)
+    q = re.sub(r"\s*(热|新|爆|沸)$", "", q.strip())
+    return re.sub(r"\s+", " ", q).strip() or title.strip()
+
+
+def condense(query, lists, top=TOP):
+    """Fused top hits -> (summary, sources)."""
+    merged = merge(lists)[:top]
+    parts = []
+    for m in merged:
+        snippet = re.sub(r"\s+", " ", m.snippet).strip(" .…")
+        # Snippets that only restate the query add nothing
+        if snippet and snippet not in parts and normalize_query(snippet) != normalize_query(query):
+            parts.append(snippet)
+    summary = " / ".join(parts)
+    if len(summary) > MAX_SUMMARY:
+        summary = summary[:MAX_SUMMARY - 1] + "…"
+    sources = [{"title": m.title, "url": m.url, "source": m.source, "date": m.date} for m in merged[:MAX_SOURCES]]
+    return summary, sources
+
+
+async def enrich(titles, fetcher, engines=ENGINES, budget=BUDGET, top=TOP, on_context=None):
+    """title -> Context for every title, searched on `engines` through `fetcher` (a SerpFetcher)."""
+    start = time.monotonic()
+    deadline = start + budget
+    queries, titles_of = {}, defaultdict(list)
+    for title in dict.fromkeys(titles):
+        query = query_for(title)
+        key = normalize_query(query)
+        queries.setdefault(key, query)
+        titles_of[key].append(title)
+
+    lists = defaultdict(list)
+    outcome = defaultdict(dict)
+    waiting = defaultdict(int)
+    tasks = {}
+    for key, query in queries.items():
+        for engine in engines:
+            tasks[asyncio.ensure_future(fetcher.search(engine, query))] = (key, engine)
+            waiting[key] += 1
+
+    contexts = {}
+
+    def finish(key, complete):
+        summary, sources = condense(queries[key], lists[key], top)
+        for title in titles_of[key]:
+            ctx = contexts[title] = Context(title, queries[key], summary, sources, dict(outcome[key]), complete,
+                                            round(time.monotonic() - start, 2))
+            if on_context is not None:
+                on_context(ctx)
+
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                key, engine = tasks[task]
+                try:
+                    hits, _tier = task.result()
+                    lists[key].append(hits)
+                    outcome[key][engine] = len(hits)
+                except Exception as e:
+                    outcome[key][engine] = f"{type(e).__name__}: {e}"[:200]
+                waiting[key] -= 1
+                if not waiting[key]:
+                    finish(key, True)
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+    for task in pending:
+        key, engine = tasks[task]
+        outcome[key][engine] = "timeout"
+    for key in queries:
+        if waiting[key]:
+            finish(key, False)
+    metrics.count("enrich_titles", len(contexts))
+    metrics.count("enrich_incomplete", sum(not c.complete for c in contexts.values()))
+    return contexts
@@ -0,0 +1,223 @@
+"""HTTP-first SERP fetching with automatic browser fallback.
+
+    async with SerpFetcher() as fetcher:
+        hits, tier = await fetcher.search("baidu", "礼貌太太和emogirl")
+
+Most Baidu/Sogou/Bing/Weixin result pages are server-rendered, so a plain
+pooled HTTP client (keep-alive, HTTP/2 when `h2` is installed) plus the
+offline extractor is enough. Only when the response looks blocked, empty or
+JS-gated do we escalate to a pool page. Chromium is never started unless a
+fallback actually happens.
+
+Results are cached per engine + normalized query (cache.py); refresh=True
+skips cache reads. Per-engine outcomes accumulate in STATS_PATH so the HTTP
+hit rate can be checked with `python -m scraping.fetch`.
+"""
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from urllib.parse import quote
+
+from . import metrics, replay
+from .cache import SerpCache, query_from_url
+from .pool import BrowserPool, USER_AGENT, PROFILE_ROOT
+from .blocked import classify_html
+from .ready import goto_ready
+from .serp import SerpHit, extract, parse_html, engine_for_url
+from .throttle import throttle
+
+STATS_PATH = os.path.join(os.path.dirname(PROFILE_ROOT), "fetch-stats.json")
+
+SEARCH_URLS = {
+    "baidu": "https://www.baidu.com/s?wd={q}",
+    "sogou": "https://www.sogou.com/web?query={q}",
+    "weixin": "https://weixin.sogou.com/weixin?type=2&query={q}",
+    "bing": "https://cn.bing.com/search?q={q}&ensearch=0",
+    "google": "https://www.google.com/search?q={q}&hl=zh-CN&num=20",
+}
+
+HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.6",
+}
+
+# "enable JavaScript" shells; captcha and block pages are blocked.py's job
+GATED = re.compile(r"Please enable JavaScript|请开启JavaScript")
+MIN_BODY = 2000
+
+
+def search_url(engine, query):
+    return SEARCH_URLS[engine].format(q=quote(query))
+
+
+def looks_gated(status, final_url, body, engine="default"):
+    block = classify_html(engine, final_url, status, body)
+    if block is not None:
+        return f"blocked:{block.kind}"
+    if status != 200:
+        return f"status {status}"
+    if GATED.search(body[:20000]):
+        return "js gate"
+    if len(body) < MIN_BODY:
+        return "short body"
+    return ""
+
+
+class SerpFetcher:
+    """Fetch SERPs over HTTP first, falling back to a browser page per engine."""
+
+    def __init__(self, pool=None, cache=True, refresh=False, http2=True, timeout=10.0, max_connections=20):
+        self.pool = pool
+        self._own_pool = pool is None
+        # Recorded/replayed runs must hit the network (or archive), never the live cache
+        self.cache = None if replay.mode() else SerpCache() if cache is True else (cache or None)
+        self.refresh = refresh
+        self.http2 = http2
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client = None
+        self.stats = defaultdict(Counter)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def client(self):
+        if self._client is None:
+            import httpx
+            try:
+                import h2  # noqa: F401
+                http2 = self.http2
+            except ImportError:
+                http2 = False
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                headers=HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=limits,
+                transport=replay.http_transport(http2=http2, limits=limits),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._own_pool and self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        if self.cache is not None:
+            self.cache.close()
+            self.cache = None
+        self.save_stats()
+
+    async def fetch_http(self, url, engine):
+        """Returns (hits, reason). reason is empty when the cheap path worked."""
+        async with throttle(url) as slot:
+            resp = await self.client().get(url)
+            metrics.count("http_bytes", len(resp.content), engine=engine)
+            reason = looks_gated(resp.status_code, str(resp.url), resp.text, engine)
+            slot.status(resp.status_code)
+            if reason.startswith("blocked:"):
+                slot.blocked(reason[8:])
+        if reason:
+            return [], reason
+        hits = parse_html(resp.text, engine, base_url=str(resp.url))
+        return hits, "" if hits else "no results parsed"
+
+    async def fetch_browser(self, url, engine):
+        if self.pool is None:
+            self.pool = BrowserPool()
+        async with self.pool.page(engine) as page:
+            await goto_ready(page, url, engine, timeout=20000)
+            return await extract(page, engine)
+
+    async def fetch_url(self, url, engine=None, browser_only=False):
+        """Returns (hits, tier) where tier is "cache", "http" or "browser"."""
+        engine = engine or engine_for_url(url)
+        query = query_from_url(url)
+        stats = self.stats[engine]
+        if self.cache is not None and not self.refresh:
+            cached = self.cache.get(engine, query)
+            if cached is not None:
+                stats["cache_hit"] += 1
+                metrics.count("serp_cache_hits", engine=engine)
+                return [SerpHit(**h) for h in cached], "cache"
+        hits, tier = await self._fetch(url, engine, stats, browser_only)
+        if self.cache is not None and hits:
+            self.cache.put(engine, query, [h.to_dict() for h in hits])
+        return hits, tier
+
+    async def _fetch(self, url, engine, stats, browser_only):
+        if not browser_only:
+            with metrics.span("fetch", engine=engine, tier="http") as s:
+                try:
+                    hits, reason = await self.fetch_http(url, engine)
+                except Exception as e:
+                    hits, reason = [], f"{type(e).__name__}"
+                s.set(outcome="ok" if not reason else "fallback")
+            if not reason:
+                stats["http_ok"] += 1
+                return hits, "http"
+            stats["http_fallback"] += 1
+            stats[f"reason:{reason}"] += 1
+            metrics.count("http_fallbacks", engine=engine, reason=reason)
+        try:
+            with metrics.span("fetch", engine=engine, tier="browser"):
+                hits = await self.fetch_browser(url, engine)
+        except Exception:
+            stats["browser_error"] += 1
+            raise
+        stats["browser_ok"] += 1
+        return hits, "browser"
+
+    async def search(self, engine, query, browser_only=False):
+        return await self.fetch_url(search_url(engine, query), engine, browser_only)
+
+    def save_stats(self, path=STATS_PATH):
+        """Merge this run's counters into the on-disk totals."""
+        if not self.stats:
+            return
+        totals = load_stats(path)
+        for engine, counts in self.stats.items():
+            merged = Counter(totals.get(engine, {}))
+            merged.update(counts)
+            totals[engine] = dict(merged)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(totals, f, ensure_ascii=False, indent=2)
+        self.stats.clear()
+
+
+def load_stats(path=STATS_PATH):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def hit_rates(totals=None):
+    """engine -> share of requests served by the HTTP tier."""
+    totals = load_stats() if totals is None else totals
+    rates = {}
+    for engine, counts in totals.items():
+        attempts = counts.get("http_ok", 0) + counts.get("http_fallback", 0)
+        if attempts:
+            rates[engine] = counts.get("http_ok", 0) / attempts
+    return rates
+
+
+if __name__ == "__main__":
+    totals = load_stats()
+    for engine, rate in sorted(hit_rates(totals).items()):
+        counts = totals[engine]
+        reasons = ", ".join(f"{k[7:]}={v}" for k, v in counts.items() if k.startswith("reason:"))
+        print(f"{engine:8s} http {rate:6.1%}  ok={counts.get('http_ok', 0)} fallback={counts.get('http_fallback', 0)}"
+              f" browser_ok={counts.get('browser_ok', 0)}  {reasons}")
@@ -0,0 +1,165 @@
+"""Tiny stdlib HTML tree with a CSS-selector subset, for offline parsing.
+
+Enough to run the SERP extractors against page.content(), saved pages or a
+plain HTTP response without a browser or third-party parser. Supported
+selectors: tag, .class, #id, [attr], [attr=v], [attr*=v], [attr^=v],
+[attr$=v], descendant (space), child (>) and comma groups.
+"""
+import re
+from html.parser import HTMLParser
+
+VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+SKIP_TEXT = {"script", "style", "noscript", "template"}
+BLOCK = {"address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "footer", "h1", "h2", "h3",
+         "h4", "h5", "h6", "header", "hr", "li", "ol", "p", "section", "table", "td", "th", "tr", "ul"}
+# Tags that implicitly close an open tag of the same name
+SELF_NESTING = {"p", "li", "option", "tr", "td", "th", "dt", "dd"}
+
+
+class Node:
+    __slots__ = ("tag", "attrs", "children", "parent", "classes")
+
+    def __init__(self, tag, attrs=None, parent=None):
+        self.tag = tag
+        self.attrs = attrs or {}
+        self.children = []
+        self.parent = parent
+        self.classes = set(self.attrs.get("class", "").split())
+
+    def get(self, name, default=None):
+        return self.attrs.get(name, default)
+
+    def iter(self):
+        """All descendant elements in document order."""
+        stack = list(reversed(self.children))
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Node):
+                yield node
+                stack.extend(reversed(node.children))
+
+    def text(self):
+        parts = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                parts.append(node)
+            elif node.tag not in SKIP_TEXT:
+                if node.tag in BLOCK:
+                    parts.append(" ")
+                    stack.append(" ")
+                stack.extend(reversed(node.children))
+        return re.sub(r"\s+", " ", "".join(parts)).strip()
+
+    def select(self, css):
+        groups = [_parse(g) for g in css.split(",") if g.strip()]
+        return [n for n in self.iter() if any(_matches(n, g) for g in groups)]
+
+    def select_one(self, css):
+        groups = [_parse(g) for g in css.split(",") if g.strip()]
+        for n in self.iter():
+            if any(_matches(n, g) for g in groups):
+                return n
+        return None
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document")
+        self.cur = self.root
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SELF_NESTING and self.cur.tag == tag:
+            self.cur = self.cur.parent
+        node = Node(tag, {k: (v or "") for k, v in attrs}, self.cur)
+        self.cur.children.append(node)
+        if tag not in VOID:
+            self.cur = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.cur.children.append(Node(tag, {k: (v or "") for k, v in attrs}, self.cur))
+
+    def handle_endtag(self, tag):
+        node = self.cur
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.cur = node.parent
+
+    def handle_data(self, data):
+        self.cur.children.append(data)
+
+
+def parse(html):
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+_TOKEN = re.compile(r"\s*(>)\s*|\s+|([^\s>]+)")
+_SIMPLE = re.compile(r"([a-zA-Z][\w-]*|\*)|\.([\w-]+)|#([\w-]+)|\[([\w-]+)(?:([*^$]?=)[\"']?([^\"'\]]*)[\"']?)?\]")
+
+
+def _parse_compound(text):
+    spec = {"tag": None, "classes": [], "id": None, "attrs": []}
+    for tag, cls, ident, attr, op, val in _SIMPLE.findall(text):
+        if tag and tag != "*":
+            spec["tag"] = tag.lower()
+        elif cls:
+            spec["classes"].append(cls)
+        elif ident:
+            spec["id"] = ident
+        elif attr:
+            spec["attrs"].append((attr, op, val))
+    return spec
+
+
+def _parse(group):
+    """'div.a > p b' -> [(None, div.a), ('>', p), (' ', b)] read right to left when matching."""
+    parts, comb = [], None
+    for m in _TOKEN.finditer(group.strip()):
+        if m.group(1):
+            comb = ">"
+        elif m.group(2):
+            parts.append((comb or " ", _parse_compound(m.group(2))))
+            comb = None
+    return parts
+
+
+def _match_one(node, spec):
+    if spec["tag"] and node.tag != spec["tag"]:
+        return False
+    if spec["id"] and node.attrs.get("id") != spec["id"]:
+        return False
+    if any(c not in node.classes for c in spec["classes"]):
+        return False
+    for name, op, val in spec["attrs"]:
+        have = node.attrs.get(name)
+        if have is None:
+            return False
+        if (op == "=" and have != val) or (op == "*=" and val not in have) \
+                or (op == "^=" and not have.startswith(val)) or (op == "$=" and not have.endswith(val)):
+            return False
+    return True
+
+
+def _matches(node, parts):
+    if not parts or not _match_one(node, parts[-1][1]):
+        return False
+    cur = node
+    for i in range(len(parts) - 1, 0, -1):
+        comb = parts[i][0]
+        spec = parts[i - 1][1]
+        cur = cur.parent
+        if comb == ">":
+            if cur is None or not _match_one(cur, spec):
+                return False
+        else:
+            while cur is not None and not _match_one(cur, spec):
+                cur = cur.parent
+            if cur is None:
+                return False
+    return True
@@ -0,0 +1,244 @@
+"""Merge hits for one query from several engines into a single deduplicated list.
+
+    hits = await unwrap_all(hits, fetcher.client())   # resolve baidu/sogou redirect links
+    merged = merge([baidu_hits, sogou_hits, bing_hits])
+
+Steps: unwrap redirect URLs (offline where the target is encoded in the
+link, one non-following GET otherwise), canonicalize URLs (mobile/desktop
+hosts, tracking params, fragments), group identical canonical URLs, then
+cluster near-duplicate title+snippet text with 64-bit SimHash. Clusters are
+ranked by reciprocal rank fusion over the engines that returned them.
+
+SimHash candidates come from 4 x 16-bit bands, so comparing stays roughly
+linear in the number of hits even for thousands per batch.
+"""
+import asyncio
+import base64
+import hashlib
+import re
+from dataclasses import dataclass, field, asdict
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode, unquote
+
+from .throttle import throttle
+
+RRF_K = 60
+MAX_DISTANCE = 3
+
+MOBILE_PREFIXES = ("www.", "m.", "wap.", "mobile.", "3g.")
+HOST_ALIASES = {
+    "iesdouyin.com": "douyin.com",
+    "xhslink.com": "xiaohongshu.com",
+    "weibo.cn": "weibo.com",
+}
+# Params that only ever track, on any host
+TRACKING_PARAMS = re.compile(
+    r"^(utm_\w+|spm(_id_from)?|share_\w+|shareid|share_token|vd_source|isappinstalled|tt_from|timestamp|_t)$"
+)
+# Params that track on one site but may select the content elsewhere (cid, f, tn, source, ...)
+HOST_TRACKING = {
+    "baidu.com": re.compile(r"^(rsv_\w+|tn|ie|f|fr|srcid|from)$"),
+    "douyin.com": re.compile(r"^(previous_page|enter_from|u_code|did|iid|ts|from|source|extra_params)$"),
+    "xiaohongshu.com": re.compile(r"^(xsec_token|xsec_source|app_platform|app_version|author_share|apptime)$"),
+    "weixin.qq.com": re.compile(r"^(scene|subscene|srcid|sharer_\w+|from|clicktime|enterid|ascene|chksm)$"),
+    "bilibili.com": re.compile(r"^(from|from_spmid|seid|is_story_h5|plat_id)$"),
+}
+# Links whose real target needs a request to find out
+WRAPPED = re.compile(r"^https?://(www\.)?(baidu\.com/link|sogou\.com/link|weixin\.sogou\.com/link|m\.baidu\.com/from=)")
+
+
+@dataclass
+class MergedHit:
+    url: str                # canonical URL of the best-ranked member (urls[0])
+    title: str
+    snippet: str = ""
+    source: str = ""
+    date: str = ""
+    score: float = 0.0
+    ranks: dict = field(default_factory=dict)
+    urls: list = field(default_factory=list)
+
+    @property
+    def engines(self):
+        return sorted(self.ranks)
+
+    def to_dict(self):
+        d = asdict(self)
+        d["engines"] = self.engines
+        return d
+
+
+def unwrap_offline(url):
+    """Decode redirect wrappers that carry the target in the link itself."""
+    parsed = urlparse(url)
+    params = dict(parse_qsl(parsed.query))
+    host = parsed.netloc
+    if "google." in host and parsed.path == "/url":
+        return params.get("q") or params.get("url") or url
+    if "bing.com" in host and parsed.path.startswith("/ck/a") and params.get("u", "").startswith("a1"):
+        raw = params["u"][2:]
+        try:
+            return base64.urlsafe_b64decode(raw + "=" * (-len(raw) % 4)).decode()
+        except (ValueError, UnicodeDecodeError):
+            return url
+    for name in ("url", "target", "u", "to"):
+        value = params.get(name, "")
+        if value.startswith(("http://", "https://", "http%3A", "https%3A")):
+            return unquote(value)
+    return url
+
+
+def _target_from_body(body):
+    # Sogou builds the URL in pieces: url += '...';
+    pieces = re.findall(r"url \+= '([^']*)'", body)
+    if pieces:
+        return "".join(pieces).replace("@", "")
+    m = re.search(r"""(?:location\.replace\(|location\.href\s*=\s*|URL=)['"]?([^'")\s>]+)""", body)
+    return m.group(1) if m else None
+
+
+async def resolve_wrapped(url, client):
+    """One non-following request to learn where a baidu/sogou link points."""
+    async with throttle(url) as slot:
+        resp = await client.get(url, follow_redirects=False)
+        slot.status(resp.status_code)
+    if resp.headers.get("location"):
+        return resp.headers["location"]
+    return _target_from_body(resp.text[:8000]) or url
+
+
+async def unwrap_all(hits, client=None, concurrency=16):
+    """Replace redirect-wrapped hit URLs with their targets, in place. Network only for WRAPPED links."""
+    sem = asyncio.Semaphore(concurrency)
+    resolved = {}
+
+    async def one(url):
+        async with sem:
+            try:
+                resolved[url] = await resolve_wrapped(url, client)
+            except Exception:
+                resolved[url] = url
+
+    for hit in hits:
+        hit.url = unwrap_offline(hit.url)
+    if client is not None:
+        pending = {h.url for h in hits if WRAPPED.match(h.url)}
+        await asyncio.gather(*(one(u) for u in pending))
+        for hit in hits:
+            hit.url = resolved.get(hit.url, hit.url)
+    return hits
+
+
+def canonical_url(url):
+    url = unwrap_offline(url)
+    parsed = urlparse(url.strip())
+    host = parsed.netloc.lower().split("@")[-1]
+    host = re.sub(r":(80|443)$", "", host)
+    for prefix in MOBILE_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+    host = HOST_ALIASES.get(host, host)
+    path = re.sub(r"/+", "/", parsed.path or "/")
+    # iesdouyin share pages: /share/video/<id> -> /video/<id>
+    path = re.sub(r"^/share/(video|note)/", r"/\1/", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+    site = next((d for d in HOST_TRACKING if host == d or host.endswith("." + d)), None)
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parsed.query)
+                             if not (TRACKING_PARAMS.match(k) or site and HOST_TRACKING[site].match(k))))
+    return urlunparse(("https", host, path, "", query, ""))
+
+
+def core_title(title):
+    """Drop the " - 抖音" / "_百度百科" / "| site" tail engines and reposts append."""
+    parts = [p.strip() for p in re.split(r"\s[-_|｜—]\s|_|｜", title) if p.strip()]
+    return max(parts, key=len) if parts else title
+
+
+def _features(text):
+    text = re.sub(r"[\W_]+", "", text.casefold())
+    if len(text) < 3:
+        return [text] if text else []
+    return [text[i:i + 3] for i in range(len(text) - 2)]
+
+
+def simhash(text):
+    feats = _features(text)
+    if not feats:
+        return 0
+    # Column-wise bit counts via one bit string; much faster than a per-bit Python loop
+    bits = "".join(format(int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "big"), "064b")
+                   for f in feats)
+    half = len(feats) / 2
+    value = 0
+    for pos in range(64):
+        if bits[pos::64].count("1") > half:
+            value |= 1 << (63 - pos)
+    return value
+
+
+class _UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def merge(result_lists, k=RRF_K, max_distance=MAX_DISTANCE):
+    """Fuse per-engine hit lists (SerpHit-like) for one query into ranked MergedHits."""
+    hits = [h for hits in result_lists for h in hits]
+    if not hits:
+        return []
+    uf = _UnionFind(len(hits))
+
+    by_url = {}
+    for i, h in enumerate(hits):
+        key = canonical_url(h.url)
+        if key in by_url:
+            uf.union(by_url[key], i)
+        else:
+            by_url[key] = i
+
+    # Near-duplicate text: candidates share one of four 16-bit bands
+    hashes = [simhash(f"{core_title(h.title)} {h.snippet}") for h in hits]
+    bands = {}
+    for i, sh in enumerate(hashes):
+        if not (hits[i].title or hits[i].snippet):
+            continue
+        for b in range(4):
+            for j in bands.setdefault((b, sh >> (16 * b) & 0xFFFF), []):
+                if uf.find(i) != uf.find(j) and bin(sh ^ hashes[j]).count("1") <= max_distance:
+                    uf.union(i, j)
+            bands[(b, sh >> (16 * b) & 0xFFFF)].append(i)
+
+    clusters = {}
+    for i in range(len(hits)):
+        clusters.setdefault(uf.find(i), []).append(i)
+
+    merged = []
+    for members in clusters.values():
+        members.sort(key=lambda i: hits[i].rank)
+        best = hits[members[0]]
+        ranks = {}
+        for i in members:
+            h = hits[i]
+            ranks[h.engine] = min(ranks.get(h.engine, h.rank), h.rank)
+        urls = list(dict.fromkeys(canonical_url(hits[i].url) for i in members))
+        snippet = max((hits[i].snippet for i in members), key=len)
+        merged.append(MergedHit(
+            url=urls[0], title=best.title, snippet=snippet,
+            source=next((hits[i].source for i in members if hits[i].source), ""),
+            date=next((hits[i].date for i in members if hits[i].date), ""),
+            score=sum(1.0 / (k + r) for r in ranks.values()), ranks=ranks, urls=urls,
+        ))
+    merged.sort(key=lambda m: (-m.score, min(m.ranks.values())))
+    return merged
@@ -0,0 +1,178 @@
+"""Stage timing spans and counters, exported as JSON lines and a Prometheus textfile.
+
+    from scraping import metrics
+    with metrics.span("goto", site="baidu") as s:
+        fired = await wait_ready(...)
+        s.set(ready=fired)
+    metrics.count("bytes", len(body), site="douyin")
+
+Off unless SCRAPE_METRICS (JSON-lines path, "-" for stderr) or
+SCRAPE_METRICS_PROM (textfile path for node_exporter, e.g.
+/var/lib/node_exporter/scrape-{script}.prom) is set. When off,
+span() hands back one shared no-op object and count() returns at once, so
+instrumented code pays a function call and nothing else.
+
+Every line carries the script name and pid. Span lines have name, ms,
+labels (a nested object, so a label may be called "name" or "kind") and
+the exception type if the block raised. Counter totals and
+per-span count/sum/max are written once at exit (and to the textfile).
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+METRICS_PATH = os.environ.get("SCRAPE_METRICS", "")
+SCRIPT = os.path.basename(sys.argv[0] or "python")
+# "{script}" in the textfile path keeps concurrent scripts from overwriting each other
+PROM_PATH = os.environ.get("SCRAPE_METRICS_PROM", "").replace("{script}", SCRIPT.rsplit(".", 1)[0])
+ENABLED = bool(METRICS_PATH or PROM_PATH)
+FLUSH_EVERY = 200
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **labels):
+        pass
+
+
+_NOOP = _NoSpan()
+
+
+class Span:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def set(self, **labels):
+        """Attach labels known only after the work, e.g. which ready condition fired."""
+        self.labels.update(labels)
+
+    def __exit__(self, exc_type, exc, tb):
+        _sink.span(self.name, time.perf_counter() - self.start, self.labels, exc_type.__name__ if exc_type else "")
+        return False
+
+
+class _Sink:
+    def __init__(self):
+        self.lines = []
+        self.spans = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def span(self, name, seconds, labels, error):
+        with self.lock:
+            key = self._key(name, labels)
+            agg = self.spans.setdefault(key, [0, 0.0, 0.0, 0])
+            agg[0] += 1
+            agg[1] += seconds
+            agg[2] = max(agg[2], seconds)
+            agg[3] += bool(error)
+            if METRICS_PATH:
+                line = {"ts": round(time.time(), 3), "kind": "span", "name": name, "ms": round(seconds * 1000, 2),
+                        "labels": dict(labels)}
+                if error:
+                    line["error"] = error
+                self.lines.append(line)
+                if len(self.lines) >= FLUSH_EVERY:
+                    self._flush_lines()
+
+    def count(self, name, value, labels):
+        with self.lock:
+            key = self._key(name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def _flush_lines(self):
+        if not self.lines:
+            return
+        head = {"script": SCRIPT, "pid": os.getpid()}
+        text = "".join(json.dumps({**head, **line}, ensure_ascii=False) + "\n" for line in self.lines)
+        self.lines.clear()
+        if METRICS_PATH == "-":
+            sys.stderr.write(text)
+            return
+        with open(METRICS_PATH, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def close(self):
+        with self.lock:
+            if METRICS_PATH:
+                for (name, labels), value in self.counters.items():
+                    self.lines.append({"ts": round(time.time(), 3), "kind": "counter", "name": name, "value": value,
+                                       "labels": dict(labels)})
+                for (name, labels), (n, total, worst, errors) in self.spans.items():
+                    self.lines.append({"ts": round(time.time(), 3), "kind": "summary", "name": name, "count": n,
+                                       "sum_ms": round(total * 1000, 2), "max_ms": round(worst * 1000, 2),
+                                       "errors": errors, "labels": dict(labels)})
+                self._flush_lines()
+            if PROM_PATH:
+                write_prometheus(PROM_PATH, self.spans, self.counters)
+
+
+def _prom_labels(labels):
+    pairs = [("script", SCRIPT), *labels]
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def write_prometheus(path, spans, counters):
+    out = [
+        "# HELP scrape_stage_seconds Time spent per scraping stage.",
+        "# TYPE scrape_stage_seconds summary",
+    ]
+    for (name, labels), (n, total, _worst, _errors) in sorted(spans.items()):
+        lbl = _prom_labels((("stage", name), *labels))
+        out.append(f"scrape_stage_seconds_sum{lbl} {total:.6f}")
+        out.append(f"scrape_stage_seconds_count{lbl} {n}")
+    out.append("# TYPE scrape_stage_errors_total counter")
+    for (name, labels), (_n, _total, _worst, errors) in sorted(spans.items()):
+        out.append(f"scrape_stage_errors_total{_prom_labels((('stage', name), *labels))} {errors}")
+    typed = set()
+    for (name, labels), value in sorted(counters.items()):
+        metric = "scrape_" + "".join(c if c.isalnum() else "_" for c in name) + "_total"
+        if metric not in typed:
+            typed.add(metric)
+            out.append(f"# TYPE {metric} counter")
+        out.append(f"{metric}{_prom_labels(labels)} {value}")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write("\n".join(out) + "\n")
+    os.replace(tmp, path)
+
+
+_sink = _Sink()
+if ENABLED:
+    atexit.register(_sink.close)
+
+
+def span(name, /, **labels):
+    """Context manager timing one stage. Labels should be low-cardinality (site, engine, strategy)."""
+    if not ENABLED:
+        return _NOOP
+    return Span(name, labels)
+
+
+def count(name, value=1, /, **labels):
+    if not ENABLED:
+        return
+    _sink.count(name, value, labels)
@@ -0,0 +1,146 @@
+"""Machine-readable output: one JSON object per line on stdout, written as each result is extracted.
+
+    python3 search-more.py --jsonl | node consume.js
+    SCRAPE_JSONL=1 python3 dy-batch.py urls.txt
+
+    from scraping.output import out
+    out.hits(hits, query=q, tier=tier)      # no-op unless --jsonl / SCRAPE_JSONL=1
+
+In JSON-lines mode the human-oriented prints keep working but go to stderr
+(sys.stdout is pointed at it), so stdout carries nothing but events. Every
+event has the same envelope:
+
+    {"v": 1, "type": ..., "ts": unix seconds, "script": "search-more.py", ...}
+
+and one of these bodies (fields are only ever added, never renamed):
+
+    start      args
+    serp_hit   engine rank title url snippet source date  query label tier
+    serp_merged url title snippet source date score ranks urls engines  query
+    xhs_note   id title author author_id likes cover url note_type xsec_token  keyword
+    xhs_user   id name red_id desc fans notes avatar url  keyword
+    douyin     url play_url strategy elapsed aweme_id desc author headers
+    download   path url status(downloaded|stored) aweme_id bytes  [+ elapsed mb_per_s segments resumed sha256]
+    context    title query summary sources[{title url source date}] engines{engine: n | error} complete elapsed
+    page_text  url text  label            (pages we only have raw text for)
+    progress   stage done total  [+ label ...]
+    error      stage message  [+ blocked{site kind reason url status}, query label url ...]
+    done       counts{type: n} elapsed   (also after a crash, following an error event)
+"""
+import atexit
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from .blocked import BlockedError
+
+VERSION = 1
+ENABLED = "--jsonl" in sys.argv or os.environ.get("SCRAPE_JSONL", "") == "1"
+
+
+class Output:
+    def __init__(self, enabled=ENABLED, stream=None):
+        self.enabled = enabled
+        self.counts = Counter()
+        self.progressed = Counter()
+        self.started = time.monotonic()
+        self.script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else ""
+        self.stream = None
+        self.closed = False
+        if not enabled:
+            return
+        self.stream = stream or sys.stdout
+        # Prose still prints, but on stderr; stdout is events only
+        sys.stdout = sys.stderr
+        hook = sys.excepthook
+
+        def excepthook(tp, value, tb):
+            self.error(value, stage="fatal")
+            hook(tp, value, tb)
+
+        sys.excepthook = excepthook
+        atexit.register(self.close)
+        self.event("start", args=[a for a in sys.argv[1:] if a != "--jsonl"])
+
+    def event(self, type, **fields):
+        if not self.enabled or self.closed:
+            return
+        self.counts[type] += 1
+        line = {"v": VERSION, "type": type, "ts": round(time.time(), 3), "script": self.script, **fields}
+        self.stream.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+    def hits(self, hits, query="", label="", tier=""):
+        for hit in hits:
+            self.event("serp_hit", **hit.to_dict(), query=query, label=label, tier=tier)
+
+    def merged(self, merged, query=""):
+        for m in merged:
+            self.event("serp_merged", **m.to_dict(), query=query)
+
+    def xhs_item(self, item, keyword):
+        """xhs.search on_item callback target: a Note or a User."""
+        from .xhs import Note
+        fields = item.to_dict()
+        if isinstance(item, Note):
+            # "type" is the envelope's; the note's own type (normal / video) goes out as note_type
+            fields["note_type"] = fields.pop("type")
+        self.event("xhs_note" if isinstance(item, Note) else "xhs_user", **fields, keyword=keyword)
+
+    def resolution(self, res):
+        self.event("douyin", **res.to_dict())
+
+    def download(self, path, result=None, aweme_id="", url="", **extra):
+        """A finished download.DownloadResult, a store.VideoRecord hit, or None (file written by a tool)."""
+        from .store import VideoRecord
+        if isinstance(result, VideoRecord):
+            fields = {"status": "stored", "aweme_id": result.aweme_id or aweme_id, "bytes": result.size,
+                      "sha256": result.sha256}
+        elif result is not None:
+            fields = {"status": "downloaded", "aweme_id": aweme_id, "bytes": result.bytes,
+                      "elapsed": round(result.elapsed, 2), "mb_per_s": round(result.mb_per_s, 2),
+                      "segments": result.segments, "resumed": result.resumed}
+        else:
+            fields = {"status": "downloaded", "aweme_id": aweme_id,
+                      "bytes": os.path.getsize(path) if os.path.exists(path) else 0}
+        self.event("download", path=path, url=url, **{**fields, **extra})
+
+    def context(self, ctx):
+        self.event("context", **ctx.to_dict())
+
+    def page_text(self, url, text, label=""):
+        self.event("page_text", url=url, text=text, label=label)
+
+    def progress(self, stage, done=None, total=0, **fields):
+        """`done` defaults to a running count per stage."""
+        if done is None:
+            self.progressed[stage] += 1
+            done = self.progressed[stage]
+        self.event("progress", stage=stage, done=done, total=total, **fields)
+
+    def error(self, error, stage="", **fields):
+        """An exception or message. BlockedError carries its Block as `blocked`."""
+        if isinstance(error, BlockedError):
+            fields["blocked"] = error.block.to_dict()
+        message = str(error) if isinstance(error, (str, BlockedError)) else f"{type(error).__name__}: {error}"
+        self.event("error", stage=stage, message=message, **fields)
+
+    def serp_result(self, r, query, label="", total=0):
+        """run_all on_result for SERP workers returning (hits, tier): the hits or the error, then progress."""
+        if r.ok:
+            hits, tier = r.value
+            self.hits(hits, query=query, label=label, tier=tier)
+        else:
+            self.error(r.exception or r.error, stage="search", query=query, label=label)
+        self.progress("search", total=total, label=label, ok=r.ok, elapsed=round(r.elapsed, 2))
+
+    def close(self):
+        if not self.enabled or self.closed:
+            return
+        self.event("done", counts=dict(self.counts), elapsed=round(time.monotonic() - self.started, 2))
+        self.closed = True
+
+
+out = Output()
@@ -0,0 +1,243 @@
+"""Warm Chromium pool: one pre-configured context per site, pages leased out and returned.
+
+Usage:
+    async with BrowserPool() as pool:
+        async with pool.page("baidu") as page:
+            await page.goto(...)
+
+Each site gets a persistent profile directory (cookies, localStorage and the
+Chromium disk cache survive between runs, so static assets are not refetched).
+If a profile is locked by another process we fall back to a plain context on
+a shared browser, seeded from the site's storage_state file.
+
+Request blocking (routing.py) is opt-in per site, because Playwright
+disables the HTTP cache for a routed context and the warm profile's disk
+cache stops serving that site's scripts and styles. It is on for Douyin and
+XHS, whose pages pull megabytes of video previews and images per visit, and
+off for the SERP sites, whose repeat visits are mostly cached assets. Pass
+block=True / block=False to force it for every site; per-site counters are
+in pool.route_stats.
+
+SCRAPE_RECORD / SCRAPE_REPLAY switch every context to recording or offline
+replay (replay.py).
+
+Contexts are seeded from the cookie vault (session.py) and their cookies
+are written back to it on close; pass vault=None to opt out.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from . import metrics
+from .routing import install_policy
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+VIEWPORT = {"width": 1280, "height": 800}
+LOCALE = "zh-CN"
+
+PROFILE_ROOT = os.environ.get("SCRAPE_PROFILE_DIR", os.path.expanduser("~/.cache/mrlee-scraping/profiles"))
+HEADLESS = os.environ.get("SCRAPE_HEADLESS", "1") != "0"
+DISK_CACHE_MB = 256
+
+# Per-site context settings. Anything not listed uses "default".
+SITES = {
+    "default": {},
+    "baidu": {"home": "https://www.baidu.com"},
+    "sogou": {"home": "https://www.sogou.com"},
+    "weixin": {"home": "https://weixin.sogou.com"},
+    "bing": {"home": "https://cn.bing.com"},
+    "google": {"home": "https://www.google.com"},
+    "xhs": {"home": "https://www.xiaohongshu.com", "block": True},
+    "douyin": {"home": "https://www.douyin.com", "extra_headers": {"Referer": "https://www.douyin.com/"},
+               "block": True},
+}
+
+
+def site_dir(site):
+    return os.path.join(PROFILE_ROOT, site)
+
+
+def storage_state_path(site):
+    return os.path.join(site_dir(site), "state.json")
+
+
+class BrowserPool:
+    """Keeps Chromium contexts warm and hands out pages per site."""
+
+    def __init__(self, headless=HEADLESS, persistent=True, block=None, max_pages_per_site=4, max_idle_pages=2,
+                 vault=True):
+        if vault is True:
+            from .session import SessionVault
+            vault = SessionVault()
+        self.vault = vault
+        self.headless = headless
+        self.persistent = persistent
+        self.block = block
+        self.max_pages_per_site = max_pages_per_site
+        self.max_idle_pages = max_idle_pages
+        self._pw = None
+        self._browser = None
+        self._contexts = {}
+        self._idle = {}
+        self._slots = {}
+        self._lock = asyncio.Lock()
+        self.route_stats = {}
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        if self._pw is None:
+            from playwright.async_api import async_playwright
+            with metrics.span("launch", kind="driver"):
+                self._pw = await async_playwright().start()
+        return self
+
+    async def close(self):
+        for site, stats in self.route_stats.items():
+            metrics.count("requests_allowed", stats.allowed, site=site)
+            metrics.count("requests_blocked", stats.blocked, site=site)
+            metrics.count("blocked_bytes_est", stats.blocked_bytes_est, site=site)
+        self.route_stats = {}
+        for site, ctx in list(self._contexts.items()):
+            try:
+                await ctx.storage_state(path=storage_state_path(site))
+                if self.vault is not None and site in SITES and site != "default":
+                    await self.vault.capture(site, ctx)
+            except Exception:
+                pass
+            try:
+                await ctx.close()
+            except Exception:
+                pass
+        self._contexts.clear()
+        self._idle.clear()
+        self._slots.clear()
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._pw:
+            await self._pw.stop()
+            self._pw = None
+
+    def _context_options(self, site):
+        conf = SITES.get(site, SITES["default"])
+        opts = {"user_agent": USER_AGENT, "viewport": VIEWPORT, "locale": LOCALE}
+        if conf.get("extra_headers"):
+            opts["extra_http_headers"] = conf["extra_headers"]
+        return opts
+
+    async def _shared_browser(self):
+        if self._browser is None:
+            await self.start()
+            with metrics.span("launch", kind="browser"):
+                self._browser = await self._pw.chromium.launch(headless=self.headless)
+        return self._browser
+
+    async def _new_context(self, site):
+        await self.start()
+        os.makedirs(site_dir(site), exist_ok=True)
+        state = storage_state_path(site)
+        opts = self._context_options(site)
+        if self.persistent:
+            try:
+                ctx = await self._pw.chromium.launch_persistent_context(
+                    os.path.join(site_dir(site), "user-data"),
+                    headless=self.headless,
+                    args=[f"--disk-cache-size={DISK_CACHE_MB * 1024 * 1024}"],
+                    **opts,
+                )
+                return ctx
+            except Exception as e:
+                # Profile is most likely in use by another script run
+                print(f"[pool] persistent profile for {site} unavailable ({str(e)[:80]}), using a fresh context")
+        browser = await self._shared_browser()
+        if os.path.exists(state):
+            opts["storage_state"] = state
+        return await browser.new_context(**opts)
+
+    def blocks(self, site):
+        """Whether `site` gets the request-blocking route: the SITES setting unless block= forces it."""
+        if self.block is not None:
+            return self.block
+        return SITES.get(site, SITES["default"]).get("block", False)
+
+    async def context(self, site="default"):
+        """Return the warm context for a site, creating it on first use."""
+        async with self._lock:
+            if site not in self._contexts:
+                with metrics.span("context", site=site):
+                    ctx = await self._new_context(site)
+                if self.vault is not None:
+                    await self.vault.seed(site, ctx)
+                if self.blocks(site):
+                    self.route_stats[site] = await install_policy(ctx, site)
+                from .replay import install
+                await install(ctx)
+                self._contexts[site] = ctx
+                self._idle[site] = []
+                self._slots[site] = asyncio.Semaphore(self.max_pages_per_site)
+            return self._contexts[site]
+
+    async def warm(self, *sites):
+        """Pre-create contexts and one idle page for each site."""
+        for site in sites:
+            ctx = await self.context(site)
+            if not self._idle[site]:
+                self._idle[site].append(await ctx.new_page())
+
+    async def acquire(self, site="default"):
+        ctx = await self.context(site)
+        await self._slots[site].acquire()
+        try:
+            idle = self._idle[site]
+            while idle:
+                page = idle.pop()
+                if not page.is_closed():
+                    return page
+            return await ctx.new_page()
+        except Exception:
+            self._slots[site].release()
+            raise
+
+    async def release(self, page, site="default", discard=False):
+        """Return a leased page. Pages with custom listeners/routes should be discarded."""
+        try:
+            from .replay import snapshot
+            await snapshot(page)
+            idle = self._idle.get(site)
+            if discard or idle is None or page.is_closed() or len(idle) >= self.max_idle_pages:
+                if not page.is_closed():
+                    await page.close()
+            else:
+                await page.goto("about:blank")
+                idle.append(page)
+        except Exception:
+            pass
+        finally:
+            if site in self._slots:
+                self._slots[site].release()
+
+    @asynccontextmanager
+    async def page(self, site="default", discard=False):
+        page = await self.acquire(site)
+        try:
+            yield page
+        finally:
+            await self.release(page, site, discard=discard)
+
+
+_shared = None
+
+
+async def get_pool(**kwargs):
+    """Process-wide pool, started on first call. Long-running callers share warm contexts through it."""
+    global _shared
+    if _shared is None:
+        _shared = BrowserPool(**kwargs)
+        await _shared.start()
+    return _shared
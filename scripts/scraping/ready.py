@@ -0,0 +1,187 @@
+"""Event-driven page readiness, replacing blind asyncio.sleep() after goto().
+
+    how = await goto_ready(page, url, "baidu")
+
+navigates with wait_until="domcontentloaded" and then returns as soon as the
+first of the site's "done" conditions holds: a result selector is attached,
+a matching XHR has completed, or the body text has stopped changing. Every
+condition has its own hard cap, so a page that never settles costs at most
+that cap instead of a full networkidle timeout. The return value names the
+condition that fired ("timeout" if none did) which is handy for tuning.
+
+Block pages (captcha, login wall) are checked as soon as the document is
+in and again if a block marker appears during the wait; either raises
+blocked.BlockedError straight away.
+"""
+import asyncio
+import re
+
+from . import metrics
+from .blocked import BlockedError, detect, selectors_for
+from .throttle import throttle, throttle_blocked
+
+TEXT_STABLE_JS = """([quiet, cap]) => new Promise(resolve => {
+    const start = performance.now();
+    let last = -1, since = start;
+    const tick = () => {
+        const n = document.body ? document.body.textContent.length : 0;
+        const now = performance.now();
+        if (n !== last) { last = n; since = now; }
+        if ((n > 0 && now - since >= quiet) || now - start >= cap) return resolve(n);
+        setTimeout(tick, 100);
+    };
+    tick();
+})"""
+
+
+class Condition:
+    """A named readiness check. `arm_before_nav` conditions start listening before goto()."""
+
+    arm_before_nav = False
+
+    def __init__(self, name, cap):
+        self.name = name
+        self.cap = cap
+
+    async def wait(self, page):
+        raise NotImplementedError
+
+
+class Selector(Condition):
+    def __init__(self, css, cap=8.0):
+        super().__init__(f"selector:{css}", cap)
+        self.css = css
+
+    async def wait(self, page):
+        await page.wait_for_selector(self.css, state="attached", timeout=self.cap * 1000)
+
+
+class Response(Condition):
+    arm_before_nav = True
+
+    def __init__(self, pattern, cap=10.0):
+        super().__init__(f"response:{pattern}", cap)
+        self.regex = re.compile(pattern)
+
+    async def wait(self, page):
+        await page.wait_for_event(
+            "requestfinished",
+            predicate=lambda req: bool(self.regex.search(req.url)),
+            timeout=self.cap * 1000,
+        )
+
+
+class BlockMarker(Selector):
+    """Any of a site's captcha/login markers attached: ends the wait so the page can be classified."""
+
+    def __init__(self, css, cap=8.0):
+        super().__init__(css, cap)
+        self.name = "blocked"
+
+
+class TextStable(Condition):
+    def __init__(self, quiet_ms=600, cap=8.0):
+        super().__init__(f"text_stable:{quiet_ms}ms", cap)
+        self.quiet_ms = quiet_ms
+
+    async def wait(self, page):
+        await page.evaluate(TEXT_STABLE_JS, [self.quiet_ms, self.cap * 1000])
+
+
+# Per-site "done" conditions. The first one to hold wins.
+SITE_CONDITIONS = {
+    "baidu": [Selector("#content_left .result, #content_left .c-container"), TextStable(800)],
+    "sogou": [Selector(".results .vrwrap, .results .rb"), TextStable(800)],
+    "weixin": [Selector(".news-list li"), TextStable(800)],
+    "bing": [Selector("#b_results .b_algo"), TextStable(800)],
+    "google": [Selector("#search .g, #rso > div"), TextStable(800)],
+    "xhs": [Response(r"/api/sns/web/v\d+/search/(notes|usersearch)"), Selector("section.note-item, .user-list-item"), TextStable(1500, cap=12.0)],
+    "douyin": [Response(r"/aweme/v\d+/web/(aweme/detail|search|general/search)"), Selector("#RENDER_DATA, video"), TextStable(1500, cap=12.0)],
+    "default": [TextStable(1000)],
+}
+
+
+def conditions_for(site):
+    return SITE_CONDITIONS.get(site, SITE_CONDITIONS["default"])
+
+
+async def _first(tasks, cap):
+    """Wait for the first condition task that succeeds; failures/timeouts just drop out."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + cap
+    pending = set(tasks)
+    fired = "timeout"
+    while pending:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        ok = [t for t in done if not t.cancelled() and t.exception() is None]
+        if ok:
+            fired = tasks[ok[0]].name
+            break
+    for t in pending:
+        t.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return fired
+
+
+async def wait_ready(page, site="default", conditions=None, armed=None):
+    """Wait until the page looks done. Returns the name of the condition that fired.
+
+    `armed` maps already-running tasks to their Condition (see goto_ready).
+    """
+    conditions = conditions if conditions is not None else conditions_for(site)
+    tasks = dict(armed or {})
+    started = set(tasks.values())
+    for cond in conditions:
+        if cond not in started:
+            tasks[asyncio.ensure_future(cond.wait(page))] = cond
+    if not tasks:
+        return "none"
+    return await _first(tasks, max(c.cap for c in tasks.values()))
+
+
+async def _blocked(page, site, url, status):
+    block = await detect(page, site, status)
+    if block is not None:
+        metrics.count("blocked", site=site, kind=block.kind)
+    return block
+
+
+async def goto_ready(page, url, site="default", conditions=None, timeout=15000, detect_blocks=True):
+    """goto() with domcontentloaded, then wait_ready(). Returns the condition that fired.
+
+    Raises BlockedError if the page is a captcha/login/rate-limit page (detect_blocks=False skips the check).
+    """
+    conditions = conditions if conditions is not None else conditions_for(site)
+    markers = selectors_for(site) if detect_blocks else []
+    if markers:
+        conditions = [*conditions, BlockMarker(", ".join(markers))]
+    armed = {asyncio.ensure_future(c.wait(page)): c for c in conditions if c.arm_before_nav}
+    status = 0
+    try:
+        async with throttle(url) as slot:
+            with metrics.span("goto", site=site):
+                resp = await page.goto(url, wait_until="domcontentloaded", timeout=timeout)
+            if resp is not None:
+                status = resp.status
+                slot.status(status)
+            block = await _blocked(page, site, url, status) if detect_blocks else None
+            if block is not None:
+                slot.blocked(block.kind)
+                raise BlockedError(block)
+    except BaseException:
+        for t in armed:
+            t.cancel()
+        await asyncio.gather(*armed, return_exceptions=True)
+        raise
+    with metrics.span("wait", site=site) as s:
+        fired = await wait_ready(page, site, conditions, armed)
+        s.set(ready=fired)
+    if fired == "blocked":
+        block = await _blocked(page, site, url, status)
+        if block is not None:
+            throttle_blocked(url, block.kind)
+            raise BlockedError(block)
+    return fired
@@ -0,0 +1,249 @@
+"""Record a scraping run to an archive and replay it offline.
+
+    SCRAPE_RECORD=/tmp/baidu.zip python search-baidu.py     # live run, saved
+    SCRAPE_REPLAY=/tmp/baidu.zip python search-baidu.py     # same run, no network
+
+Recording saves every response the browser actually receives (navigations,
+XHR/fetch, scripts; blocked types never arrive), every httpx exchange and
+an HTML snapshot of each page when it is released. The archive is a zip:
+index.json plus bodies/<sha1>, deduplicated and deflated.
+
+Replay installs a context route that fulfils requests from the archive and
+aborts anything it does not know, and gives httpx clients a transport that
+does the same, so search-*.py and the browser/httpx dy-*.py scripts
+(dy-download2.py, dy-download3.py, dy-resolve.py, dy-batch.py) run
+deterministically offline. yt-dlp and f2 use their own network stacks,
+which neither hook can see: dy-download.py refuses to run in either mode,
+and DouyinResolver leaves its ytdlp and f2 strategies out.
+Requests are matched on method + URL (+ Range), then with volatile signing
+and timestamp parameters dropped, then on host + path. Repeats of the same
+request are answered in recorded order.
+
+    python -m scraping.replay ls <archive>
+    python -m scraping.replay snapshot <archive> <n>     # dump the n-th page snapshot
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+
+RECORD_PATH = os.environ.get("SCRAPE_RECORD", "")
+REPLAY_PATH = os.environ.get("SCRAPE_REPLAY", "")
+
+VOLATILE = re.compile(
+    r"^(msToken|X-Bogus|a_bogus|_signature|verifyFp|fp|webid|ts|t|_|_t|timestamp|rnd|random|callback|cb|rsv_t|rsv_pq)$"
+)
+# Headers that no longer describe the stored (already decoded) body
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+MAX_BODY = 64 * 1024 * 1024
+
+
+def _loose(url):
+    p = urlparse(url)
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(p.query, keep_blank_values=True) if not VOLATILE.match(k)))
+    return urlunparse((p.scheme, p.netloc, p.path, "", query, ""))
+
+
+def _path_only(url):
+    p = urlparse(url)
+    return f"{p.netloc}{p.path}"
+
+
+def _clean_headers(headers):
+    return {k.lower(): v for k, v in dict(headers).items() if k.lower() not in DROP_HEADERS}
+
+
+class Archive:
+    def __init__(self, path):
+        self.path = path
+        self.entries = []
+        self.bodies = {}
+        self._cursor = {}
+        self._index = None
+
+    @classmethod
+    def load(cls, path):
+        archive = cls(path)
+        with zipfile.ZipFile(path) as z:
+            archive.entries = json.loads(z.read("index.json"))
+            for name in z.namelist():
+                if name.startswith("bodies/"):
+                    archive.bodies[name[7:]] = z.read(name)
+        return archive
+
+    def add(self, kind, method, url, status=200, headers=None, body=b"", resource_type="", range_=""):
+        if body and len(body) > MAX_BODY:
+            body = b""
+        sha = hashlib.sha1(body).hexdigest() if body else ""
+        if sha:
+            self.bodies.setdefault(sha, body)
+        self.entries.append({
+            "kind": kind, "method": method, "url": url, "range": range_, "status": status,
+            "headers": _clean_headers(headers or {}), "body": sha, "type": resource_type, "t": time.time(),
+        })
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("index.json", json.dumps(self.entries, ensure_ascii=False))
+            for sha, body in self.bodies.items():
+                z.writestr(f"bodies/{sha}", body)
+        os.replace(tmp, self.path)
+
+    def body(self, entry):
+        return self.bodies.get(entry["body"], b"")
+
+    def snapshots(self):
+        return [e for e in self.entries if e["kind"] == "snapshot"]
+
+    def _build_index(self):
+        self._index = {}
+        for i, e in enumerate(self.entries):
+            if e["kind"] == "snapshot":
+                continue
+            for key in ((e["method"], e["url"], e["range"]), ("~", e["method"], _loose(e["url"]), e["range"]),
+                        ("/", e["method"], _path_only(e["url"]), e["range"])):
+                self._index.setdefault(key, []).append(i)
+
+    def lookup(self, method, url, range_=""):
+        """Recorded entry for a request, or None. Repeats walk through recorded order, then stick to the last."""
+        if self._index is None:
+            self._build_index()
+        for key in ((method, url, range_), ("~", method, _loose(url), range_), ("/", method, _path_only(url), range_)):
+            hits = self._index.get(key)
+            if hits:
+                n = self._cursor.get(key, 0)
+                self._cursor[key] = n + 1
+                return self.entries[hits[min(n, len(hits) - 1)]]
+        return None
+
+
+_archive = None
+
+
+def mode():
+    """"record", "replay" or ""."""
+    return "replay" if REPLAY_PATH else "record" if RECORD_PATH else ""
+
+
+def archive():
+    global _archive
+    if _archive is None and mode():
+        if mode() == "replay":
+            _archive = Archive.load(REPLAY_PATH)
+        else:
+            _archive = Archive(RECORD_PATH)
+            atexit.register(_archive.save)
+    return _archive
+
+
+async def install(context):
+    """Hook a browser context into the active record/replay mode (no-op otherwise)."""
+    if not mode():
+        return
+    arc = archive()
+    if mode() == "record":
+        async def on_response(resp):
+            req = resp.request
+            try:
+                body = b"" if 300 <= resp.status < 400 else await resp.body()
+            except Exception:
+                body = b""
+            arc.add("browser", req.method, resp.url, resp.status, await resp.all_headers(), body,
+                    req.resource_type, (await req.all_headers()).get("range", ""))
+
+        context.on("response", on_response)
+        return
+
+    async def fulfil(route):
+        req = route.request
+        entry = arc.lookup(req.method, req.url, req.headers.get("range", ""))
+        if entry is None:
+            await route.abort("internetdisconnected")
+            return
+        await route.fulfill(status=entry["status"], headers=entry["headers"], body=arc.body(entry))
+
+    # Registered after the blocking policy, so it sees requests first
+    await context.route("**/*", fulfil)
+
+
+async def snapshot(page):
+    """Store the current DOM of a page (record mode only)."""
+    if mode() != "record" or page.is_closed() or page.url in ("", "about:blank"):
+        return
+    try:
+        html = await page.content()
+    except Exception:
+        return
+    archive().add("snapshot", "GET", page.url, 200, {"content-type": "text/html; charset=utf-8"}, html.encode())
+
+
+def http_transport(**kwargs):
+    """Transport for httpx.AsyncClient(transport=...) in record/replay mode; None means the default.
+
+    kwargs (http2, limits, ...) go to the real transport when recording.
+    """
+    if not mode():
+        return None
+    import httpx
+
+    class RecordingTransport(httpx.AsyncBaseTransport):
+        def __init__(self):
+            self.inner = httpx.AsyncHTTPTransport(**kwargs)
+
+        async def handle_async_request(self, request):
+            resp = await self.inner.handle_async_request(request)
+            # Decoded body, so drop content-encoding from the stored and returned headers
+            wrapped = httpx.Response(resp.status_code, headers=resp.headers, stream=resp.stream, request=request)
+            body = await wrapped.aread()
+            archive().add("http", request.method, str(request.url), resp.status_code, resp.headers, body,
+                          "http", request.headers.get("range", ""))
+            headers = {**_clean_headers(resp.headers), "content-length": str(len(body))}
+            return httpx.Response(resp.status_code, headers=headers, content=body, request=request,
+                                  extensions=resp.extensions)
+
+        async def aclose(self):
+            await self.inner.aclose()
+
+    class ReplayTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            entry = archive().lookup(request.method, str(request.url), request.headers.get("range", ""))
+            if entry is None:
+                raise httpx.ConnectError(f"not in replay archive: {request.method} {request.url}", request=request)
+            body = archive().body(entry)
+            headers = {**entry["headers"], "content-length": str(len(body))}
+            return httpx.Response(entry["status"], headers=headers, content=body, request=request)
+
+    return RecordingTransport() if mode() == "record" else ReplayTransport()
+
+
+def main(argv):
+    if len(argv) < 2:
+        print(__doc__)
+        return
+    cmd, path = argv[0], argv[1]
+    arc = Archive.load(path)
+    if cmd == "ls":
+        for i, e in enumerate(arc.entries):
+            size = len(arc.body(e))
+            rng = f" [{e['range']}]" if e["range"] else ""
+            print(f"{i:4d} {e['kind']:8s} {e['type']:10s} {e['status']} {size:>9d}  {e['method']} {e['url'][:110]}{rng}")
+        total = sum(len(b) for b in arc.bodies.values())
+        print(f"\n{len(arc.entries)} entries, {len(arc.bodies)} bodies, {total / 1024 / 1024:.1f} MB uncompressed, "
+              f"{os.path.getsize(path) / 1024 / 1024:.1f} MB on disk")
+    elif cmd == "snapshot":
+        snaps = arc.snapshots()
+        n = int(argv[2]) if len(argv) > 2 else 0
+        sys.stdout.write(arc.body(snaps[n]).decode("utf-8", "replace"))
+    else:
+        print(__doc__)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,107 @@
+"""Request blocking for scraping pages.
+
+We only ever read text or run evaluate() on these pages, so images, fonts,
+stylesheets, video previews, ads and trackers are dead weight. A RoutePolicy
+decides per request by resource type and URL; the default lets through
+documents, XHR/fetch and first-party scripts only.
+
+    stats = await install_policy(page, "baidu")
+    ...
+    print(stats.summary())
+
+Note that Playwright disables the HTTP cache for routed pages/contexts, so
+BrowserPool only routes the sites whose SITES entry sets "block" (see
+pool.py), and a page that needs its images (QR login) uses block=False.
+Blocked requests never download, so their bytes are an estimate by type.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+DEFAULT_TYPES = frozenset({"document", "xhr", "fetch", "script"})
+
+# Rough transfer sizes used to estimate what a blocked request would have cost
+EST_BYTES = {"image": 40_000, "media": 1_500_000, "font": 60_000, "stylesheet": 30_000, "script": 80_000, "other": 5_000}
+
+TRACKERS = re.compile(
+    r"hm\.baidu\.com|pos\.baidu\.com|cpro\.baidu|eclick\.baidu|sp\d?\.baidu\.com/.*/(?:ps_|w\.gif)"
+    r"|pb\.sogou\.com|ping\.(?:bing|sogou)|bat\.bing\.com|clarity\.ms"
+    r"|google-analytics|googletagmanager|doubleclick|googlesyndication"
+    r"|mcs\.zijieapi|mon\.zijieapi|mssdk\.bytedance|lf3-short\.ibytedapm|/log-sdk/|/monitor_browser/"
+    r"|apm-fe\.xiaohongshu|t\d?\.xiaohongshu\.com/api/v\d/collect|/fe_api/burdock"
+)
+
+
+@dataclass
+class RoutePolicy:
+    allow_types: frozenset = DEFAULT_TYPES
+    # Scripts are only let through from these hosts (None = any script)
+    script_hosts: re.Pattern = None
+    deny: re.Pattern = TRACKERS
+    # Always let through, checked before everything else
+    allow: re.Pattern = None
+
+    def allows(self, resource_type, url):
+        if self.allow and self.allow.search(url):
+            return True
+        if self.deny and self.deny.search(url):
+            return False
+        if resource_type not in self.allow_types:
+            return False
+        if resource_type == "script" and self.script_hosts:
+            return bool(self.script_hosts.search(url))
+        return True
+
+
+SITE_POLICIES = {
+    "default": RoutePolicy(),
+    "baidu": RoutePolicy(script_hosts=re.compile(r"//[^/]*(baidu\.com|bdstatic\.com)/")),
+    "sogou": RoutePolicy(script_hosts=re.compile(r"//[^/]*(sogou\.com|sogoucdn\.com)/")),
+    "weixin": RoutePolicy(script_hosts=re.compile(r"//[^/]*(sogou\.com|sogoucdn\.com)/")),
+    "bing": RoutePolicy(script_hosts=re.compile(r"//[^/]*(bing\.com|bing\.net)/")),
+    "google": RoutePolicy(script_hosts=re.compile(r"//[^/]*(google\.com|gstatic\.com)/")),
+    "xhs": RoutePolicy(script_hosts=re.compile(r"//[^/]*(xiaohongshu\.com|xhscdn\.com)/")),
+    "douyin": RoutePolicy(script_hosts=re.compile(r"//[^/]*(douyin\.com|douyinstatic\.com|bytescm\.com|bytegoofy\.com|pstatp\.com|snssdk\.com)/")),
+}
+
+
+def policy_for(site):
+    return SITE_POLICIES.get(site, SITE_POLICIES["default"])
+
+
+@dataclass
+class RouteStats:
+    allowed: int = 0
+    blocked: int = 0
+    blocked_bytes_est: int = 0
+    blocked_by_type: Counter = field(default_factory=Counter)
+    # Media URLs are still useful to downloaders even though we never fetch them
+    media_urls: list = field(default_factory=list)
+
+    def summary(self):
+        types = ", ".join(f"{t}={n}" for t, n in self.blocked_by_type.most_common())
+        return (f"allowed {self.allowed}, blocked {self.blocked} "
+                f"(~{self.blocked_bytes_est / 1024 / 1024:.1f} MB saved: {types})")
+
+
+async def install_policy(target, site="default", policy=None, stats=None):
+    """Route every request of a page or context through the site policy. Returns its RouteStats."""
+    policy = policy or policy_for(site)
+    stats = stats if stats is not None else RouteStats()
+
+    async def handler(route):
+        req = route.request
+        rtype = req.resource_type
+        if policy.allows(rtype, req.url):
+            stats.allowed += 1
+            await route.continue_()
+            return
+        stats.blocked += 1
+        stats.blocked_by_type[rtype] += 1
+        stats.blocked_bytes_est += EST_BYTES.get(rtype, EST_BYTES["other"])
+        if rtype == "media" and len(stats.media_urls) < 50:
+            stats.media_urls.append(req.url)
+        await route.abort("blockedbyclient")
+
+    await target.route("**/*", handler)
+    return stats
@@ -0,0 +1,195 @@
+"""Structured result extraction for Baidu, Sogou, Weixin (Sogou), Bing and Google SERPs.
+
+    hits = await extract(page, "baidu")            # one evaluate(), only records cross CDP
+    hits = parse_html(html, "sogou", base_url=url)  # same selectors, offline
+
+Both paths share ENGINES, where each field is "css selector" or
+"css selector@attribute". Baidu/Sogou links are left redirect-wrapped here;
+merge.py unwraps them.
+"""
+import re
+import time
+from dataclasses import dataclass, asdict
+from urllib.parse import urljoin, urlparse
+
+from . import html as htmlparse
+from . import metrics
+
+ENGINES = {
+    "baidu": {
+        "item": "#content_left .c-container, #content_left .result",
+        "title": "h3",
+        "url": "h3 a@href",
+        "snippet": "[class*=content-right], .c-abstract, [class*=abstract], .c-span-last",
+        "source": "[class*=source-text], .c-showurl, [class*=site-name]",
+        "date": "[class*=time], .c-color-gray2, .newTimeFactor_before_abs",
+    },
+    "sogou": {
+        "item": ".results .vrwrap, .results .rb",
+        "title": "h3",
+        "url": "h3 a@href",
+        "snippet": ".star-wiki, .str-text-info, .space-txt, .str_info, .ft",
+        "source": ".citeurl span, .citeurl, cite",
+        "date": ".cite-date, .citeurl .gray-color",
+    },
+    "weixin": {
+        "item": ".news-list > li",
+        "title": "h3",
+        "url": "h3 a@href",
+        "snippet": "p.txt-info",
+        "source": ".s-p .all-time-y2, .s-p .account",
+        "date": ".s-p@t",
+    },
+    "bing": {
+        "item": "#b_results > li.b_algo",
+        "title": "h2",
+        "url": "h2 a@href",
+        "snippet": ".b_caption p, .b_lineclamp2, .b_lineclamp3, .b_algoSlug",
+        "source": ".tptt, cite",
+        "date": ".news_dt",
+    },
+    "google": {
+        "item": "#search .g, #rso .MjjYud",
+        "title": "h3",
+        "url": "a@href",
+        "snippet": ".VwiC3b, [data-sncf], .IsZvec",
+        "source": "cite",
+        "date": ".LEwnzc span, .f",
+    },
+}
+
+HOSTS = {
+    "weixin.sogou.com": "weixin",
+    "www.sogou.com": "sogou",
+    "sogou.com": "sogou",
+    "www.baidu.com": "baidu",
+    "m.baidu.com": "baidu",
+    "cn.bing.com": "bing",
+    "www.bing.com": "bing",
+    "www.google.com": "google",
+}
+
+FIELDS = ("title", "url", "snippet", "source", "date")
+
+
+@dataclass
+class SerpHit:
+    engine: str
+    rank: int
+    title: str
+    url: str
+    snippet: str = ""
+    source: str = ""
+    date: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def engine_for_url(url):
+    return HOSTS.get(urlparse(url).netloc)
+
+
+EXTRACT_JS = r"""([cfg, fields, limit]) => {
+    const clean = s => (s || '').replace(/\s+/g, ' ').trim();
+    const pick = (root, spec) => {
+        if (!spec) return '';
+        const at = spec.lastIndexOf('@');
+        const sel = at >= 0 ? spec.slice(0, at) : spec;
+        const attr = at >= 0 ? spec.slice(at + 1) : null;
+        const el = root.querySelector(sel);
+        if (!el) return '';
+        return clean(attr ? (attr === 'href' ? el.href : el.getAttribute(attr)) : el.innerText);
+    };
+    const out = [];
+    for (const item of document.querySelectorAll(cfg.item)) {
+        // Cards nested inside another result are part of that result
+        if (item.parentElement && item.parentElement.closest(cfg.item)) continue;
+        const rec = {};
+        for (const f of fields) rec[f] = pick(item, cfg[f]);
+        if (!rec.title || !rec.url) continue;
+        if (!rec.snippet) rec.snippet = clean(item.innerText).replace(rec.title, '').trim().slice(0, 300);
+        out.push(rec);
+        if (out.length >= limit) break;
+    }
+    return out;
+}"""
+
+
+def _finish(engine, records, base_url=None):
+    hits = []
+    for rec in records:
+        url = rec["url"]
+        if base_url:
+            url = urljoin(base_url, url)
+        date = rec.get("date", "")
+        # Weixin carries a unix timestamp in the t attribute
+        if re.fullmatch(r"\d{10}", date):
+            date = time.strftime("%Y-%m-%d", time.localtime(int(date)))
+        hits.append(SerpHit(engine, len(hits) + 1, rec["title"], url,
+                            rec.get("snippet", "")[:300], rec.get("source", ""), date))
+    return hits
+
+
+async def extract(page, engine=None, limit=50):
+    """Pull typed hits out of a live page with a single evaluate()."""
+    engine = engine or engine_for_url(page.url)
+    cfg = ENGINES[engine]
+    with metrics.span("extract", engine=engine, path="page"):
+        records = await page.evaluate(EXTRACT_JS, [cfg, list(FIELDS), limit])
+    return _finish(engine, records, page.url)
+
+
+def _pick(node, spec):
+    if not spec:
+        return ""
+    sel, _, attr = spec.partition("@")
+    el = node.select_one(sel)
+    if el is None:
+        return ""
+    return (el.get(attr, "") if attr else el.text()).strip()
+
+
+def _nested(node, matched):
+    parent = node.parent
+    while parent is not None:
+        if id(parent) in matched:
+            return True
+        parent = parent.parent
+    return False
+
+
+def parse_html(html, engine=None, base_url=None, limit=50):
+    """Offline path: same extraction over page.content(), a saved page or an HTTP body."""
+    engine = engine or (base_url and engine_for_url(base_url))
+    with metrics.span("extract", engine=engine, path="html"):
+        return _parse_html(html, engine, base_url, limit)
+
+
+def _parse_html(html, engine, base_url, limit):
+    cfg = ENGINES[engine]
+    doc = htmlparse.parse(html) if isinstance(html, str) else html
+    records = []
+    items = doc.select(cfg["item"])
+    matched = {id(n) for n in items}
+    for item in items:
+        if _nested(item, matched):
+            continue
+        rec = {f: _pick(item, cfg[f]) for f in FIELDS}
+        if not rec["title"] or not rec["url"]:
+            continue
+        if not rec["snippet"]:
+            rec["snippet"] = item.text().replace(rec["title"], "", 1).strip()[:300]
+        records.append(rec)
+        if len(records) >= limit:
+            break
+    return _finish(engine, records, base_url)
+
+
+def format_hit(hit):
+    """Human-readable block for the CLI scripts."""
+    meta = " · ".join(x for x in (hit.source, hit.date) if x)
+    lines = [f"{hit.rank}. {hit.title}" + (f"  [{meta}]" if meta else ""), f"   {hit.url}"]
+    if hit.snippet:
+        lines.append(f"   {hit.snippet}")
+    return "\n".join(lines)
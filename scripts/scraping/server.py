@@ -0,0 +1,459 @@
+"""Resident scraping worker: search, download and login jobs over a local socket.
+
+    python -m scraping.server                                  # unix socket SOCKET_PATH
+    python -m scraping.server --listen=127.0.0.1:8790 --workers=4 --warm=baidu,xhs,douyin
+
+The protocol is JSON-RPC 2.0 with one JSON object per line. A job call
+
+    {"jsonrpc": "2.0", "id": 1, "method": "serp", "params": {"engine": "baidu", "query": "...", "priority": 0}}
+
+goes into a priority queue (lower runs first, FIFO within a priority). It is
+answered with the result once a worker has run it. Until then the same
+connection receives notifications such as
+
+    {"jsonrpc": "2.0", "method": "progress", "params": {"id": 1, "job": "j7", "stage": "queued", "position": 3}}
+
+Control methods skip the queue and answer at once:
+  - ping
+  - status
+  - cancel, with params {"job": "j7"} or {"id": <call id on this connection>}
+  - session.status
+
+A call without an id is a notification. Its job still runs and reports
+progress, but nothing is sent back for it: no result and no error.
+
+Closing a connection cancels the jobs it still has queued or running.
+
+The browser pool, SERP fetcher, Douyin resolver and video store are created
+once and shared by every job, so a call costs a queue dispatch instead of a
+Python start, imports and a Chromium launch. agents/utils/scraper.js is the
+Node client.
+"""
+import asyncio
+import itertools
+import json
+import os
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from . import metrics
+from .artifacts import get_artifacts
+from .batch import DEFAULT_CONCURRENCY
+from .blocked import BlockedError
+from .pool import PROFILE_ROOT
+
+SOCKET_PATH = os.environ.get("SCRAPE_SERVER", os.path.join(os.path.dirname(PROFILE_ROOT), "server.sock"))
+DEFAULT_PRIORITY = 5
+
+# JSON-RPC error codes (-32800 is the conventional "request cancelled")
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+JOB_FAILED = -32000
+BLOCKED = -32001
+CANCELLED = -32800
+
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+@dataclass(order=True)
+class Job:
+    priority: int
+    seq: int
+    id: str = field(compare=False)
+    method: str = field(compare=False)
+    params: dict = field(compare=False)
+    conn: Any = field(compare=False, repr=False)
+    request_id: Any = field(compare=False)
+    created: float = field(compare=False, default_factory=time.time)
+    started: float = field(compare=False, default=0.0)
+    task: Any = field(compare=False, default=None, repr=False)
+    cancelled: bool = field(compare=False, default=False)
+
+    def progress(self, stage, **data):
+        self.conn.notify("progress", {"id": self.request_id, "job": self.id, "stage": stage, **data})
+
+    def summary(self):
+        state = "running" if self.started else "queued"
+        since = self.started or self.created
+        return {"job": self.id, "method": self.method, "priority": self.priority, "state": state,
+                "seconds": round(time.time() - since, 1)}
+
+
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.jobs = {}  # job.id -> Job; request ids may repeat (notifications have none)
+        self._lock = asyncio.Lock()
+
+    def job(self, request_id):
+        """This connection's pending job for call `request_id`, or None."""
+        if request_id is None:
+            return None
+        return next((j for j in self.jobs.values() if j.request_id == request_id), None)
+
+    def write(self, obj):
+        # Synchronous, so notifications and replies leave in the order they were produced
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(obj, ensure_ascii=False).encode() + b"\n")
+
+    def notify(self, method, params):
+        self.write({"jsonrpc": "2.0", "method": method, "params": params})
+
+    async def reply(self, request_id, result):
+        self.write({"jsonrpc": "2.0", "id": request_id, "result": result})
+        await self.drain()
+
+    async def error(self, request_id, code, message, data=None):
+        err = {"code": code, "message": message}
+        if data is not None:
+            err["data"] = data
+        self.write({"jsonrpc": "2.0", "id": request_id, "error": err})
+        await self.drain()
+
+    async def drain(self):
+        async with self._lock:
+            try:
+                await self.writer.drain()
+            except (ConnectionError, RuntimeError):
+                pass
+
+
+# ---- job handlers: async (server, job, params) -> JSON-able result ----
+
+async def job_serp(server, job, params):
+    hits, tier = await server.fetcher.search(params["engine"], params["query"], params.get("browser_only", False))
+    return {"tier": tier, "hits": [h.to_dict() for h in hits]}
+
+
+async def job_xhs_search(server, job, params):
+    from .xhs import search
+    async with server.pool.page("xhs") as page:
+        async with get_artifacts().on_failure(page, "xhs.search", site="xhs", job=job.id):
+            result = await search(page, params["keyword"], notes=int(params.get("notes", 50)),
+                                  users=int(params.get("users", 0)))
+    return result.to_dict()
+
+
+async def job_douyin_resolve(server, job, params):
+    res = await server.resolver.resolve(params["url"], timeout=float(params.get("timeout", 60)))
+    return res.to_dict()
+
+
+async def job_douyin_download(server, job, params):
+    from .download import download
+    from .store import lookup
+    url, out = params["url"], params["out"]
+    aweme_id, hit = await lookup(url, out, server.store)
+    if hit:
+        return {"path": out, "aweme_id": aweme_id, "from_store": True, "bytes": hit.size}
+    job.progress("resolve")
+    res = await server.resolver.resolve(url)
+    job.progress("download", strategy=res.strategy)
+    result = await download(res.play_url, out, headers=res.headers, key=res.aweme_id or aweme_id,
+                            progress=lambda done, total: job.progress("download", done=done, total=total))
+    server.store.add(res.aweme_id or aweme_id, out, desc=res.desc, author=res.author, source_url=url)
+    return {"path": out, "aweme_id": res.aweme_id or aweme_id, "from_store": False, "bytes": result.bytes,
+            "elapsed": round(result.elapsed, 2), "strategy": res.strategy, "desc": res.desc, "author": res.author}
+
+
+async def job_login(server, job, params):
+    """Open the login dialog, save a QR screenshot, wait for the login cookie and store the session."""
+    from .pool import SITES, BrowserPool
+    from .ready import goto_ready
+    from .session import LOGIN_COOKIES, save_qrcode
+    site = params.get("site", "xhs")
+    wait = float(params.get("wait", 120))
+    qr_path = params.get("qrcode", f"/tmp/{site}-qrcode.png")
+    cookie = LOGIN_COOKIES.get(site)
+    if cookie is None or site not in SITES:
+        raise RpcError(INVALID_PARAMS, f"no login flow for {site}")
+    # The shared pool blocks images, and the QR code is one; login is rare enough for its own browser
+    # and it must not write a failed attempt's guest cookies over a stored login, so no vault on the pool
+    vault = server.pool.vault
+    async with BrowserPool(block=False, persistent=False, vault=None) as pool:
+        page = await pool.acquire(site)
+        await goto_ready(page, SITES[site]["home"], site, timeout=30000, detect_blocks=False)
+        try:
+            button = await page.query_selector("text=登录")
+            if button:
+                await button.click()
+        except Exception:
+            pass
+        deadline = time.monotonic() + wait
+        qr_src = None
+        while time.monotonic() < deadline:
+            if any(c["name"] == cookie for c in await page.context.cookies()):
+                session = await vault.capture(site, page.context)
+                # Hand the login to the warm context too
+                await vault.seed(site, await server.pool.context(site))
+                return {"site": site, "logged_in": True, "expires_at": session.expires_at}
+            # QR codes rotate; re-shoot (just the code) when it changes, for whoever relays it
+            src = await save_qrcode(page, site, qr_path, qr_src or "")
+            if src != qr_src:
+                qr_src = src
+                job.progress("qrcode", path=qr_path, remaining=round(deadline - time.monotonic()))
+            await asyncio.sleep(2)
+        await get_artifacts().capture(page, "login-timeout", site=site, job=job.id)
+    return {"site": site, "logged_in": False, "expires_at": 0}
+
+
+HANDLERS = {
+    "serp": job_serp,
+    "xhs.search": job_xhs_search,
+    "douyin.resolve": job_douyin_resolve,
+    "douyin.download": job_douyin_download,
+    "login": job_login,
+}
+REQUIRED = {"serp": ("engine", "query"), "xhs.search": ("keyword",), "douyin.resolve": ("url",),
+            "douyin.download": ("url", "out")}
+
+
+class JobServer:
+    def __init__(self, workers=DEFAULT_CONCURRENCY, warm=(), path=SOCKET_PATH, listen=None):
+        self.workers = workers
+        self.warm = list(warm)
+        self.path = path
+        self.listen = listen
+        self.queue = asyncio.PriorityQueue()
+        self.jobs = {}
+        self.done = 0
+        self.failed = 0
+        self._seq = itertools.count(1)
+        self._tasks = []
+        self._server = None
+        self.pool = self.fetcher = self.resolver = self.store = None
+
+    async def start(self):
+        from .douyin import DouyinResolver
+        from .fetch import SerpFetcher
+        from .pool import BrowserPool
+        from .store import VideoStore
+        self.pool = BrowserPool()
+        await self.pool.start()
+        if self.warm:
+            await self.pool.warm(*self.warm)
+            self._tasks.append(asyncio.ensure_future(self.pool.vault.keep_fresh(self.pool, self.warm)))
+        self.fetcher = SerpFetcher(pool=self.pool)
+        self.resolver = DouyinResolver(pool=self.pool)
+        self.store = VideoStore()
+        self._tasks += [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        if self.listen:
+            host, _, port = self.listen.rpartition(":")
+            self._server = await asyncio.start_server(self._serve, host or "127.0.0.1", int(port))
+        else:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._server = await asyncio.start_unix_server(self._serve, self.path)
+        return self
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if not self.listen and os.path.exists(self.path):
+                os.remove(self.path)
+        for job in list(self.jobs.values()):
+            self.cancel(job)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for closer in (self.fetcher, self.resolver):
+            if closer is not None:
+                await closer.close()
+        if self.store is not None:
+            self.store.close()
+        if self.pool is not None:
+            await self.pool.close()
+
+    # ---- queue ----
+
+    def submit(self, conn, request_id, method, params):
+        try:
+            priority = int(params.pop("priority", DEFAULT_PRIORITY))
+        except (TypeError, ValueError):
+            raise RpcError(INVALID_PARAMS, "priority must be an integer")
+        seq = next(self._seq)
+        job = Job(priority, seq, f"j{seq}", method, params, conn, request_id)
+        self.jobs[job.id] = job
+        conn.jobs[job.id] = job
+        self.queue.put_nowait(job)
+        job.progress("queued", position=self.queue.qsize())
+        return job
+
+    def cancel(self, job):
+        job.cancelled = True
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+        return True
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            if job.cancelled:
+                await self._finish(job, error=(CANCELLED, "cancelled"))
+                continue
+            job.started = time.time()
+            # Its own task, so cancel() can stop the job without stopping the worker
+            job.task = asyncio.ensure_future(self._run(job))
+            # wait() rather than await: a job cancelled here must not take the worker down with it
+            await asyncio.wait([job.task])
+            if job.task.cancelled():
+                # cancel() landed before _run started, so nothing has answered the call yet
+                await self._finish(job, error=(CANCELLED, "cancelled"))
+
+    async def _run(self, job):
+        job.progress("started", waited=round(job.started - job.created, 3))
+        try:
+            with metrics.span("job", method=job.method) as s:
+                result = await HANDLERS[job.method](self, job, job.params)
+                s.set(outcome="ok")
+        except asyncio.CancelledError:
+            await self._finish(job, error=(CANCELLED, "cancelled"))
+            return
+        except RpcError as e:
+            await self._finish(job, error=(e.code, str(e)))
+            return
+        except BlockedError as e:
+            # Typed so callers can back off or ask for a login instead of retrying blindly
+            await self._finish(job, error=(BLOCKED, str(e), e.block.to_dict()))
+            return
+        except Exception as e:
+            await self._finish(job, error=(JOB_FAILED, f"{type(e).__name__}: {str(e)[:300]}"))
+            return
+        await self._finish(job, result=result)
+
+    async def _finish(self, job, result=None, error=None):
+        self.jobs.pop(job.id, None)
+        job.conn.jobs.pop(job.id, None)
+        metrics.count("jobs", method=job.method, outcome="ok" if error is None else "error")
+        if error is None:
+            self.done += 1
+        else:
+            self.failed += error[0] != CANCELLED
+        if job.request_id is None:
+            return  # a notification: the caller asked for no answer
+        if error is None:
+            await job.conn.reply(job.request_id, result)
+        else:
+            await job.conn.error(job.request_id, *error)
+
+    # ---- connections ----
+
+    def status(self):
+        from .throttle import get_scheduler
+        return {"pid": os.getpid(), "workers": self.workers, "queued": self.queue.qsize(), "done": self.done,
+                "failed": self.failed, "jobs": sorted((j.summary() for j in self.jobs.values()),
+                                                      key=lambda j: (j["state"] != "running", j["priority"])),
+                "domains": get_scheduler().snapshot()}
+
+    async def _control(self, conn, method, params):
+        if method == "ping":
+            return "pong"
+        if method == "status":
+            return self.status()
+        if method == "cancel":
+            job = self.jobs.get(params.get("job")) if "job" in params else conn.job(params.get("id"))
+            return self.cancel(job) if job is not None else False
+        if method == "session.status":
+            sites = params.get("sites") or ["xhs", "douyin"]
+            out = {}
+            for site in sites:
+                s = self.pool.vault.load(site)
+                out[site] = {"valid": bool(s and s.valid()), "logged_in": bool(s and s.logged_in),
+                             "expires_at": s.expires_at if s else 0}
+            return out
+        raise RpcError(METHOD_NOT_FOUND, f"unknown method {method}")
+
+    async def _handle(self, conn, line):
+        try:
+            msg = json.loads(line)
+        except ValueError:
+            await conn.error(None, PARSE_ERROR, "parse error")
+            return
+        request_id = msg.get("id") if isinstance(msg, dict) else None
+        method = msg.get("method") if isinstance(msg, dict) else None
+        params = msg.get("params") or {} if isinstance(msg, dict) else None
+        if not isinstance(method, str) or not isinstance(params, dict):
+            await conn.error(request_id, INVALID_REQUEST, "expected {method, params: {...}}")
+            return
+        # From here on the message is well-formed; a notification (no id) gets no reply, errors included
+        if method in HANDLERS:
+            missing = [p for p in REQUIRED.get(method, ()) if p not in params]
+            if missing:
+                if request_id is not None:
+                    await conn.error(request_id, INVALID_PARAMS, f"missing params: {', '.join(missing)}")
+                return
+            if conn.job(request_id) is not None:
+                await conn.error(request_id, INVALID_REQUEST, f"id {request_id} already in use")
+                return
+            try:
+                self.submit(conn, request_id, method, dict(params))
+            except RpcError as e:
+                if request_id is not None:
+                    await conn.error(request_id, e.code, str(e))
+            return
+        try:
+            result = await self._control(conn, method, params)
+        except RpcError as e:
+            if request_id is not None:
+                await conn.error(request_id, e.code, str(e))
+            return
+        if request_id is not None:
+            await conn.reply(request_id, result)
+
+    async def _serve(self, reader, writer):
+        conn = Connection(reader, writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await self._handle(conn, line)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            for job in list(conn.jobs.values()):
+                self.cancel(job)
+            writer.close()
+
+
+def main(argv):
+    opts = dict(a[2:].split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    server = JobServer(workers=int(opts.get("workers", DEFAULT_CONCURRENCY)),
+                       warm=[s for s in opts.get("warm", "").split(",") if s],
+                       path=opts.get("socket", SOCKET_PATH), listen=opts.get("listen"))
+
+    async def run():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await server.start()
+        where = server.listen or server.path
+        print(f"[server] listening on {where}, {server.workers} workers, warm: {','.join(server.warm) or '-'}",
+              flush=True)
+        try:
+            await stop.wait()
+        finally:
+            await server.close()
+            print("[server] stopped", flush=True)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,252 @@
+"""Per-site cookie vault shared by browser contexts and HTTP clients.
+
+    vault = SessionVault()
+    session = await vault.get("douyin")          # browser round-trip only if stale
+    session.write_netscape("/tmp/dy-cookies.txt")
+    async with vault.client("douyin") as client: ...
+
+One JSON file per site under VAULT_DIR holds the cookies (Playwright
+format). A session's expiry is the earliest expiry among the site's key
+cookies (ttwid, msToken, web_session, ...), capped at MAX_AGE after it was
+captured. get() returns a stored session while it is valid; when it is
+inside REFRESH_AHEAD of expiring it is returned anyway and a refresh starts
+in the background, and only an expired or missing session costs an inline
+visit to the site's home page.
+
+BrowserPool seeds every new context from the vault and writes cookies back
+on close, so a QR login from xhs-login.py is used by the search scripts.
+"""
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+
+from .pool import PROFILE_ROOT, SITES, USER_AGENT
+from .replay import http_transport
+
+VAULT_DIR = os.path.join(os.path.dirname(PROFILE_ROOT), "sessions")
+REFRESH_AHEAD = 600
+
+HOUR = 3600
+MAX_AGE = {"douyin": 6 * HOUR, "xhs": 7 * 24 * HOUR, "default": 12 * HOUR}
+
+# Cookies whose expiry decides when a site's session is stale
+KEY_COOKIES = {
+    "douyin": ("ttwid", "msToken", "s_v_web_id", "sessionid"),
+    "xhs": ("web_session", "a1", "webId"),
+    "baidu": ("BAIDUID",),
+    "sogou": ("SUID", "SNUID"),
+    "weixin": ("SUID", "SNUID"),
+}
+# Without these the session is useless and must be minted again
+REQUIRED = {"douyin": ("ttwid",), "xhs": ("a1",)}
+# Present only after a real login
+LOGIN_COOKIES = {"xhs": "web_session", "douyin": "sessionid"}
+# The QR code image in each site's login dialog
+LOGIN_QR = {"xhs": ".qrcode-img, .login-container img[src^='data:image']",
+            "douyin": "#animate_qrcode_container img, [class*=qrcode] img"}
+
+# Cookie files written by older scripts; imported when newer than the vault copy
+LEGACY_FILES = {"xhs": "/root/.openclaw/workspace/data/xhs-cookies.json"}
+
+
+def write_netscape_cookies(cookies, path):
+    """Playwright cookies -> Netscape cookie file for yt-dlp/curl."""
+    with open(path, "w") as f:
+        f.write("# Netscape HTTP Cookie File\n")
+        for c in cookies:
+            domain = c.get("domain", "")
+            flag = "TRUE" if domain.startswith(".") else "FALSE"
+            secure = "TRUE" if c.get("secure") else "FALSE"
+            expires = str(max(0, int(c.get("expires", 0))))
+            f.write(f"{domain}\t{flag}\t{c.get('path', '/')}\t{secure}\t{expires}\t{c.get('name', '')}\t{c.get('value', '')}\n")
+
+
+async def save_qrcode(page, site, path, last=""):
+    """Screenshot just the login QR code to `path` when it differs from `last` (its previous src).
+
+    Returns the current src, to pass back in as `last` on the next poll. Falls
+    back to the viewport if the dialog has no recognisable QR element.
+    """
+    qr = page.locator(LOGIN_QR.get(site, "img[src^='data:image']")).first
+    try:
+        src = await qr.get_attribute("src", timeout=2000) or ""
+    except Exception:
+        src = ""
+    if src and src == last:
+        return last
+    if src:
+        await qr.screenshot(path=path)
+    else:
+        await page.screenshot(path=path)
+    return src
+
+
+@dataclass
+class Session:
+    site: str
+    cookies: list = field(default_factory=list)
+    saved_at: float = 0.0
+
+    def _live(self, now=None):
+        now = time.time() if now is None else now
+        return [c for c in self.cookies if not (c.get("expires", -1) > 0 and c["expires"] <= now)]
+
+    def names(self):
+        return {c["name"] for c in self._live()}
+
+    @property
+    def expires_at(self):
+        keys = KEY_COOKIES.get(self.site, ())
+        limit = self.saved_at + MAX_AGE.get(self.site, MAX_AGE["default"])
+        expiries = [c["expires"] for c in self.cookies if c["name"] in keys and c.get("expires", -1) > 0]
+        return min([limit, *expiries])
+
+    @property
+    def logged_in(self):
+        return LOGIN_COOKIES.get(self.site) in self.names()
+
+    def valid(self, ahead=0):
+        if not self.cookies or not set(REQUIRED.get(self.site, ())) <= self.names():
+            return False
+        return time.time() + ahead < self.expires_at
+
+    def storage_state(self):
+        """For browser.new_context(storage_state=...)."""
+        return {"cookies": self._live(), "origins": []}
+
+    def cookie_header(self):
+        return "; ".join(f"{c['name']}={c['value']}" for c in self._live())
+
+    def httpx_cookies(self):
+        import httpx
+        jar = httpx.Cookies()
+        for c in self._live():
+            jar.set(c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/"))
+        return jar
+
+    def write_netscape(self, path):
+        write_netscape_cookies(self._live(), path)
+        return path
+
+
+class SessionVault:
+    def __init__(self, root=VAULT_DIR, refresh_ahead=REFRESH_AHEAD):
+        self.root = root
+        self.refresh_ahead = refresh_ahead
+        self._locks = {}
+        self._background = {}
+
+    def path(self, site):
+        return os.path.join(self.root, f"{site}.json")
+
+    def load(self, site):
+        """Stored session (valid or not), or None."""
+        session = None
+        try:
+            with open(self.path(site)) as f:
+                data = json.load(f)
+            session = Session(site, data.get("cookies", []), data.get("saved_at", 0.0))
+        except (OSError, ValueError):
+            pass
+        legacy = LEGACY_FILES.get(site)
+        if legacy and os.path.exists(legacy) and os.path.getmtime(legacy) > (session.saved_at if session else 0):
+            try:
+                with open(legacy) as f:
+                    cookies = json.load(f)
+                session = self.save(site, cookies, saved_at=os.path.getmtime(legacy))
+            except (OSError, ValueError):
+                pass
+        return session
+
+    def save(self, site, cookies, saved_at=None):
+        session = Session(site, list(cookies), saved_at or time.time())
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.path(site) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"site": site, "saved_at": session.saved_at, "cookies": session.cookies}, f, ensure_ascii=False)
+        os.replace(tmp, self.path(site))
+        return session
+
+    async def capture(self, site, context):
+        """Store the cookies a browser context currently holds."""
+        return self.save(site, await context.cookies())
+
+    async def refresh(self, site, pool=None):
+        """Visit the site's home page once and store the resulting cookies."""
+        from .pool import BrowserPool
+        from .ready import goto_ready
+        home = SITES.get(site, {}).get("home")
+        if not home:
+            raise ValueError(f"no home page configured for {site}")
+        own = pool is None
+        pool = pool or BrowserPool()
+        try:
+            async with pool.page(site) as page:
+                await goto_ready(page, home, site, timeout=20000)
+                return await self.capture(site, page.context)
+        finally:
+            if own:
+                await pool.close()
+
+    async def get(self, site, pool=None):
+        """A valid session, refreshing inline only when the stored one is missing or expired."""
+        lock = self._locks.setdefault(site, asyncio.Lock())
+        async with lock:
+            session = self.load(site)
+            if session is not None and session.valid(self.refresh_ahead):
+                return session
+            if session is not None and session.valid() and pool is not None:
+                # Still usable: hand it out and renew behind the caller's back
+                self.refresh_in_background(site, pool)
+                return session
+            return await self.refresh(site, pool)
+
+    def refresh_in_background(self, site, pool):
+        task = self._background.get(site)
+        if task is None or task.done():
+            task = asyncio.ensure_future(self.refresh(site, pool))
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._background[site] = task
+        return task
+
+    async def keep_fresh(self, pool, sites, every=60.0):
+        """Long-running loop for resident processes: renew each site ahead of expiry."""
+        while True:
+            for site in sites:
+                session = self.load(site)
+                if session is None or not session.valid(self.refresh_ahead):
+                    try:
+                        await self.refresh(site, pool)
+                    except Exception as e:
+                        print(f"[session] refresh of {site} failed: {str(e)[:120]}")
+            await asyncio.sleep(every)
+
+    def client(self, site, **kwargs):
+        """httpx.AsyncClient carrying the stored (not refreshed) cookies for site."""
+        import httpx
+        session = self.load(site)
+        headers = {"User-Agent": USER_AGENT, **SITES.get(site, {}).get("extra_headers", {}), **kwargs.pop("headers", {})}
+        return httpx.AsyncClient(headers=headers, cookies=session.httpx_cookies() if session else None,
+                                 follow_redirects=True, transport=http_transport(), **kwargs)
+
+    async def seed(self, site, context):
+        """Add stored cookies a (possibly persistent) context is missing, e.g. a login made elsewhere."""
+        session = self.load(site)
+        if session is None or not session.cookies:
+            return
+        have = {(c["name"], c.get("domain")) for c in await context.cookies()}
+        wanted = [c for c in session._live() if (c["name"], c.get("domain")) not in have]
+        if wanted:
+            await context.add_cookies(wanted)
+
+
+if __name__ == "__main__":
+    vault = SessionVault()
+    for name in sorted(f[:-5] for f in os.listdir(vault.root) if f.endswith(".json")) if os.path.isdir(vault.root) else []:
+        s = vault.load(name)
+        left = s.expires_at - time.time()
+        state = "valid" if s.valid() else "expired"
+        login = " logged-in" if s.logged_in else ""
+        print(f"{name:8s} {state:7s}{login}  {len(s.cookies)} cookies, expires in {left / 3600:.1f}h")
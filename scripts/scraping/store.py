@@ -0,0 +1,310 @@
+"""Content-addressed store for downloaded videos, indexed by aweme ID.
+
+    store = VideoStore()
+    if store.export(aweme_id, "/tmp/douyin_video.mp4"):   # hit: copied, no network
+        ...
+    store.add(aweme_id, path, desc=res.desc, author=res.author, source_url=url)
+
+Files live under STORE_ROOT/objects/<sha256[:2]>/<sha256>.mp4, so the same
+clip reached through different IDs is kept once. A SQLite index records
+ID, desc, author, size, duration, hash and fetched_at; least-recently-used
+videos are evicted once the store exceeds max_bytes.
+
+Files go in and out of the store as independent copies (reflinks on
+filesystems that support them), so a tool editing an exported file in place
+cannot change the stored object. A stored object whose size no longer
+matches the index is dropped instead of served.
+
+    python -m scraping.store list | search <text> | show <aweme_id> | stats | evict <MB> | rm <aweme_id>
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import sys
+import time
+from dataclasses import dataclass, asdict
+
+from .pool import PROFILE_ROOT
+
+STORE_ROOT = os.environ.get("SCRAPE_VIDEO_STORE", os.path.join(os.path.dirname(PROFILE_ROOT), "videos"))
+MAX_BYTES = int(os.environ.get("SCRAPE_VIDEO_STORE_MB", "10240")) * 1024 * 1024
+HASH_CHUNK = 1024 * 1024
+
+
+@dataclass
+class VideoRecord:
+    aweme_id: str
+    desc: str
+    author: str
+    size: int
+    duration: float
+    sha256: str
+    fetched_at: float
+    source_url: str = ""
+    path: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+    def summary(self):
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.fetched_at))
+        duration = f"{self.duration:.0f}s" if self.duration else "?s"
+        return f"{self.aweme_id}  {self.size / 1024 / 1024:6.1f} MB  {duration:>5}  {when}  @{self.author}  {self.desc[:40]}"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def mp4_duration(path):
+    """Seconds from the moov/mvhd box, or 0.0 if the file is not a readable MP4."""
+    try:
+        with open(path, "rb") as f:
+            end = os.fstat(f.fileno()).st_size
+            return _find_mvhd(f, 0, end)
+    except (OSError, struct.error):
+        return 0.0
+
+
+def _find_mvhd(f, start, end):
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return 0.0
+        if kind == b"moov":
+            return _find_mvhd(f, pos + header, pos + size)
+        if kind == b"mvhd":
+            version = f.read(4)[0]
+            if version == 1:
+                f.seek(16, 1)
+                timescale, duration = struct.unpack(">IQ", f.read(12))
+            else:
+                f.seek(8, 1)
+                timescale, duration = struct.unpack(">II", f.read(8))
+            return duration / timescale if timescale else 0.0
+        pos += size
+    return 0.0
+
+
+# ioctl(dest, FICLONE, src): copy-on-write clone on btrfs / XFS / bcachefs
+FICLONE = 0x40049409
+
+
+def _place(src, dest):
+    """Copy src to dest as an independent file: a reflink where the filesystem allows, a plain copy otherwise."""
+    if os.path.exists(dest):
+        os.remove(dest)
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdest:
+        try:
+            fcntl.ioctl(fdest.fileno(), FICLONE, fsrc.fileno())
+            return
+        except OSError:
+            pass
+    shutil.copyfile(src, dest)
+
+
+class VideoStore:
+    def __init__(self, root=STORE_ROOT, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS videos ("
+            " aweme_id TEXT PRIMARY KEY, desc TEXT, author TEXT, size INTEGER, duration REAL,"
+            " sha256 TEXT, fetched_at REAL, source_url TEXT, accessed REAL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS videos_sha ON videos (sha256)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS videos_accessed ON videos (accessed)")
+        self.db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def object_path(self, sha256):
+        return os.path.join(self.root, "objects", sha256[:2], f"{sha256}.mp4")
+
+    def _record(self, row):
+        rec = VideoRecord(*row)
+        rec.path = self.object_path(rec.sha256)
+        return rec
+
+    _COLUMNS = "aweme_id, desc, author, size, duration, sha256, fetched_at, source_url"
+
+    def get(self, aweme_id):
+        """Record for aweme_id if its file is still on disk, else None."""
+        if not aweme_id:
+            return None
+        row = self.db.execute(f"SELECT {self._COLUMNS} FROM videos WHERE aweme_id=?", (aweme_id,)).fetchone()
+        if row is None:
+            return None
+        rec = self._record(row)
+        if not os.path.exists(rec.path):
+            self.db.execute("DELETE FROM videos WHERE aweme_id=?", (aweme_id,))
+            self.db.commit()
+            return None
+        if os.path.getsize(rec.path) != rec.size:
+            # Truncated or modified on disk since it was indexed; never serve a damaged object
+            self.db.execute("DELETE FROM videos WHERE sha256=?", (rec.sha256,))
+            self.db.commit()
+            self._drop_unreferenced(rec.sha256)
+            return None
+        self.db.execute("UPDATE videos SET accessed=? WHERE aweme_id=?", (time.time(), aweme_id))
+        self.db.commit()
+        return rec
+
+    def export(self, aweme_id, dest):
+        """Put the stored video at dest and return its record; None on a miss."""
+        rec = self.get(aweme_id)
+        if rec is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(dest)), exist_ok=True)
+            _place(rec.path, dest)
+        return rec
+
+    def add(self, aweme_id, path, desc="", author="", source_url="", duration=None, sha256=None):
+        """Index a downloaded file; the file at path stays where it is (the store keeps its own copy).
+
+        Returns the record, or None when there is no aweme_id to key it by.
+        """
+        if not aweme_id:
+            return None
+        sha256 = sha256 or file_sha256(path)
+        obj = self.object_path(sha256)
+        if not os.path.exists(obj):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            tmp = obj + ".tmp"
+            _place(path, tmp)
+            os.replace(tmp, obj)
+        now = time.time()
+        rec = VideoRecord(aweme_id, desc, author, os.path.getsize(obj),
+                          mp4_duration(obj) if duration is None else duration, sha256, now, source_url, obj)
+        self.db.execute(
+            f"INSERT OR REPLACE INTO videos ({self._COLUMNS}, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (rec.aweme_id, rec.desc, rec.author, rec.size, rec.duration, rec.sha256, rec.fetched_at, rec.source_url, now),
+        )
+        self.db.commit()
+        self.evict()
+        return rec
+
+    def remove(self, aweme_id):
+        row = self.db.execute("SELECT sha256 FROM videos WHERE aweme_id=?", (aweme_id,)).fetchone()
+        if row is None:
+            return False
+        self.db.execute("DELETE FROM videos WHERE aweme_id=?", (aweme_id,))
+        self._drop_unreferenced(row[0])
+        self.db.commit()
+        return True
+
+    def _drop_unreferenced(self, sha256):
+        if self.db.execute("SELECT 1 FROM videos WHERE sha256=? LIMIT 1", (sha256,)).fetchone() is None:
+            try:
+                os.remove(self.object_path(sha256))
+            except FileNotFoundError:
+                pass
+
+    def total_bytes(self):
+        # Each object counted once even if several IDs point at it
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT sha256, size FROM videos)").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        """Drop least-recently-used videos until the store is under max_bytes. Returns bytes freed."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.total_bytes()
+        freed = 0
+        if total <= max_bytes:
+            return 0
+        for aweme_id, sha256, size in self.db.execute("SELECT aweme_id, sha256, size FROM videos ORDER BY accessed").fetchall():
+            self.db.execute("DELETE FROM videos WHERE aweme_id=?", (aweme_id,))
+            if self.db.execute("SELECT 1 FROM videos WHERE sha256=? LIMIT 1", (sha256,)).fetchone() is None:
+                self._drop_unreferenced(sha256)
+                freed += size
+            if total - freed <= max_bytes:
+                break
+        self.db.commit()
+        return freed
+
+    def query(self, text="", author="", limit=50):
+        """Newest first; text matches desc or ID, author is a substring match."""
+        sql = f"SELECT {self._COLUMNS} FROM videos WHERE 1=1"
+        params = []
+        if text:
+            sql += " AND (desc LIKE ? OR aweme_id = ?)"
+            params += [f"%{text}%", text]
+        if author:
+            sql += " AND author LIKE ?"
+            params.append(f"%{author}%")
+        sql += " ORDER BY fetched_at DESC LIMIT ?"
+        params.append(limit)
+        return [self._record(row) for row in self.db.execute(sql, params)]
+
+    def stats(self):
+        videos, = self.db.execute("SELECT COUNT(*) FROM videos").fetchone()
+        objects, = self.db.execute("SELECT COUNT(DISTINCT sha256) FROM videos").fetchone()
+        return {"videos": videos, "objects": objects, "bytes": self.total_bytes(), "max_bytes": self.max_bytes,
+                "root": self.root}
+
+
+async def lookup(url, dest, store):
+    """(aweme_id, record) for a Douyin link. record is set when dest was filled from the store."""
+    from .douyin import get_aweme_id
+    try:
+        aweme_id = await get_aweme_id(url)
+    except Exception:
+        return "", None
+    return aweme_id, store.export(aweme_id, dest)
+
+
+def main(argv):
+    cmd = argv[0] if argv else "list"
+    store = VideoStore()
+    try:
+        if cmd in ("list", "search"):
+            text = " ".join(argv[1:]) if cmd == "search" else ""
+            for rec in store.query(text=text, limit=200):
+                print(rec.summary())
+        elif cmd == "author" and len(argv) > 1:
+            for rec in store.query(author=argv[1], limit=200):
+                print(rec.summary())
+        elif cmd == "show" and len(argv) > 1:
+            rec = store.get(argv[1])
+            print(json.dumps(rec.to_dict(), ensure_ascii=False, indent=2) if rec else f"{argv[1]} not in store")
+        elif cmd == "stats":
+            s = store.stats()
+            print(f"{s['videos']} videos, {s['objects']} files, {s['bytes'] / 1024 / 1024:.1f} MB"
+                  f" of {s['max_bytes'] / 1024 / 1024:.0f} MB  ({s['root']})")
+        elif cmd == "evict" and len(argv) > 1:
+            freed = store.evict(int(float(argv[1]) * 1024 * 1024))
+            print(f"freed {freed / 1024 / 1024:.1f} MB")
+        elif cmd == "rm" and len(argv) > 1:
+            print("removed" if store.remove(argv[1]) else f"{argv[1]} not in store")
+        else:
+            print(__doc__)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
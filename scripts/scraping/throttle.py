@@ -0,0 +1,254 @@
+"""Per-domain rate limits shared by every job in the process, adapted AIMD-style.
+
+    async with throttle(url) as slot:
+        resp = await client.get(url)
+        if looks_gated(...):
+            slot.blocked("captcha")
+
+Each site domain (baidu.com, sogou.com, xiaohongshu.com, douyin.com, ...)
+has a token bucket and a cap on requests in flight. The refill rate moves
+with the site's response. Every clean response adds `increase` requests/s,
+up to max_rate. A block signal halves the rate and pauses the domain for
+`cooldown` seconds: captcha, gate page, HTTP 403/429, or an explicit
+slot.blocked(). An error or exception cuts the rate by a fifth. Because the
+state lives in one process-wide Scheduler, concurrent jobs (run_all
+batches, server workers) pace each other instead of each going flat out.
+
+Loopback and bare-IP hosts (fixtures, the bench) are never limited.
+SCRAPE_THROTTLE=0 turns limiting off entirely.
+"""
+import asyncio
+import ipaddress
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from urllib.parse import urlparse
+
+from . import metrics
+
+ENABLED = os.environ.get("SCRAPE_THROTTLE", "1") != "0"
+BLOCK_FACTOR = 0.5
+ERROR_FACTOR = 0.8
+BLOCK_STATUS = {403, 429}
+
+
+@dataclass
+class Limits:
+    rate: float          # starting requests/s
+    burst: float         # bucket size
+    concurrency: int     # requests in flight
+    max_rate: float
+    min_rate: float = 0.1
+    increase: float = 0.05
+    cooldown: float = 10.0
+
+
+LIMITS = {
+    "baidu.com": Limits(rate=3, burst=5, concurrency=4, max_rate=8),
+    "sogou.com": Limits(rate=2, burst=3, concurrency=3, max_rate=5, cooldown=20),
+    "bing.com": Limits(rate=4, burst=6, concurrency=6, max_rate=10),
+    "google.com": Limits(rate=1, burst=2, concurrency=2, max_rate=3, cooldown=60),
+    "xiaohongshu.com": Limits(rate=1, burst=3, concurrency=2, max_rate=3, increase=0.02, cooldown=60),
+    "douyin.com": Limits(rate=2, burst=4, concurrency=4, max_rate=6, cooldown=30),
+    # Open API for bitable.py: documented at 50 req/s per app, writes per table are serialised anyway
+    "feishu.cn": Limits(rate=10, burst=10, concurrency=4, max_rate=40, increase=0.5, cooldown=5),
+    # CDNs, redirect targets and anything else
+    "default": Limits(rate=10, burst=20, concurrency=16, max_rate=50),
+}
+ALIASES = {"iesdouyin.com": "douyin.com", "xhscdn.com": "xiaohongshu.com"}
+# Second-level labels under which the registrable domain has three labels (xxx.com.cn)
+SLD = {"com", "net", "org", "gov", "edu", "co"}
+
+
+def domain_of(url_or_host):
+    """Registrable domain used as the limiter key, or None for loopback / IP hosts."""
+    host = urlparse(url_or_host).hostname if "//" in url_or_host else url_or_host.split(":")[0]
+    host = (host or "").lower().rstrip(".")
+    if not host or host == "localhost":
+        return None
+    try:
+        ipaddress.ip_address(host)
+        return None
+    except ValueError:
+        pass
+    labels = host.split(".")
+    n = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SLD else 2
+    domain = ".".join(labels[-n:])
+    return ALIASES.get(domain, domain)
+
+
+class DomainLimiter:
+    def __init__(self, domain, limits):
+        self.domain = domain
+        self.limits = limits
+        self.rate = limits.rate
+        self.tokens = limits.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.active = 0
+        self.ok = 0
+        self.blocks = 0
+        self.errors = 0
+        self._waiters = deque()
+
+    def _refill(self, now):
+        self.tokens = min(self.limits.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        start = time.monotonic()
+        while self.active >= self.limits.concurrency:
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                # Woken by release() but cancelled before running: hand the slot to the next waiter
+                if fut.done() and not fut.cancelled():
+                    self._wake_next()
+                raise
+            finally:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+        self.active += 1
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                else:
+                    delay = (1 - self.tokens) / self.rate
+                await asyncio.sleep(delay)
+        except BaseException:
+            self.release()
+            raise
+        waited = time.monotonic() - start
+        if waited > 0.05:
+            metrics.count("throttle_wait_ms", round(waited * 1000), domain=self.domain)
+
+    def release(self):
+        self.active -= 1
+        self._wake_next()
+
+    def _wake_next(self):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                break
+
+    def success(self):
+        self.ok += 1
+        self.rate = min(self.limits.max_rate, self.rate + self.limits.increase)
+
+    def blocked(self, reason=""):
+        """Multiplicative decrease plus a pause: the site is telling us to slow down."""
+        self.blocks += 1
+        self.rate = max(self.limits.min_rate, self.rate * BLOCK_FACTOR)
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + self.limits.cooldown)
+        metrics.count("throttle_blocks", domain=self.domain, reason=reason or "blocked")
+        print(f"[throttle] {self.domain} blocked ({reason or 'signal'}), "
+              f"rate -> {self.rate:.2f}/s, pausing {self.limits.cooldown:.0f}s")
+
+    def error(self):
+        self.errors += 1
+        self.rate = max(self.limits.min_rate, self.rate * ERROR_FACTOR)
+
+    def snapshot(self):
+        return {"rate": round(self.rate, 2), "active": self.active, "waiting": len(self._waiters),
+                "paused": max(0.0, round(self.paused_until - time.monotonic(), 1)),
+                "ok": self.ok, "blocks": self.blocks, "errors": self.errors}
+
+
+class Slot:
+    """One admitted request. Report blocked()/error() if the response says so; otherwise exit counts as success."""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.outcome = ""
+        self.reason = ""
+
+    def blocked(self, reason=""):
+        self.outcome, self.reason = "blocked", reason
+
+    def error(self):
+        self.outcome = "error"
+
+    def status(self, code):
+        """Classify an HTTP status: 403/429 block, 5xx error."""
+        if code in BLOCK_STATUS:
+            self.blocked(f"http {code}")
+        elif code >= 500:
+            self.error()
+
+    async def __aenter__(self):
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        lim = self.limiter
+        if lim is None:
+            return False
+        lim.release()
+        if self.outcome == "blocked":
+            lim.blocked(self.reason)
+        elif self.outcome == "error" or (exc_type is not None and not issubclass(exc_type, asyncio.CancelledError)):
+            lim.error()
+        elif exc_type is None:
+            lim.success()
+        return False
+
+
+class Scheduler:
+    def __init__(self, limits=None):
+        self.limits = limits or LIMITS
+        self.domains = {}
+
+    def limiter(self, url_or_host):
+        domain = domain_of(url_or_host)
+        if domain is None or not ENABLED:
+            return None
+        lim = self.domains.get(domain)
+        if lim is None:
+            conf = self.limits.get(domain) or replace(self.limits["default"])
+            lim = self.domains[domain] = DomainLimiter(domain, conf)
+        return lim
+
+    def slot(self, url_or_host):
+        return Slot(self.limiter(url_or_host))
+
+    async def wait(self, url_or_host):
+        """Take one token without holding a concurrency slot (requests the page makes on its own)."""
+        lim = self.limiter(url_or_host)
+        if lim is not None:
+            await lim.acquire()
+            lim.release()
+
+    def snapshot(self):
+        return {d: lim.snapshot() for d, lim in sorted(self.domains.items())}
+
+
+_scheduler = Scheduler()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def throttle(url_or_host):
+    """`async with throttle(url) as slot:` on the process-wide scheduler."""
+    return _scheduler.slot(url_or_host)
+
+
+def throttle_blocked(url_or_host, reason=""):
+    """Report a block seen outside a slot (e.g. in an XHR the page made itself)."""
+    lim = _scheduler.limiter(url_or_host)
+    if lim is not None:
+        lim.blocked(reason)
@@ -0,0 +1,331 @@
+"""Xiaohongshu search from the page's own search API responses.
+
+    result = await search(page, "露营", notes=200, users=20)
+    for note in result.notes: print(note.title, note.likes, note.url)
+
+The search_result page fetches /api/sns/web/v1/search/notes (and
+/search/usersearch on the user tab) as it scrolls; the browser does the
+request signing. We read those JSON bodies as they arrive, scroll until the
+wanted count is reached or has_more goes false, and never walk the DOM per
+card. If no API body was seen at all (markup-only fixture) the cards are
+read with one evaluate() instead. `on_item(note_or_user)` sees each new
+result as its page lands, up to the wanted counts. A captcha status or a "success": false
+code in place of results raises blocked.BlockedError.
+"""
+import asyncio
+import json
+import re
+from dataclasses import dataclass, asdict, field
+from urllib.parse import quote
+
+from . import metrics
+from .aweme import ResponseCapture
+from .blocked import BlockedError, classify_api
+from .ready import goto_ready
+from .throttle import get_scheduler, throttle_blocked
+
+BASE = "https://www.xiaohongshu.com"
+SEARCH_API = re.compile(r"/api/sns/web/v\d+/search/(notes|usersearch)")
+# Quiet period after a scroll before we decide the list has run out
+SCROLL_WAIT = 4.0
+MAX_IDLE_SCROLLS = 2
+
+SCROLL_JS = "() => { window.scrollBy(0, -300); window.scrollTo(0, document.documentElement.scrollHeight); }"
+
+NOTES_DOM_JS = r"""(limit) => {
+    const clean = s => (s || '').replace(/\s+/g, ' ').trim();
+    const text = (root, sel) => { const el = root.querySelector(sel); return el ? clean(el.innerText) : ''; };
+    const out = [];
+    for (const card of document.querySelectorAll('section.note-item, div.note-item')) {
+        const a = card.querySelector('a[href*="/explore/"], a[href*="/search_result/"], a[href*="/discovery/item/"]');
+        const href = a ? a.href : '';
+        const m = href.match(/\/(?:explore|search_result|discovery\/item)\/([0-9a-f]{24})/);
+        const img = card.querySelector('img');
+        const author = card.querySelector('.author-wrapper .name, .author .name, .user-name, .author');
+        const authorLink = card.querySelector('a[href*="/user/profile/"]');
+        out.push({
+            id: m ? m[1] : '', url: href, title: text(card, '.title, .note-title, .footer .title'),
+            author: author ? clean(author.innerText) : '',
+            author_id: authorLink ? (authorLink.href.match(/profile\/([0-9a-f]+)/) || ['', ''])[1] : '',
+            likes: text(card, '.like-wrapper .count, .count'), cover: img ? img.src : '',
+        });
+        if (out.length >= limit) break;
+    }
+    return out;
+}"""
+
+USERS_DOM_JS = r"""(limit) => {
+    const clean = s => (s || '').replace(/\s+/g, ' ').trim();
+    const text = (root, sel) => { const el = root.querySelector(sel); return el ? clean(el.innerText) : ''; };
+    const out = [];
+    for (const item of document.querySelectorAll('.user-list-item, .user-item')) {
+        const a = item.querySelector('a[href*="/user/profile/"]');
+        const href = a ? a.href : '';
+        const img = item.querySelector('img');
+        out.push({
+            id: (href.match(/profile\/([0-9a-f]+)/) || ['', ''])[1], url: href,
+            name: text(item, '.name, .nickname, .user-name'), desc: text(item, '.desc, .signature, .user-desc'),
+            fans: text(item, '.fans, .user-fans'), avatar: img ? img.src : '',
+        });
+        if (out.length >= limit) break;
+    }
+    return out;
+}"""
+
+
+@dataclass
+class Note:
+    id: str
+    title: str = ""
+    author: str = ""
+    author_id: str = ""
+    likes: int = 0
+    cover: str = ""
+    url: str = ""
+    type: str = ""
+    xsec_token: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class User:
+    id: str
+    name: str = ""
+    red_id: str = ""
+    desc: str = ""
+    fans: int = 0
+    notes: int = 0
+    avatar: str = ""
+    url: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class SearchResult:
+    keyword: str
+    notes: list = field(default_factory=list)
+    users: list = field(default_factory=list)
+    api_pages: int = 0
+    scrolls: int = 0
+    source: str = "api"
+    blocked: str = ""
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def count_value(text):
+    """XHS display counts -> int: "1.2万" -> 12000, "10w+" -> 100000, "" -> 0."""
+    if isinstance(text, (int, float)):
+        return int(text)
+    text = str(text or "").strip().lower().rstrip("+")
+    scale = 1
+    if text.endswith(("万", "w")):
+        scale, text = 10000, text[:-1]
+    elif text.endswith(("千", "k")):
+        scale, text = 1000, text[:-1]
+    try:
+        return int(float(text.replace(",", "")) * scale)
+    except ValueError:
+        return 0
+
+
+def note_url(note_id, xsec_token=""):
+    url = f"{BASE}/explore/{note_id}"
+    return f"{url}?xsec_token={quote(xsec_token)}&xsec_source=pc_search" if xsec_token else url
+
+
+def _https(url):
+    return "https:" + url if url.startswith("//") else url
+
+
+def parse_notes(data):
+    """search/notes JSON (str, bytes or dict) -> (notes, has_more)."""
+    data = json.loads(data) if isinstance(data, (str, bytes)) else data
+    payload = data.get("data") or {}
+    notes = []
+    for item in payload.get("items") or []:
+        card = item.get("note_card") or {}
+        # Interleaved "hot query" / ad modules carry no note_card
+        if not card or item.get("model_type", "note") != "note":
+            continue
+        user = card.get("user") or {}
+        cover = card.get("cover") or {}
+        token = item.get("xsec_token") or ""
+        notes.append(Note(
+            id=item.get("id") or card.get("note_id") or "",
+            title=card.get("display_title") or card.get("title") or "",
+            author=user.get("nickname") or user.get("nick_name") or "",
+            author_id=user.get("user_id") or "",
+            likes=count_value((card.get("interact_info") or {}).get("liked_count")),
+            cover=_https(cover.get("url_default") or cover.get("url_pre") or cover.get("url") or ""),
+            url=note_url(item.get("id") or "", token),
+            type=card.get("type") or "",
+            xsec_token=token,
+        ))
+    return notes, bool(payload.get("has_more"))
+
+
+def parse_users(data):
+    """search/usersearch JSON -> (users, has_more)."""
+    data = json.loads(data) if isinstance(data, (str, bytes)) else data
+    payload = data.get("data") or {}
+    users = []
+    for u in payload.get("users") or []:
+        uid = u.get("id") or u.get("user_id") or ""
+        users.append(User(
+            id=uid,
+            name=u.get("name") or u.get("nickname") or "",
+            red_id=u.get("red_id") or "",
+            desc=u.get("sub_title") or u.get("desc") or "",
+            fans=count_value(u.get("fans")),
+            notes=count_value(u.get("note_count")),
+            avatar=_https(u.get("image") or u.get("avatar") or ""),
+            url=f"{BASE}/user/profile/{uid}" if uid else "",
+        ))
+    return users, bool(payload.get("has_more"))
+
+
+class SearchCapture(ResponseCapture):
+    """ResponseCapture for the search API that parses bodies as they land and wakes waiters."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, on_item=None, limits=None):
+        super().__init__(SEARCH_API, max_bytes=max_bytes)
+        self.notes = {}
+        self.users = {}
+        self.on_item = on_item
+        self.limits = limits or {}
+        self.more = {"notes": True, "usersearch": True}
+        self.pages = 0
+        self.parsed = 0
+        self.block = None
+        self.arrived = asyncio.Event()
+
+    async def _on_response(self, resp):
+        if resp.status == 461 and self.pattern.search(resp.url):
+            self.block = classify_api("xhs", resp.status, None)
+            self.arrived.set()
+            return
+        await super()._on_response(resp)
+        # Handlers interleave while bodies download, so parse by index rather than "my" body
+        while self.parsed < len(self.bodies):
+            url, body = self.bodies[self.parsed]
+            self.parsed += 1
+            kind = SEARCH_API.search(url).group(1)
+            try:
+                data = json.loads(body)
+                block = classify_api("xhs", 200, data)
+                if block is not None:
+                    self.block = block
+                    self.arrived.set()
+                    continue
+                items, more = (parse_notes if kind == "notes" else parse_users)(data)
+            except (ValueError, AttributeError):
+                continue
+            for item in items:
+                if item.id:
+                    self.add(kind, item.id, item)
+            self.more[kind] = more
+            self.pages += 1
+            self.arrived.set()
+
+    def add(self, kind, key, item):
+        into = self.notes if kind == "notes" else self.users
+        if key in into:
+            return
+        into[key] = item
+        if self.on_item is not None and len(into) <= self.limits.get(kind, 0):
+            self.on_item(item)
+
+
+async def _paginate(page, capture, kind, want, stats):
+    """Scroll until `want` items of `kind` are captured, has_more is false, or scrolling stops yielding."""
+    have = capture.notes if kind == "notes" else capture.users
+    idle = 0
+    while len(have) < want and capture.more[kind] and idle < MAX_IDLE_SCROLLS and capture.block is None:
+        before = len(have)
+        capture.arrived.clear()
+        # Each scroll makes the page fire one more search request
+        await get_scheduler().wait(page.url)
+        await page.evaluate(SCROLL_JS)
+        stats.scrolls += 1
+        try:
+            await asyncio.wait_for(capture.arrived.wait(), SCROLL_WAIT)
+        except asyncio.TimeoutError:
+            pass
+        idle = idle + 1 if len(have) == before else 0
+
+
+async def search(page, keyword, notes=100, users=0, timeout=30000, base=BASE, on_item=None):
+    """Notes (and optionally users) for a keyword, from the search API the page calls itself.
+
+    notes/users are target counts; 0 skips that tab. One page is reused for both.
+    `base` points at a fixture server in the benchmarks. `on_item` is called
+    with each new Note/User as soon as it is parsed.
+    """
+    result = SearchResult(keyword)
+    capture = SearchCapture(on_item=on_item, limits={"notes": notes, "usersearch": users}).attach(page)
+    q = quote(keyword)
+    try:
+        if notes:
+            await goto_ready(page, f"{base}/search_result?keyword={q}&source=web_search_result_notes", "xhs",
+                             timeout=timeout)
+            with metrics.span("paginate", site="xhs", kind="notes"):
+                await _paginate(page, capture, "notes", notes, result)
+            if not capture.notes and capture.block is not None:
+                throttle_blocked(page.url, capture.block.kind)
+                raise BlockedError(capture.block)
+            if not capture.notes:
+                with metrics.span("extract", site="xhs", path="dom"):
+                    records = await page.evaluate(NOTES_DOM_JS, notes)
+                for rec in records:
+                    capture.add("notes", rec["id"] or rec["url"], Note(**{**rec, "likes": count_value(rec["likes"])}))
+        # The notes page sometimes fires a usersearch for its top card; only switch tabs if that is not enough
+        if users and len(capture.users) < users:
+            capture.more["usersearch"] = True
+            await goto_ready(page, f"{base}/search_result?keyword={q}&source=web_search_result_notes&type=user",
+                             "xhs", timeout=timeout)
+            with metrics.span("paginate", site="xhs", kind="users"):
+                await _paginate(page, capture, "usersearch", users, result)
+            if not capture.users and capture.block is not None:
+                throttle_blocked(page.url, capture.block.kind)
+                raise BlockedError(capture.block)
+            if not capture.users:
+                with metrics.span("extract", site="xhs", path="dom"):
+                    records = await page.evaluate(USERS_DOM_JS, users)
+                for rec in records:
+                    capture.add("usersearch", rec["id"] or rec["url"], User(
+                        id=rec["id"], name=rec["name"], desc=rec["desc"], fans=count_value(rec["fans"]),
+                        avatar=rec["avatar"], url=rec["url"]))
+    finally:
+        # Pages go back to the pool; don't leave the handler on them
+        page.remove_listener("response", capture._on_response)
+    result.notes = list(capture.notes.values())[:notes] if notes else []
+    result.users = list(capture.users.values())[:users] if users else []
+    result.api_pages = capture.pages
+    result.source = "api" if capture.pages else "dom"
+    # Blocked part-way: keep what we have, say why it stopped
+    result.blocked = str(capture.block) if capture.block is not None else ""
+    metrics.count("xhs_api_pages", capture.pages)
+    metrics.count("xhs_scrolls", result.scrolls)
+    return result
+
+
+def format_note(rank, note):
+    likes = f"❤️ {note.likes}" if note.likes else ""
+    return f"{rank}. {note.title or '(无标题)'} | 作者: {note.author} {likes}\n   {note.url}"
+
+
+def format_user(rank, user):
+    meta = " · ".join(x for x in (f"小红书号 {user.red_id}" if user.red_id else "",
+                                  f"粉丝 {user.fans}" if user.fans else "",
+                                  f"笔记 {user.notes}" if user.notes else "") if x)
+    lines = [f"{rank}. 👤 {user.name}" + (f"  [{meta}]" if meta else "")]
+    if user.desc:
+        lines.append(f"   {user.desc}")
+    lines.append(f"   {user.url}")
+    return "\n".join(lines)
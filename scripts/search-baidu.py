@@ -1,52 +1,39 @@
 #!/usr/bin/env python3
-"""Search Baidu for account info using Playwright."""
+"""Search Baidu for account info (HTTP first, Playwright fallback)."""
 import asyncio
 import sys
-from playwright.async_api import async_playwright
+from scraping.fetch import SerpFetcher
+from scraping.output import out
+from scraping.serp import format_hit
 
-KEYWORD = sys.argv[1] if len(sys.argv) > 1 else "礼貌太太和emogirl"
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+KEYWORD = ARGS[0] if ARGS else "礼貌太太和emogirl"
+# --refresh skips the SERP cache; --jsonl streams results as JSON lines (scraping/output.py)
+REFRESH = "--refresh" in sys.argv
 
-async def run():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="zh-CN"
-        )
-        page = await ctx.new_page()
-
-        # Search 1: Find the account
-        print(f"=== 百度搜索: {KEYWORD} 博主 ===")
-        url = f'https://www.baidu.com/s?wd="{KEYWORD}" 博主 抖音 小红书 粉丝'
-        await page.goto(url, wait_until="domcontentloaded", timeout=20000)
-        await asyncio.sleep(3)
-        text = await page.inner_text("body")
-        # Filter out noise
-        lines = [l.strip() for l in text.split('\n') if l.strip() and len(l.strip()) > 5]
-        for line in lines[:80]:
-            print(line)
-
-        # Search 2: Find similar accounts
-        print(f"\n\n=== 百度搜索: 类似 {KEYWORD} 的账号 ===")
-        url2 = f'https://www.baidu.com/s?wd="{KEYWORD}" 类似 同类 账号 推荐'
-        await page.goto(url2, wait_until="domcontentloaded", timeout=20000)
-        await asyncio.sleep(3)
-        text2 = await page.inner_text("body")
-        lines2 = [l.strip() for l in text2.split('\n') if l.strip() and len(l.strip()) > 5]
-        for line in lines2[:80]:
-            print(line)
+SEARCHES = [
+    # Search 1: Find the account
+    (f"{KEYWORD} 博主", f'"{KEYWORD}" 博主 抖音 小红书 粉丝'),
+    # Search 2: Find similar accounts
+    (f"类似 {KEYWORD} 的账号", f'"{KEYWORD}" 类似 同类 账号 推荐'),
+    # Search 3: The content style - personality contrast duo accounts
+    ("反差人设 闺蜜 情侣 博主推荐", '反差人设 闺蜜博主 emo 礼貌 搞笑 抖音 小红书 推荐 账号'),
+]
 
-        # Search 3: The content style - personality contrast duo accounts
-        print(f"\n\n=== 百度搜索: 反差人设 闺蜜 情侣 博主推荐 ===")
-        url3 = 'https://www.baidu.com/s?wd=反差人设 闺蜜博主 emo 礼貌 搞笑 抖音 小红书 推荐 账号'
-        await page.goto(url3, wait_until="domcontentloaded", timeout=20000)
-        await asyncio.sleep(3)
-        text3 = await page.inner_text("body")
-        lines3 = [l.strip() for l in text3.split('\n') if l.strip() and len(l.strip()) > 5]
-        for line in lines3[:80]:
-            print(line)
-
-        await browser.close()
+async def run():
+    async with SerpFetcher(refresh=REFRESH) as fetcher:
+        for i, (label, query) in enumerate(SEARCHES):
+            if i:
+                print("\n")
+            print(f"=== 百度搜索: {label} ===")
+            try:
+                hits, tier = await fetcher.search("baidu", query)
+            except Exception as e:
+                print(f"Error: {e}")
+                out.error(e, stage="search", query=query, label=label)
+                continue
+            out.hits(hits, query=query, label=label, tier=tier)
+            for hit in hits:
+                print(format_hit(hit))
 
 asyncio.run(run())
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
 """More targeted searches for 礼貌太太和emogirl and similar accounts."""
 import asyncio
-from playwright.async_api import async_playwright
+import sys
+from scraping.batch import run_all
+from scraping.fetch import SerpFetcher
+from scraping.output import out
+from scraping.serp import format_hit
 
 SEARCHES = [
     '礼貌太太和emogirl 抖音号',
@@ -11,41 +15,23 @@ SEARCHES = [
     '小红书 反差闺蜜 双人博主 推荐 2025 酷girl 温柔',
     '抖音 情侣反差 夫妻搞笑 博主推荐 一个温柔一个暴躁',
 ]
+# --refresh skips the SERP cache; --jsonl streams results as JSON lines (scraping/output.py)
+REFRESH = "--refresh" in sys.argv
 
 async def run():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="zh-CN"
-        )
-        page = await ctx.new_page()
+    async with SerpFetcher(refresh=REFRESH) as fetcher:
+        results = await run_all(SEARCHES, lambda query: fetcher.search("baidu", query),
+                                on_result=lambda r: out.serp_result(r, r.item, "", len(SEARCHES)))
 
-        for query in SEARCHES:
-            print(f"\n{'='*50}")
-            print(f"搜索: {query}")
-            print('='*50)
-            url = f'https://www.baidu.com/s?wd={query}'
-            try:
-                await page.goto(url, wait_until="domcontentloaded", timeout=15000)
-                await asyncio.sleep(2)
-                text = await page.inner_text("body")
-                lines = [l.strip() for l in text.split('\n') if l.strip() and len(l.strip()) > 10]
-                skip = ['百度', '广告', '换一换', '搜索设置', '输入法', '帮助举报', '用户反馈', '企业推广', '京ICP', '使用百度']
-                printed = 0
-                for line in lines:
-                    if printed >= 40:
-                        break
-                    if any(s in line for s in skip):
-                        continue
-                    if '实时热点' in line or '资讯' == line.strip():
-                        continue
-                    print(line)
-                    printed += 1
-            except Exception as e:
-                print(f"Error: {e}")
-
-        await browser.close()
+    for r in results:
+        print(f"\n{'='*50}")
+        print(f"搜索: {r.item}")
+        print('='*50)
+        if r.ok:
+            hits, tier = r.value
+            print(f"[{tier}, {r.elapsed:.1f}s]")
+            print('\n'.join(format_hit(h) for h in hits) or '(no results)')
+        else:
+            print(f"Error: {r.error}")
 
 asyncio.run(run())
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Search one keyword on several engines and print a single deduplicated, rank-fused list."""
+import asyncio
+import sys
+from scraping.batch import run_all
+from scraping.fetch import SerpFetcher
+from scraping.merge import merge, unwrap_all
+from scraping.output import out
+
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+KEYWORD = ARGS[0] if ARGS else "礼貌太太和emogirl"
+ENGINES = ARGS[1].split(",") if len(ARGS) > 1 else ["baidu", "sogou", "bing"]
+# --refresh skips the SERP cache; --jsonl streams per-engine hits, then the fused list, as JSON lines
+REFRESH = "--refresh" in sys.argv
+
+async def run():
+    async with SerpFetcher(refresh=REFRESH) as fetcher:
+        results = await run_all(ENGINES, lambda engine: fetcher.search(engine, KEYWORD),
+                                on_result=lambda r: out.serp_result(r, KEYWORD, r.item, len(ENGINES)))
+        lists = []
+        for r in results:
+            if r.ok:
+                hits, tier = r.value
+                print(f"{r.item}: {len(hits)} hits [{tier}, {r.elapsed:.1f}s]")
+                lists.append(hits)
+            else:
+                print(f"{r.item}: Error: {r.error}")
+        await unwrap_all([h for hits in lists for h in hits], fetcher.client())
+
+    merged = merge(lists)
+    out.merged(merged, query=KEYWORD)
+    total = sum(len(hits) for hits in lists)
+    print(f"\n=== {KEYWORD}: {total} hits -> {len(merged)} unique ===")
+    for i, m in enumerate(merged, 1):
+        ranks = " ".join(f"{e}#{r}" for e, r in sorted(m.ranks.items()))
+        print(f"{i}. {m.title}  [{ranks}]")
+        print(f"   {m.url}")
+        if m.snippet:
+            print(f"   {m.snippet}")
+
+asyncio.run(run())
@@ -1,7 +1,11 @@
 #!/usr/bin/env python3
-"""Search via Sogou and Bing with Playwright."""
+"""Search via Sogou and Bing (HTTP first, Playwright fallback)."""
 import asyncio
-from playwright.async_api import async_playwright
+import sys
+from scraping.batch import run_all
+from scraping.fetch import SerpFetcher
+from scraping.output import out
+from scraping.serp import format_hit
 
 SEARCHES = [
     ('https://www.sogou.com/web?query="礼貌太太和emogirl"+抖音+小红书', '搜狗-精确'),
@@ -9,35 +13,23 @@ SEARCHES = [
     ('https://www.sogou.com/web?query=抖音+性格反差+闺蜜组合+搞笑博主+推荐+类似方圆阿爆', '搜狗-类似方圆'),
     ('https://cn.bing.com/search?q=%22%E7%A4%BC%E8%B2%8C%E5%A4%AA%E5%A4%AA%E5%92%8Cemogirl%22+%E6%8A%96%E9%9F%B3+%E5%B0%8F%E7%BA%A2%E4%B9%A6&ensearch=0', '必应-精确'),
 ]
+# --refresh skips the SERP cache; --jsonl streams results as JSON lines (scraping/output.py)
+REFRESH = "--refresh" in sys.argv
 
 async def run():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="zh-CN"
-        )
-        page = await ctx.new_page()
+    async with SerpFetcher(refresh=REFRESH) as fetcher:
+        results = await run_all(SEARCHES, lambda search: fetcher.fetch_url(search[0]),
+                                on_result=lambda r: out.serp_result(r, r.item[0], r.item[1], len(SEARCHES)))
 
-        for url, label in SEARCHES:
-            print(f"\n{'='*50}")
-            print(f"{label}")
-            print('='*50)
-            try:
-                await page.goto(url, wait_until="domcontentloaded", timeout=15000)
-                await asyncio.sleep(3)
-                text = await page.inner_text("body")
-                lines = [l.strip() for l in text.split('\n') if l.strip() and len(l.strip()) > 10]
-                printed = 0
-                for line in lines:
-                    if printed >= 50:
-                        break
-                    print(line)
-                    printed += 1
-            except Exception as e:
-                print(f"Error: {e}")
-
-        await browser.close()
+    for r in results:
+        print(f"\n{'='*50}")
+        print(f"{r.item[1]}")
+        print('='*50)
+        if r.ok:
+            hits, tier = r.value
+            print(f"[{tier}, {r.elapsed:.1f}s]")
+            print('\n'.join(format_hit(h) for h in hits) or '(no results)')
+        else:
+            print(f"Error: {r.error}")
 
 asyncio.run(run())
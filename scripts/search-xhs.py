@@ -1,73 +1,66 @@
 #!/usr/bin/env python3
-"""Search Xiaohongshu for account info and similar accounts using Playwright."""
+"""Search Xiaohongshu notes and users from the page's search API responses.
+
+Usage: search-xhs.py [keyword] [--notes=50] [--users=10] [--json | --jsonl]
+
+--json prints one document at the end; --jsonl streams each note/user as it
+is parsed (scraping/output.py).
+"""
 import asyncio
 import json
 import sys
-from playwright.async_api import async_playwright
-
-KEYWORD = sys.argv[1] if len(sys.argv) > 1 else "礼貌太太和emogirl"
+from scraping import BrowserPool
+from scraping.blocked import BlockedError
+from scraping.output import out
+from scraping.xhs import search, format_note, format_user
 
-async def search_xhs(keyword):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="zh-CN"
-        )
-        page = await ctx.new_page()
-
-        # Search for notes
-        print(f"=== 小红书搜索: {keyword} ===")
-        url = f"https://www.xiaohongshu.com/search_result?keyword={keyword}&source=web_search_result_notes"
-        await page.goto(url, wait_until="networkidle", timeout=30000)
-        await asyncio.sleep(3)
+def opt(name, default):
+    for a in sys.argv[1:]:
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+    return default
 
-        # Try to get note cards
-        notes = await page.query_selector_all('section.note-item, div.note-item, a[href*="/explore/"]')
-        print(f"Found {len(notes)} note items")
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+KEYWORD = ARGS[0] if ARGS else "礼貌太太和emogirl"
+NOTES = int(opt("notes", "50"))
+USERS = int(opt("users", "10"))
+AS_JSON = "--json" in sys.argv
 
-        results = []
-        for note in notes[:20]:
-            try:
-                title_el = await note.query_selector('.title, .note-title, span')
-                author_el = await note.query_selector('.author-wrapper .name, .user-name, .author')
-                title = await title_el.inner_text() if title_el else ""
-                author = await author_el.inner_text() if author_el else ""
-                href = await note.get_attribute('href') or ""
-                if title or author:
-                    results.append({"title": title.strip(), "author": author.strip(), "href": href})
-                    print(f"  📝 {title.strip()} | 作者: {author.strip()}")
-            except:
-                pass
+async def search_xhs(keyword):
+    async with BrowserPool() as pool:
+        session = pool.vault.load("xhs")
+        if not AS_JSON:
+            print("🔑 使用已登录会话" if session and session.logged_in else "⚠️ 未登录 (运行 xhs-login.py 扫码登录)")
+        try:
+            async with pool.page("xhs") as page:
+                result = await search(page, keyword, notes=NOTES, users=USERS,
+                                      on_item=lambda item: out.xhs_item(item, keyword))
+        except BlockedError as e:
+            out.error(e, stage="search", keyword=keyword)
+            if AS_JSON:
+                print(json.dumps({"keyword": keyword, "blocked": e.block.to_dict()}, ensure_ascii=False))
+            else:
+                print(f"🚫 被拦截: {e.block} (登录墙请运行 xhs-login.py)")
+            return
 
-        # Also try to get user results
-        print(f"\n=== 小红书用户搜索: {keyword} ===")
-        user_url = f"https://www.xiaohongshu.com/search_result?keyword={keyword}&source=web_search_result_notes&type=user"
-        await page.goto(user_url, wait_until="networkidle", timeout=30000)
-        await asyncio.sleep(3)
+    if AS_JSON:
+        print(json.dumps(result.to_dict(), ensure_ascii=False, indent=2))
+        return
 
-        users = await page.query_selector_all('.user-list-item, .user-item, div[class*="user"]')
-        print(f"Found {len(users)} user items")
-        for user in users[:10]:
-            try:
-                name_el = await user.query_selector('.name, .nickname, span')
-                desc_el = await user.query_selector('.desc, .signature, p')
-                name = await name_el.inner_text() if name_el else ""
-                desc = await desc_el.inner_text() if desc_el else ""
-                if name:
-                    print(f"  👤 {name.strip()} | {desc.strip()}")
-            except:
-                pass
+    print(f"=== 小红书搜索: {keyword} ({len(result.notes)} 笔记, {result.api_pages} 页 API, "
+          f"{result.scrolls} 次滚动, 来源 {result.source}) ===")
+    for i, note in enumerate(result.notes, 1):
+        print(format_note(i, note))
 
-        # Get page content as fallback
-        content = await page.content()
-        # Extract any visible text
-        text = await page.inner_text('body')
-        if len(results) == 0 and len(users) == 0:
-            print("\n=== 页面文本 (前2000字) ===")
-            print(text[:2000])
+    if USERS:
+        print(f"\n=== 小红书用户搜索: {keyword} ({len(result.users)}) ===")
+        for i, user in enumerate(result.users, 1):
+            print(format_user(i, user))
 
-        await browser.close()
+    if result.blocked:
+        out.error(f"blocked: {result.blocked}", stage="paginate", keyword=keyword)
+        print(f"\n🚫 中途被拦截: {result.blocked}")
+    elif not result.notes and not result.users:
+        print("\n❌ 没有结果")
 
 asyncio.run(search_xhs(KEYWORD))
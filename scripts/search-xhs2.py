@@ -1,47 +1,47 @@
 #!/usr/bin/env python3
-"""Search Xiaohongshu - robust version with full page text extraction."""
+"""Search Xiaohongshu - robust version: structured API results, full page text only if those are empty."""
 import asyncio
 import sys
-from playwright.async_api import async_playwright
+from scraping import BrowserPool
+from scraping.artifacts import get_artifacts
+from scraping.blocked import BlockedError
+from scraping.output import out
+from scraping.xhs import search, format_note, format_user
 
-KEYWORD = sys.argv[1] if len(sys.argv) > 1 else "礼貌太太和emogirl"
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+KEYWORD = ARGS[0] if ARGS else "礼貌太太和emogirl"
 
 async def run():
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="zh-CN"
-        )
-        page = await ctx.new_page()
+    async with BrowserPool() as pool:
+        page = await pool.acquire("xhs")
+        session = pool.vault.load("xhs")
+        print("🔑 使用已登录会话" if session and session.logged_in else "⚠️ 未登录 (运行 xhs-login.py 扫码登录)")
 
-        # 1) Search notes
-        print(f"=== 小红书笔记搜索: {KEYWORD} ===")
-        url = f"https://www.xiaohongshu.com/search_result?keyword={KEYWORD}&source=web_search_result_notes"
-        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-        await asyncio.sleep(5)
-        
-        # Save screenshot
-        await page.screenshot(path="/tmp/xhs-notes.png", full_page=False)
-        print("[screenshot saved: /tmp/xhs-notes.png]")
-        
-        # Get all text from the page
-        body_text = await page.inner_text("body")
-        print(body_text[:3000])
-        
-        # 2) Search users
-        print(f"\n\n=== 小红书用户搜索: {KEYWORD} ===")
-        user_url = f"https://www.xiaohongshu.com/search_result?keyword={KEYWORD}&source=web_search_result_notes&type=user"
-        await page.goto(user_url, wait_until="domcontentloaded", timeout=30000)
-        await asyncio.sleep(5)
-        
-        await page.screenshot(path="/tmp/xhs-users.png", full_page=False)
-        print("[screenshot saved: /tmp/xhs-users.png]")
-        
-        body_text2 = await page.inner_text("body")
-        print(body_text2[:3000])
+        # 1) Notes, then 2) users, in one pass over the search API
+        try:
+            result = await search(page, KEYWORD, notes=100, users=20,
+                                  on_item=lambda item: out.xhs_item(item, KEYWORD))
+        except BlockedError as e:
+            out.error(e, stage="search", keyword=KEYWORD)
+            await get_artifacts().capture(page, f"blocked-{e.block.kind}", site="xhs", error=e)
+            print(f"🚫 被拦截: {e.block}")
+            return
 
-        await browser.close()
+        print(f"=== 小红书笔记搜索: {KEYWORD} ({len(result.notes)}, 来源 {result.source}) ===")
+        for i, note in enumerate(result.notes, 1):
+            print(format_note(i, note))
+
+        print(f"\n\n=== 小红书用户搜索: {KEYWORD} ({len(result.users)}) ===")
+        for i, user in enumerate(result.users, 1):
+            print(format_user(i, user))
+
+        # Last resort: whatever text the page shows (layout change), plus a debug capture
+        if not result.notes and not result.users:
+            saved = await get_artifacts().capture(page, "no-results", site="xhs")
+            if saved:
+                print(f"[debug capture: {saved}.*]")
+            body_text = await page.inner_text("body")
+            out.page_text(page.url, body_text[:3000], label="xhs")
+            print(body_text[:3000])
 
 asyncio.run(run())
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# The scripts import the package as `scraping`, with scripts/ on sys.path
+SCRIPTS = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+sys.path.insert(0, SCRIPTS)
+# Caches, stats and stores go to a scratch dir, never the user's ~/.cache
+os.environ["SCRAPE_PROFILE_DIR"] = os.path.join(tempfile.mkdtemp(prefix="scraping-tests-"), "profiles")
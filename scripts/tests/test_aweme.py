@@ -0,0 +1,57 @@
+import json
+from urllib.parse import quote
+
+from scraping.aweme import Aweme, Variant, parse_api, parse_detail, parse_render_data
+
+
+def item(aweme_id, url, camel=True):
+    if camel:
+        return {"awemeId": aweme_id, "desc": f"video {aweme_id}", "authorInfo": {"nickname": "作者", "secUid": "MS4"},
+                "video": {"bitRateList": [{"playAddr": [{"src": url}], "bitRate": 1000, "width": 720, "height": 1280}]}}
+    return {"aweme_id": aweme_id, "desc": f"video {aweme_id}", "author": {"nickname": "作者", "uid": 9},
+            "statistics": {"digg_count": 5}, "video": {"duration": 15000, "bit_rate": [
+                {"play_addr": {"url_list": [url], "width": 1080, "height": 1920, "data_size": 900},
+                 "bit_rate": 2000, "is_h265": 1, "gear_name": "1080"},
+                {"play_addr": {"url_list": [url + "?264"], "width": 720, "height": 1280, "data_size": 500},
+                 "bit_rate": 1000, "gear_name": "720"}]}}
+
+
+def test_render_data_prefers_video_detail_over_related():
+    data = {"app": {"videoDetail": item("111", "//a/main.mp4"),
+                    "related": {"list": [item("222", "https://a/other.mp4")]}}}
+    aweme = parse_render_data(quote(json.dumps(data)))
+    assert aweme.aweme_id == "111" and aweme.best().url == "https://a/main.mp4"
+
+
+def test_render_data_prefers_url_aweme_id():
+    data = {"a": {"videoDetail": item("111", "https://a/x.mp4")}, "b": [item("333", "https://a/y.mp4")]}
+    assert parse_render_data(json.dumps(data), "333").aweme_id == "333"
+    # Unknown ID falls back to the page's main item
+    assert parse_render_data(json.dumps(data), "999").aweme_id == "111"
+
+
+def test_render_data_first_in_document_order():
+    data = {"list": [item("1", "https://a/1.mp4"), {"deeper": [item("2", "https://a/2.mp4")]}, item("3", "https://a/3.mp4")]}
+    assert parse_render_data(json.dumps(data)).aweme_id == "1"
+
+
+def test_render_data_garbage():
+    assert parse_render_data("") is None
+    assert parse_render_data("%7Bnot json") is None
+    assert parse_render_data(json.dumps({"x": 1})) is None
+
+
+def test_parse_api_snake_case():
+    [a] = parse_api(json.dumps({"aweme_detail": item("42", "https://v/1.mp4", camel=False)}))
+    assert (a.aweme_id, a.author, a.author_uid, a.duration, a.stats.likes) == ("42", "作者", "9", 15.0, 5)
+    assert [v.codec for v in a.variants] == ["h265", "h264"]
+    assert a.best("compat").url == "https://v/1.mp4?264"
+    assert a.best("max_bitrate").codec == "h265"
+    assert a.best("smallest").size == 500
+    assert a.best("max_resolution", max_p=720).p == 720
+
+
+def test_best_without_variants():
+    assert Aweme("1").best() is None
+    assert parse_detail({"aweme_detail": None}).aweme_id == ""
+    assert Variant("u", width=1080, height=1920).p == 1080
@@ -0,0 +1,36 @@
+import sys
+import time
+
+import pytest
+
+from scraping.bench import Run, RssSampler, compare, percentile
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([4, 1, 3, 2], 0.5) == 2.5
+    assert percentile([1, 2, 3], 0.95) == pytest.approx(2.9)
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RSS comes from /proc")
+def test_stage_peaks_are_per_stage():
+    with RssSampler() as rss:
+        run = Run(rss)
+        with run.stage("big"):
+            block = bytearray(96 * 1024 * 1024)
+            block[::4096] = b"x" * len(block[::4096])     # touch every page
+            time.sleep(0.2)                                 # long enough for the 50 ms sampler
+            del block
+        with run.stage("small"):
+            pass
+    res = run.report(1.0, rss.peak_kb, rss.start_kb)
+    big, small = res["stages"]["big"]["peak_rss_mb"], res["stages"]["small"]["peak_rss_mb"]
+    assert big - small > 64
+    assert res["peak_rss_mb"] >= big and res["start_rss_mb"] <= small
+
+
+def test_compare_flags_regressions():
+    old = {"results": {"serp_single": {"stages": {"fetch": {"p50_ms": 10.0}, "parse": {"p50_ms": 1.0}}}}}
+    new = {"results": {"serp_single": {"stages": {"fetch": {"p50_ms": 11.0}, "parse": {"p50_ms": 1.5}}},
+                       "douyin": {"skipped": "x"}}}
+    assert compare(old, new) == [("serp_single", "parse", 1.0, 1.5)]
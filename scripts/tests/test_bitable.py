@@ -0,0 +1,285 @@
+"""BitableClient and to-bitable.py against an in-process mock of the Feishu open API."""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from conftest import SCRIPTS
+from scraping import bitable
+from scraping.bitable import BitableClient, FeishuError, key_text
+
+APP = "appMock"
+TABLE = "tblMock"
+
+
+class MockFeishu:
+    """Tenant token, records/search (paged), batch_create (client_token-idempotent) and batch_update.
+
+    `faults` is a list of (action, kind) applied to the next matching calls:
+      kind 429 / 500 / "busy" (code 1254291) fail before writing,
+      "lost" applies the write and then answers 500, as if the response was lost.
+    A 429 carries x-ogw-ratelimit-reset when `reset` is set.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.tokens = {}
+        self.calls = []
+        self.stamps = []
+        self.faults = []
+        self.token = "t1"
+        self.logins = 0
+        self.reset = ""
+        self._next = 0
+        self._lock = threading.Lock()
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                parts = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with mock._lock:
+                    status, data = mock.handle(parts.path, query, body, self.headers.get("Authorization", ""))
+                raw = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                if status == 429 and mock.reset:
+                    self.send_header("x-ogw-ratelimit-reset", mock.reset)
+                self.end_headers()
+                self.wfile.write(raw)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle(self, path, query, body, auth):
+        if path.endswith("/tenant_access_token/internal"):
+            self.logins += 1
+            return 200, {"code": 0, "tenant_access_token": self.token, "expire": 7200}
+        assert path.startswith(f"/open-apis/bitable/v1/apps/{APP}/tables/{TABLE}/records/")
+        action = path.rsplit("/", 1)[1]
+        self.calls.append((action, query.get("client_token"), len(body.get("records") or [])))
+        self.stamps.append((action, time.monotonic()))
+        if auth != f"Bearer {self.token}":
+            return 400, {"code": 99991663, "msg": "token invalid"}
+        fault = next((f for f in self.faults if f[0] == action), None)
+        if fault:
+            self.faults.remove(fault)
+            if fault[1] == 429:
+                return 429, {"code": 1254290, "msg": "too many requests"}
+            if fault[1] == 500:
+                return 500, {"code": 1255040, "msg": "timeout"}
+            if fault[1] == "busy":
+                return 200, {"code": 1254291, "msg": "write conflict"}
+        status, data = getattr(self, action)(query, body)
+        if fault and fault[1] == "lost":
+            return 500, {"code": -1, "msg": "gateway timeout"}
+        return status, {"code": 0, "msg": "success", "data": data}
+
+    def search(self, query, body):
+        ids = sorted(self.records)
+        start = int(query.get("page_token") or 0)
+        size = int(query["page_size"])
+        names = body.get("field_names")
+        items = [{"record_id": rid, "fields": {k: v for k, v in self.records[rid].items() if not names or k in names}}
+                 for rid in ids[start:start + size]]
+        more = start + size < len(ids)
+        return 200, {"items": items, "has_more": more, "page_token": str(start + size) if more else "",
+                     "total": len(ids)}
+
+    def batch_create(self, query, body):
+        token = query.get("client_token")
+        if token in self.tokens:
+            return 200, {"records": self.tokens[token]}
+        out = []
+        for rec in body["records"]:
+            self._next += 1
+            rid = f"rec{self._next}"
+            self.records[rid] = dict(rec["fields"])
+            out.append({"record_id": rid, "fields": rec["fields"]})
+        self.tokens[token] = out
+        return 200, {"records": out}
+
+    def batch_update(self, query, body):
+        for rec in body["records"]:
+            self.records[rec["record_id"]].update(rec["fields"])
+        return 200, {"records": body["records"]}
+
+    def keys(self, field="链接"):
+        return sorted(key_text(r.get(field)) for r in self.records.values())
+
+
+@pytest.fixture
+def feishu():
+    mock = MockFeishu()
+    yield mock
+    mock.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(bitable, "BACKOFF", 0.001)
+
+
+def client(mock, tmp_path):
+    return BitableClient(app_token=APP, app_id="cli", app_secret="secret", base_url=mock.url,
+                         token_path=str(tmp_path / "token.json"))
+
+
+def rows(n, start=0):
+    return [{"标题": f"t{i}", "链接": {"link": f"https://e.com/{i}", "text": f"t{i}"}} for i in range(start, start + n)]
+
+
+def upsert(mock, tmp_path, rows_, key="链接"):
+    async def main():
+        async with client(mock, tmp_path) as bt:
+            return await bt.upsert(TABLE, rows_, key)
+    return asyncio.run(main())
+
+
+def test_batches_of_max_batch(feishu, tmp_path):
+    stats = upsert(feishu, tmp_path, rows(1200))
+    assert stats == {"created": 1200, "updated": 0, "merged": 0}
+    creates = [c for c in feishu.calls if c[0] == "batch_create"]
+    assert [n for _, _, n in creates] == [500, 500, 200]
+    assert len(feishu.records) == 1200
+
+
+def test_retries_reuse_client_token(feishu, tmp_path):
+    feishu.faults = [("batch_create", "lost"), ("batch_create", 429), ("batch_create", 500),
+                     ("batch_create", "busy"), ("search", 500)]
+    stats = upsert(feishu, tmp_path, rows(700))
+    assert stats["created"] == 700
+    # The lost response was retried with the same client_token and not applied twice
+    assert feishu.keys() == sorted(f"https://e.com/{i}" for i in range(700))
+    tokens = [t for a, t, _ in feishu.calls if a == "batch_create"]
+    assert len(tokens) == 6 and len(set(tokens)) == 2
+    assert tokens[:5] == [tokens[0]] * 5
+
+
+def test_retry_waits_for_rate_limit_reset(feishu, tmp_path):
+    feishu.reset = "0.3"
+    feishu.faults = [("batch_create", 429)]
+    assert upsert(feishu, tmp_path, rows(3))["created"] == 3
+    first, retry = [t for action, t in feishu.stamps if action == "batch_create"]
+    assert retry - first >= 0.3
+
+
+def test_gives_up_on_other_errors(feishu, tmp_path, monkeypatch):
+    monkeypatch.setattr(bitable, "RETRIES", 2)
+    feishu.faults = [("batch_create", 500)] * 3
+    with pytest.raises(FeishuError) as e:
+        upsert(feishu, tmp_path, rows(3))
+    assert e.value.code == 1255040
+    assert not feishu.records
+
+
+def test_upsert_is_idempotent(feishu, tmp_path):
+    upsert(feishu, tmp_path, rows(600))
+    again = rows(600)
+    again[0]["标题"] = "changed"
+    stats = upsert(feishu, tmp_path, again + rows(2, start=599))
+    assert stats == {"created": 1, "updated": 600, "merged": 1}
+    assert len(feishu.records) == 601
+    assert feishu.records["rec1"]["标题"] == "changed"
+
+
+def test_writer_flushes_partial_batch_after_max_age(feishu, tmp_path):
+    async def main():
+        async with client(feishu, tmp_path) as bt:
+            writer = bt.writer(TABLE, "链接", max_age=0.1)
+            for row in rows(3):
+                await writer.add(row)
+            assert not feishu.records
+            await asyncio.sleep(0.3)
+            # Sent by the timer, with no further add() and well short of batch_size
+            assert len(feishu.records) == 3
+            for row in rows(2, start=3):
+                await writer.add(row)
+            return await writer.close()
+
+    stats = asyncio.run(main())
+    assert stats == {"created": 5, "updated": 0, "merged": 0, "flushes": 2}
+
+
+def test_writer_raises_failed_timed_flush(feishu, tmp_path, monkeypatch):
+    monkeypatch.setattr(bitable, "RETRIES", 1)
+    feishu.faults = [("batch_create", 500)] * 2
+
+    async def main():
+        async with client(feishu, tmp_path) as bt:
+            writer = bt.writer(TABLE, "链接", max_age=0.05)
+            await writer.add(rows(1)[0])
+            await asyncio.sleep(0.3)
+            with pytest.raises(FeishuError):
+                await writer.add(rows(1, start=1)[0])
+            # Reported once; the writer keeps working afterwards
+            await writer.add(rows(1, start=2)[0])
+            return await writer.close()
+
+    assert asyncio.run(main())["created"] == 1
+    assert feishu.keys() == ["https://e.com/2"]
+
+
+def test_token_cached_and_refreshed(feishu, tmp_path):
+    upsert(feishu, tmp_path, rows(1))
+    upsert(feishu, tmp_path, rows(1, start=1))
+    assert feishu.logins == 1
+    assert os.stat(tmp_path / "token.json").st_mode & 0o777 == 0o600
+    # Server-side revocation: one refresh, then the call goes through
+    feishu.token = "t2"
+    upsert(feishu, tmp_path, rows(1, start=2))
+    assert feishu.logins == 2 and len(feishu.records) == 3
+
+
+def test_key_text():
+    assert key_text([{"type": "text", "text": "a"}, {"type": "text", "text": "b"}]) == "ab"
+    assert key_text({"link": "https://x", "text": "x"}) == "https://x"
+    assert key_text(123.0) == "123"
+    assert key_text(None) == ""
+
+
+def test_to_bitable_rerun_creates_nothing(feishu, tmp_path):
+    events = [{"v": 1, "type": "serp_hit", "ts": 1700000000.5, "script": "search-more.py", "engine": "baidu",
+               "rank": i, "title": f"标题{i}", "url": f"https://e.com/{i % 4}", "snippet": "…", "source": "",
+               "date": "", "query": "q", "label": "", "tier": "http"} for i in range(6)]
+    events += [{"v": 1, "type": "douyin", "ts": 1700000001, "script": "dy-batch.py", "aweme_id": "7300000000000000001",
+                "desc": "视频", "author": "作者", "url": "https://v.douyin.com/x/"},
+               {"v": 1, "type": "progress", "ts": 1700000002, "script": "x", "stage": "search"}]
+    src = tmp_path / "events.jsonl"
+    src.write_text("\n".join(json.dumps(e, ensure_ascii=False) for e in events) + "\nnot json\n", encoding="utf-8")
+    env = dict(os.environ, FEISHU_BASE_URL=feishu.url, FEISHU_APP_ID="cli", FEISHU_APP_SECRET="secret",
+               BITABLE_APP_TOKEN=APP, SCRAPE_PROFILE_DIR=str(tmp_path / "profiles"))
+
+    def run():
+        proc = subprocess.run([sys.executable, "to-bitable.py", f"--table={TABLE}", "--batch=3", str(src)],
+                              cwd=SCRIPTS, env=env, capture_output=True, text=True, timeout=60)
+        assert proc.returncode == 0, proc.stdout + proc.stderr
+        return proc.stdout
+
+    first = run()
+    # --batch=3: the second batch repeats two links of the first, which are updated in place
+    assert "新增 4, 更新 2" in first and "新增 1, 更新 0" in first
+    assert len(feishu.records) == 5
+    second = run()
+    assert "新增 0, 更新 6" in second and "新增 0, 更新 1" in second and len(feishu.records) == 5
+    hit = next(r for r in feishu.records.values() if key_text(r.get("链接")) == "https://e.com/0")
+    assert hit["来源平台"] == "百度" and hit["搜索词"] == "q" and hit["抓取时间"] == 1700000000500
+    video = next(r for r in feishu.records.values() if r.get("视频ID"))
+    assert video["来源平台"] == "抖音"
@@ -0,0 +1,63 @@
+import asyncio
+
+from scraping.blocked import (Block, BlockedError, classify, classify_api, classify_html, detect,
+                              MAX_BLOCK_HTML, selectors_for)
+
+
+def test_url_status_and_selector():
+    b = classify("baidu", url="https://wappass.baidu.com/static/captcha/tuxing.html?ak=1")
+    assert (b.kind, b.reason) == ("captcha", "url wappass.baidu.com")
+    assert classify("xhs", status=461).kind == "captcha"
+    assert classify("bing", status=429).kind == "rate_limit"
+    assert classify("douyin", status=403).kind == "forbidden"
+    sel = selectors_for("douyin")[0]
+    assert classify("douyin", selectors=[sel]).reason == "selector #captcha_container"
+    assert classify("xhs", url="https://www.xiaohongshu.com/website-login/error?x=1").kind == "login"
+    assert classify("baidu", url="https://www.baidu.com/s?wd=x", status=200) is None
+
+
+def test_text_only_on_short_pages_or_title():
+    assert classify("baidu", text="百度安全验证 请完成验证").kind == "captcha"
+    # A long result page that mentions the words in a snippet is not a block page
+    assert classify("baidu", text="……百度安全验证……", short=False) is None
+    assert classify("baidu", title="百度安全验证", short=False).kind == "captcha"
+
+
+def test_classify_html():
+    page = "<html><head><title>访问异常</title></head><body>x</body></html>"
+    assert classify_html("sogou", "https://www.sogou.com/web?query=x", 200, page).kind == "captcha"
+    long_page = "<title>老李 - 搜狗搜索</title>" + "访问异常 的新闻 " * (MAX_BLOCK_HTML // 8)
+    assert classify_html("sogou", "https://www.sogou.com/web?query=x", 200, long_page) is None
+
+
+def test_classify_api():
+    assert classify_api("xhs", 200, {"success": True, "code": 0, "data": {}}) is None
+    b = classify_api("xhs", 200, {"success": False, "code": 300013, "msg": "访问频次异常"})
+    assert (b.kind, b.reason) == ("rate_limit", "api code 300013 访问频次异常")
+    assert classify_api("xhs", 200, {"success": False, "code": -100}).kind == "login"
+    assert classify_api("xhs", 200, {"success": False, "code": 12345}) is None
+    assert classify_api("xhs", 461, None).kind == "captcha"
+
+
+def test_blocked_error_and_to_dict():
+    b = Block("xhs", "login", "url /login?", "https://x", 302)
+    assert str(BlockedError(b)) == "blocked: xhs login (url /login?)"
+    assert b.to_dict() == {"site": "xhs", "kind": "login", "reason": "url /login?", "url": "https://x", "status": 302}
+
+
+def test_detect_with_a_page_stub():
+    class Page:
+        url = "https://www.douyin.com/video/1"
+
+        async def evaluate(self, js, args):
+            sels, max_text = args
+            return {"url": self.url, "title": "抖音", "text": "", "short": False,
+                    "hits": [s for s in sels if "captcha_container" in s]}
+
+    class Closed(Page):
+        async def evaluate(self, js, args):
+            raise RuntimeError("Target closed")
+
+    assert asyncio.run(detect(Page(), "douyin")).kind == "captcha"
+    assert asyncio.run(detect(Closed(), "douyin", status=429)).kind == "rate_limit"
+    assert asyncio.run(detect(Closed(), "douyin")) is None
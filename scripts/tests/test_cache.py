@@ -0,0 +1,30 @@
+from scraping.cache import SerpCache, normalize_query, query_from_url
+
+
+def test_normalize_query():
+    assert normalize_query("  ＡＩ　绘画 ") == normalize_query("ai 绘画") == "ai 绘画"
+    assert normalize_query("“老李”") == normalize_query('"老李"')
+    assert normalize_query("C++ 教程") != normalize_query("C 教程")
+
+
+def test_query_from_url():
+    assert query_from_url("https://www.baidu.com/s?wd=C%2B%2B+%E6%95%99%E7%A8%8B") == "C++ 教程"
+    assert query_from_url("https://example.com/") == "https://example.com/"
+
+
+def test_get_put_ttl_and_eviction(tmp_path):
+    cache = SerpCache(str(tmp_path / "c.sqlite"), ttl={"baidu": 60})
+    cache.put("baidu", "C++ 教程", {"hits": [1]})
+    cache.put("baidu", "C 教程", {"hits": [2]})
+    assert cache.get("baidu", "c++  教程") == {"hits": [1]}
+    assert cache.get("baidu", "C 教程") == {"hits": [2]}
+    assert cache.get("bing", "C 教程") is None
+    cache.db.execute("UPDATE serp SET created = created - 120")
+    assert cache.get("baidu", "C 教程") is None
+    assert cache.stats()["baidu"]["entries"] == 1
+
+    cache.max_bytes = 0
+    cache.put("bing", "x", {"hits": []})
+    assert cache.stats() == {}
+    cache.close()
+
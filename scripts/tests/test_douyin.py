@@ -0,0 +1,68 @@
+"""DouyinResolver strategies with stub sessions and subprocesses (no browser, no network)."""
+import asyncio
+import os
+
+from scraping import douyin
+from scraping.douyin import DouyinResolver
+
+
+class StubSession:
+    def write_netscape(self, path):
+        with open(path, "w") as f:
+            f.write("# Netscape HTTP Cookie File\n")
+        return path
+
+
+class StubVault:
+    async def get(self, site, pool=None):
+        return StubSession()
+
+
+def resolver(tmp_path, **kwargs):
+    r = DouyinResolver(vault=StubVault(), stats_path=str(tmp_path / "stats.json"), **kwargs)
+    r.pool = object()
+    return r
+
+
+def test_ytdlp_cookie_file_per_call(tmp_path, monkeypatch):
+    real = asyncio.create_subprocess_exec
+    files = []
+
+    async def fake_exec(*args, **kwargs):
+        path = args[args.index("--cookies") + 1]
+        files.append(path)
+        return await real("sh", "-c", f"grep -q Netscape {path} && echo https://v.douyinvod.com/x.mp4", **kwargs)
+
+    monkeypatch.setattr(douyin.asyncio, "create_subprocess_exec", fake_exec)
+
+    async def main():
+        r = resolver(tmp_path)
+        return await asyncio.gather(*[r.ytdlp("https://v.douyin.com/x/", {}) for _ in range(4)])
+
+    assert asyncio.run(main()) == ["https://v.douyinvod.com/x.mp4"] * 4
+    assert len(set(files)) == 4 and not any(os.path.exists(p) for p in files)
+
+
+class Racing(DouyinResolver):
+    async def validate(self, play_url):
+        return play_url
+
+    async def early(self, url, info):
+        # Finds metadata first, then loses the race
+        info.update(desc="related video", author="someone else", aweme_id="1")
+        await asyncio.sleep(0.3)
+        return "https://v.douyinvod.com/early.mp4"
+
+    async def winner(self, url, info):
+        await asyncio.sleep(0.05)
+        info.update(desc="the video", author="老李")
+        return "https://v.douyinvod.com/winner.mp4"
+
+
+def test_resolution_takes_the_winners_metadata(tmp_path, monkeypatch):
+    monkeypatch.setattr(douyin, "HEDGE_DELAY", 0.01)
+    r = Racing(vault=StubVault(), stats_path=str(tmp_path / "stats.json"), strategies=["early", "winner"])
+    r.stats = {}
+    res = asyncio.run(r.resolve("https://www.douyin.com/video/7300000000000000001"))
+    assert (res.strategy, res.play_url) == ("winner", "https://v.douyinvod.com/winner.mp4")
+    assert (res.desc, res.author, res.aweme_id) == ("the video", "老李", "7300000000000000001")
@@ -0,0 +1,148 @@
+"""download() against a local Range-capable http.server."""
+import asyncio
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scraping import download as dl
+from scraping.download import DownloadError, content_key, download
+
+SIZE = 300 * 1024
+
+
+class Server:
+    """Serves `data` with Range support. `cut_at` drops the connection once a response passes that offset."""
+
+    def __init__(self, data):
+        self.data = data
+        self.etag = '"v1"'
+        self.cut_at = None
+        self.short = 0
+        self.ranges = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                data = server.data
+                rng = self.headers.get("Range", "")
+                if rng.startswith("bytes="):
+                    start, _, end = rng[6:].partition("-")
+                    start, end = int(start), min(int(end or len(data) - 1), len(data) - 1)
+                    server.ranges.append((start, end))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+                else:
+                    start, end = 0, len(data) - 1
+                    self.send_response(200)
+                body = data[start:end + 1]
+                self.send_header("Content-Length", str(len(body) + server.short))
+                self.send_header("ETag", server.etag)
+                self.end_headers()
+                if server.cut_at is not None and start < server.cut_at <= end:
+                    self.wfile.write(body[:server.cut_at - start])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+                if server.short:
+                    self.close_connection = True
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/video/tos/abc.mp4?x-expires=1&x-signature=s&vid=9"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    s = Server(os.urandom(SIZE))
+    yield s
+    s.close()
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(dl, "RETRIES", 1)
+
+
+def fetch(server, path, **kw):
+    kw.setdefault("min_segment", 64 * 1024)
+    return asyncio.run(download(server.url, str(path), **kw))
+
+
+def test_parallel_segments(server, tmp_path):
+    out = tmp_path / "v.mp4"
+    result = fetch(server, out)
+    assert out.read_bytes() == server.data
+    assert result.segments == 4 and result.bytes == SIZE and result.resumed == 0
+    assert len([r for r in server.ranges if r != (0, 0)]) == 4
+    assert not os.path.exists(str(out) + ".part.json")
+
+
+def test_resume_after_interruption(server, tmp_path):
+    out = tmp_path / "v.mp4"
+    server.cut_at = SIZE - 1000            # the last segment dies near its end
+    with pytest.raises(DownloadError):
+        fetch(server, out)
+    with open(str(out) + ".part.json") as f:
+        saved = json.load(f)
+    assert saved["validator"] == '"v1"' and saved["key"] == "/video/tos/abc.mp4?vid=9"
+
+    server.cut_at = None
+    server.ranges.clear()
+    # Re-signed URL for the same file still resumes
+    server.url = server.url.replace("x-signature=s", "x-signature=t")
+    result = fetch(server, out)
+    assert out.read_bytes() == server.data
+    assert result.resumed > 0
+    # Finished segments are not fetched again
+    assert len([r for r in server.ranges if r != (0, 0)]) == 1
+
+
+def test_checkpoint_for_other_content_is_discarded(server, tmp_path):
+    out = tmp_path / "v.mp4"
+    server.cut_at = SIZE - 1000
+    with pytest.raises(DownloadError):
+        fetch(server, out, key="111")
+    server.cut_at = None
+    # Same size and path, different video
+    server.data = os.urandom(SIZE)
+    server.etag = '"v2"'
+    result = fetch(server, out, key="111")
+    assert result.resumed == 0 and out.read_bytes() == server.data
+
+    server.cut_at = SIZE - 1000
+    with pytest.raises(DownloadError):
+        fetch(server, out, key="222")
+    server.cut_at = None
+    result = fetch(server, out, key="333")
+    assert result.resumed == 0 and out.read_bytes() == server.data
+
+
+def test_length_mismatch(server, tmp_path):
+    with pytest.raises(DownloadError, match="expected"):
+        fetch(server, tmp_path / "a.mp4", expected=SIZE + 1)
+    server.short = 10                        # every response claims 10 bytes it never sends
+    with pytest.raises(DownloadError):
+        fetch(server, tmp_path / "b.mp4")
+    assert not (tmp_path / "b.mp4").exists()
+
+
+def test_transport_error_is_download_error(tmp_path):
+    with pytest.raises(DownloadError, match="probe failed"):
+        asyncio.run(download("http://127.0.0.1:1/v.mp4", str(tmp_path / "v.mp4")))
+
+
+def test_content_key_ignores_signature():
+    a = content_key("https://v3.douyinvod.com/v/x.mp4?a=1&x-expires=5&x-signature=abc")
+    assert a == content_key("https://v9.douyinvod.com/v/x.mp4?x-signature=def&a=1&x-expires=6") == "/v/x.mp4?a=1"
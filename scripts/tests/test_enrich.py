@@ -0,0 +1,90 @@
+"""enrich(): query cleanup, condensing fused hits, and the time budget (stub fetcher, no network)."""
+import asyncio
+import time
+
+from scraping.enrich import condense, enrich, query_for
+from scraping.serp import SerpHit
+
+
+def test_query_for():
+    assert query_for("#某明星官宣#") == "某明星官宣"
+    assert query_for("【快讯】台风 登陆  热") == "台风 登陆"
+    assert query_for("[视频]新品发布会 沸") == "新品发布会"
+    # Nothing left after cleanup: search the title as is
+    assert query_for(" ## ") == "##"
+
+
+def test_condense_dedups_across_engines():
+    baidu = [SerpHit("baidu", 1, "台风登陆 - 新闻", "https://m.news.com/a?utm_source=bd", "台风今晨在沿海登陆。", "新闻网"),
+             SerpHit("baidu", 2, "台风登陆", "https://b.com/q", "台风登陆")]
+    bing = [SerpHit("bing", 1, "台风登陆 - 新闻", "https://news.com/a/", "台风今晨在沿海登陆。"),
+            SerpHit("bing", 2, "气象台发布预警", "https://c.com/w", "气象台发布橙色预警")]
+    summary, sources = condense("台风登陆", [baidu, bing])
+    # The shared page is one source and one snippet; the snippet that only restates the query is dropped
+    assert summary == "台风今晨在沿海登陆。 / 气象台发布橙色预警"
+    urls = [s["url"] for s in sources]
+    assert urls[0] == "https://news.com/a" and sorted(urls[1:]) == ["https://b.com/q", "https://c.com/w"]
+    assert sources[0]["source"] == "新闻网"
+
+
+class StubFetcher:
+    """search() answers after `delays[(engine, query)]` seconds (None: never, "boom": raises); records cancellations."""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.calls = []
+        self.cancelled = []
+
+    async def search(self, engine, query):
+        self.calls.append((engine, query))
+        delay = self.delays.get((engine, query), 0)
+        if delay == "boom":
+            raise RuntimeError("boom")
+        try:
+            if delay is None:
+                await asyncio.Event().wait()
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled.append((engine, query))
+            raise
+        return [SerpHit(engine, 1, f"{query} 报道", f"https://{engine}.example.com/{query}", f"{query}的{engine}摘要")], "http"
+
+
+def test_enrich_returns_by_budget_with_partial_contexts():
+    fetcher = StubFetcher({("bing", "B"): None, ("baidu", "C"): None, ("bing", "C"): None, ("baidu", "A"): 0.05})
+    seen = []
+
+    async def main():
+        start = time.monotonic()
+        contexts = await enrich(["#A#", "A", "B", "C"], fetcher, budget=0.3,
+                                on_context=lambda ctx: seen.append((ctx.title, time.monotonic() - start)))
+        return contexts, time.monotonic() - start
+
+    contexts, elapsed = asyncio.run(main())
+    assert 0.3 <= elapsed < 1.0
+    # "#A#" and "A" normalise to one query, searched once per engine
+    assert sorted(fetcher.calls) == sorted((e, q) for q in "ABC" for e in ("baidu", "bing"))
+    assert sorted(fetcher.cancelled) == [("baidu", "C"), ("bing", "B"), ("bing", "C")]
+
+    a = contexts["#A#"]
+    assert a.complete and a.engines == {"baidu": 1, "bing": 1}
+    assert sorted(a.summary.split(" / ")) == ["A的baidu摘要", "A的bing摘要"]
+    assert contexts["A"].summary == a.summary
+    # Finished titles are handed over as they complete, not at the deadline
+    assert {t for t, at in seen if at < 0.3} == {"#A#", "A"}
+
+    b = contexts["B"]
+    assert not b.complete and b.engines == {"baidu": 1, "bing": "timeout"}
+    assert b.summary == "B的baidu摘要" and [s["url"] for s in b.sources] == ["https://baidu.example.com/B"]
+    c = contexts["C"]
+    assert not c.complete and c.summary == "" and c.sources == []
+    assert c.engines == {"baidu": "timeout", "bing": "timeout"}
+    assert [t for t, _ in seen].count("C") == 1
+
+
+def test_enrich_records_engine_errors():
+    fetcher = StubFetcher({("bing", "X"): "boom"})
+    contexts = asyncio.run(enrich(["X"], fetcher, budget=5))
+    x = contexts["X"]
+    assert x.complete and x.engines == {"baidu": 1, "bing": "RuntimeError: boom"}
+    assert x.summary == "X的baidu摘要"
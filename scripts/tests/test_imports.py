@@ -0,0 +1,29 @@
+"""Every scraping module imports without Playwright or a network, and every script compiles."""
+import glob
+import importlib
+import os
+import pkgutil
+import py_compile
+
+import pytest
+
+import scraping
+from conftest import SCRIPTS
+
+MODULES = sorted(m.name for m in pkgutil.iter_modules(scraping.__path__))
+
+
+@pytest.mark.parametrize("name", MODULES)
+def test_module_imports(name):
+    importlib.import_module(f"scraping.{name}")
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(SCRIPTS, "*.py"))), ids=os.path.basename)
+def test_script_compiles(path, tmp_path):
+    py_compile.compile(path, cfile=str(tmp_path / "out.pyc"), doraise=True)
+
+
+def test_session_is_a_dataclass():
+    from scraping.session import Session
+    s = Session("xhs", [{"name": "a1", "value": "x", "expires": -1}])
+    assert s.names() == {"a1"}
@@ -0,0 +1,51 @@
+import base64
+
+from scraping.merge import canonical_url, core_title, merge, simhash, unwrap_offline
+from scraping.serp import SerpHit
+
+
+def test_canonical_url_strips_tracking():
+    assert canonical_url("http://m.example.com/a/?utm_source=x&id=3&spm=1#top") == "https://example.com/a?id=3"
+    assert (canonical_url("https://www.iesdouyin.com/share/video/123/?previous_page=app&u_code=9")
+            == canonical_url("https://www.douyin.com/video/123") == "https://douyin.com/video/123")
+    assert canonical_url("https://www.baidu.com/s?wd=x&rsv_spt=1&tn=baidu&ie=utf-8") == "https://baidu.com/s?wd=x"
+
+
+def test_canonical_url_keeps_content_params():
+    # sec_uid is the Douyin user page, cid/f/tn/source select content on other sites
+    a = canonical_url("https://www.iesdouyin.com/share/user/?sec_uid=MS4wA")
+    b = canonical_url("https://www.iesdouyin.com/share/user/?sec_uid=MS4wB")
+    assert a != b
+    assert canonical_url("https://news.example.com/a?cid=1") != canonical_url("https://news.example.com/a?cid=2")
+    assert canonical_url("https://forum.example.com/list?f=12&tn=3") == "https://forum.example.com/list?f=12&tn=3"
+    assert canonical_url("https://github.com/a/b?ref=main") == "https://github.com/a/b?ref=main"
+
+
+def test_unwrap_offline():
+    assert unwrap_offline("https://www.google.com/url?q=https://a.com/x&sa=U") == "https://a.com/x"
+    u = "a1" + base64.urlsafe_b64encode(b"https://b.com/y").decode().rstrip("=")
+    assert unwrap_offline(f"https://www.bing.com/ck/a?u={u}&ntb=1") == "https://b.com/y"
+    assert unwrap_offline("https://x.com/go?url=https%3A%2F%2Fc.com%2F") == "https://c.com/"
+    assert unwrap_offline("https://www.baidu.com/link?url=abc") == "https://www.baidu.com/link?url=abc"
+
+
+def test_core_title_and_simhash():
+    assert core_title("老李的段子合集 - 抖音") == "老李的段子合集"
+    assert simhash("") == 0
+    a = simhash("今天天气很好，适合出门散步和晒太阳")
+    b = simhash("今天天气很好，适合出门散步和晒太阳。")
+    c = simhash("完全不同的一条关于股票市场的新闻")
+    assert bin(a ^ b).count("1") <= 3 < bin(a ^ c).count("1")
+
+
+def test_merge_fuses_engines():
+    baidu = [SerpHit("baidu", 1, "A 标题 - 百度", "https://m.a.com/x?utm_source=bd", "长一点的摘要内容"),
+             SerpHit("baidu", 2, "B", "https://b.com/1", "b")]
+    bing = [SerpHit("bing", 1, "B", "https://b.com/1/", "b"),
+            SerpHit("bing", 2, "A 标题", "https://a.com/x", "摘要")]
+    merged = merge([baidu, bing])
+    assert len(merged) == 2
+    assert merged[0].url == "https://a.com/x" and merged[0].ranks == {"baidu": 1, "bing": 2}
+    assert merged[0].snippet == "长一点的摘要内容" and merged[0].engines == ["baidu", "bing"]
+    assert merged[1].urls == ["https://b.com/1"]
+    assert merge([]) == []
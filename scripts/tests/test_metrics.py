@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+from scraping import metrics
+
+
+@pytest.fixture
+def sink(monkeypatch, tmp_path):
+    """Metrics switched on for one test, writing JSON lines to a tmp file."""
+    path = tmp_path / "metrics.jsonl"
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "METRICS_PATH", str(path))
+    monkeypatch.setattr(metrics, "PROM_PATH", "")
+    monkeypatch.setattr(metrics, "_sink", metrics._Sink())
+
+    def lines():
+        metrics._sink.close()
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    return lines
+
+
+def test_disabled_is_a_no_op(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", False)
+    monkeypatch.setattr(metrics, "_sink", metrics._Sink())
+    with metrics.span("goto", site="baidu") as s:
+        s.set(ready="load")
+    metrics.count("bytes", 10)
+    assert metrics.span("x") is metrics._NOOP
+    assert metrics._sink.spans == {} and metrics._sink.counters == {}
+
+
+def test_span_and_count_lines(sink):
+    with metrics.span("launch", kind="driver", name="chromium") as s:
+        s.set(site="baidu")
+    metrics.count("bytes", 100, site="douyin")
+    metrics.count("bytes", 50, site="douyin")
+    span, counter, summary = sink()
+    assert (span["kind"], span["name"], span["labels"]) == ("span", "launch",
+                                                             {"kind": "driver", "name": "chromium", "site": "baidu"})
+    assert span["ms"] >= 0 and span["pid"] and "error" not in span
+    assert (counter["kind"], counter["name"], counter["value"], counter["labels"]) == ("counter", "bytes", 150,
+                                                                                       {"site": "douyin"})
+    assert (summary["kind"], summary["count"], summary["errors"]) == ("summary", 1, 0)
+
+
+def test_error_span(sink):
+    with pytest.raises(ValueError):
+        with metrics.span("parse", engine="bing"):
+            raise ValueError("bad")
+    span, summary = sink()
+    assert span["error"] == "ValueError" and span["labels"] == {"engine": "bing"}
+    assert summary["errors"] == 1
+
+
+def test_write_prometheus(tmp_path):
+    spans = {("goto", (("site", "baidu"),)): [2, 1.5, 1.0, 1]}
+    counters = {("blocked-bytes", (("site", 'x"y'),)): 7}
+    path = tmp_path / "prom" / "scrape.prom"
+    metrics.write_prometheus(str(path), spans, counters)
+    text = path.read_text()
+    script = metrics.SCRIPT
+    assert f'scrape_stage_seconds_sum{{script="{script}",stage="goto",site="baidu"}} 1.500000' in text
+    assert f'scrape_stage_seconds_count{{script="{script}",stage="goto",site="baidu"}} 2' in text
+    assert f'scrape_stage_errors_total{{script="{script}",stage="goto",site="baidu"}} 1' in text
+    assert "# TYPE scrape_blocked_bytes_total counter" in text
+    assert f'scrape_blocked_bytes_total{{script="{script}",site="x\\"y"}} 7' in text
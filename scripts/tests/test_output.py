@@ -0,0 +1,107 @@
+import io
+import json
+import sys
+
+import pytest
+
+from scraping.batch import BatchResult
+from scraping.blocked import Block, BlockedError
+from scraping.download import DownloadResult
+from scraping.output import Output
+from scraping.serp import SerpHit
+from scraping.store import VideoRecord
+from scraping.xhs import Note, User
+
+
+@pytest.fixture
+def out():
+    stdout, hook = sys.stdout, sys.excepthook
+    stream = io.StringIO()
+    o = Output(enabled=True, stream=stream)
+    o.lines = lambda: [json.loads(line) for line in stream.getvalue().splitlines()]
+    try:
+        yield o
+    finally:
+        o.close()
+        sys.stdout, sys.excepthook = stdout, hook
+
+
+def test_prose_goes_to_stderr():
+    stdout, hook = sys.stdout, sys.excepthook
+    try:
+        Output(enabled=True, stream=io.StringIO()).close()
+        assert sys.stdout is sys.stderr
+    finally:
+        sys.stdout, sys.excepthook = stdout, hook
+
+
+def test_disabled_writes_nothing():
+    stream = io.StringIO()
+    o = Output(enabled=False, stream=stream)
+    o.event("progress", stage="x")
+    o.close()
+    assert stream.getvalue() == ""
+
+
+def test_envelope(out):
+    out.hits([SerpHit("baidu", 1, "标题", "https://a.com/")], query="q", tier="http")
+    start, hit = out.lines()
+    assert start["type"] == "start" and start["v"] == 1
+    assert {"ts", "script"} <= set(hit)
+    assert (hit["type"], hit["title"], hit["query"], hit["tier"]) == ("serp_hit", "标题", "q", "http")
+
+
+def test_download_variants(out, tmp_path):
+    path = tmp_path / "v.mp4"
+    path.write_bytes(b"x" * 10)
+    out.download(str(path), DownloadResult(str(path), 2 * 1024 * 1024, 2.0, 4, resumed=1024 * 1024), aweme_id="7")
+    out.download(str(path), VideoRecord("7", "d", "a", 10, 1.0, "ab" * 32, 0.0), url="u")
+    out.download(str(path), desc="tool")
+    fresh, stored, tool = [e for e in out.lines() if e["type"] == "download"]
+    assert (fresh["status"], fresh["segments"], fresh["mb_per_s"]) == ("downloaded", 4, 0.5)
+    assert (stored["status"], stored["aweme_id"], stored["bytes"], stored["url"]) == ("stored", "7", 10, "u")
+    assert (tool["bytes"], tool["desc"]) == (10, "tool")
+
+
+def test_error_and_progress(out):
+    out.error(BlockedError(Block("baidu", "captcha", "text 百度安全验证")), stage="search", query="q")
+    out.error(ValueError("bad"), stage="parse")
+    out.progress("search", total=3)
+    out.progress("search", total=3)
+    out.progress("download", done=5, total=9)
+    blocked, plain, *progress = [e for e in out.lines() if e["type"] != "start"]
+    assert blocked["blocked"]["kind"] == "captcha" and blocked["message"].startswith("blocked: baidu captcha")
+    assert plain["message"] == "ValueError: bad"
+    assert [(p["stage"], p["done"]) for p in progress] == [("search", 1), ("search", 2), ("download", 5)]
+
+
+def test_serp_result(out):
+    out.serp_result(BatchResult(0, "q", value=([SerpHit("bing", 1, "t", "u")], "cache"), elapsed=0.5), "q", total=2)
+    out.serp_result(BatchResult(1, "q2", error="TimeoutError", exception=TimeoutError("slow")), "q2", total=2)
+    types = [(e["type"], e.get("ok")) for e in out.lines()[1:]]
+    assert types == [("serp_hit", None), ("progress", True), ("error", None), ("progress", False)]
+
+
+def test_xhs_item(out):
+    out.xhs_item(Note("n1", title="笔记", url="https://www.xiaohongshu.com/explore/n1", type="video"), "老李")
+    out.xhs_item(User("u1", name="老李", fans=3), "老李")
+    note, user = out.lines()[1:]
+    assert (note["type"], note["id"], note["note_type"], note["keyword"]) == ("xhs_note", "n1", "video", "老李")
+    assert (user["type"], user["name"], user["fans"]) == ("xhs_user", "老李", 3)
+
+
+def test_done_counts_and_crash_hook(out):
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        tp, value, tb = sys.exc_info()
+    stderr, sys.stderr = sys.stderr, io.StringIO()
+    try:
+        sys.excepthook(tp, value, tb)
+    finally:
+        sys.stderr = stderr
+    out.close()
+    out.event("progress", stage="late")
+    *_, fatal, done = out.lines()
+    assert (fatal["stage"], fatal["message"]) == ("fatal", "RuntimeError: boom")
+    assert done["type"] == "done" and done["counts"] == {"start": 1, "error": 1}
@@ -0,0 +1,9 @@
+from scraping.pool import BrowserPool
+
+
+def test_blocking_is_per_site_unless_forced():
+    pool = BrowserPool(vault=None)
+    assert pool.blocks("douyin") and pool.blocks("xhs")
+    assert not pool.blocks("baidu") and not pool.blocks("unknown")
+    assert BrowserPool(vault=None, block=True).blocks("baidu")
+    assert not BrowserPool(vault=None, block=False).blocks("douyin")
@@ -0,0 +1,118 @@
+"""Offline replay of a recorded run gives the same parsed hits."""
+import asyncio
+import atexit
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import FIXTURES
+from scraping import replay
+from scraping.douyin import DouyinResolver
+from scraping.fetch import SerpFetcher, search_url
+
+httpx = pytest.importorskip("httpx")
+
+CASSETTE = os.path.join(FIXTURES, "replay-serp.zip")
+
+
+def baidu_page(query, results=10):
+    items = "".join(
+        f'<div class="result c-container" id="{i + 1}"><h3><a href="/link?url=r{i}">{query} 结果 {i + 1}</a></h3>'
+        f'<div class="c-abstract">关于{query}的第 {i + 1} 条摘要，' + "内容" * 40 + "</div></div>"
+        for i in range(results)
+    )
+    return f'<html><head><title>{query}_百度搜索</title></head><body><div id="content_left">{items}</div></body></html>'
+
+
+@pytest.fixture
+def mode(monkeypatch):
+    def set_mode(record="", replay_=""):
+        if replay._archive is not None and replay.mode() == "record":
+            # archive() registered a save at exit; the tmp archive is gone by then
+            atexit.unregister(replay._archive.save)
+        monkeypatch.setattr(replay, "RECORD_PATH", record)
+        monkeypatch.setattr(replay, "REPLAY_PATH", replay_)
+        monkeypatch.setattr(replay, "_archive", None)
+    yield set_mode
+    set_mode()
+
+
+def search(engine, query):
+    async def main():
+        async with SerpFetcher(cache=False, http2=False) as fetcher:
+            return await fetcher.search(engine, query)
+    return asyncio.run(main())
+
+
+def fetch(url):
+    async def main():
+        async with SerpFetcher(cache=False, http2=False) as fetcher:
+            return await fetcher.fetch_http(url, "baidu")
+    return asyncio.run(main())
+
+
+def test_cassette_replays_to_the_same_hits(mode):
+    mode(replay_=CASSETTE)
+    with open(os.path.join(FIXTURES, "replay-serp.hits.json"), encoding="utf-8") as f:
+        expected = json.load(f)
+    for engine in ("baidu", "bing"):
+        hits, tier = search(engine, expected["query"])
+        assert tier == "http"
+        assert [h.to_dict() for h in hits] == expected[engine]
+
+
+def test_unknown_request_fails_offline(mode):
+    mode(replay_=CASSETTE)
+    with pytest.raises(httpx.ConnectError, match="not in replay archive"):
+        fetch("https://www.baidu.com/sf/vsearch?wd=x")
+
+
+def test_lookup_matching():
+    arc = replay.Archive.load(CASSETTE)
+    baidu = search_url("baidu", "老李 段子")
+    # Exact URL differs (the recording had rsv_t/rsv_pq); the loose key finds it
+    assert arc.lookup("GET", baidu)["url"].startswith(baidu + "&rsv_t=")
+    assert arc.lookup("POST", baidu) is None
+    assert arc.lookup("GET", "https://www.baidu.com/s?wd=other")["url"].startswith(baidu)   # host + path
+    assert arc.lookup("GET", "https://example.com/") is None
+
+
+def test_record_then_replay(mode, tmp_path):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            body = baidu_page("录制").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_port}/s?wd=%E5%BD%95%E5%88%B6"
+    path = str(tmp_path / "run.zip")
+    try:
+        mode(record=path)
+        live, reason = fetch(url)
+        replay.archive().save()
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+    assert reason == "" and len(live) == 10
+
+    mode(replay_=path)
+    offline, reason = fetch(url)
+    assert reason == "" and offline == live
+
+
+def test_resolver_skips_strategies_outside_the_archive(mode, tmp_path):
+    stats = str(tmp_path / "stats.json")
+    assert "ytdlp" in DouyinResolver(stats_path=stats).strategies
+    mode(replay_=CASSETTE)
+    assert DouyinResolver(stats_path=stats).strategies == ["page_video", "render_data"]
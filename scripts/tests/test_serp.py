@@ -0,0 +1,73 @@
+"""Offline extraction: the stdlib HTML tree and parse_html over saved SERP markup."""
+from scraping.html import parse
+from scraping.serp import engine_for_url, format_hit, parse_html
+
+DOC = parse("""<html><body>
+<div id="main" class="a b"><p>one<p>two</p>
+  <ul><li class="x" data-k="v-1">first<li data-k="w">second</ul>
+  <img src="i.png"><br/>
+  <section><div class="inner"><span>deep</span></div></section>
+</div><script>var hidden = 1;</script><p>tail &amp; more</p></body></html>""")
+
+
+def test_selectors():
+    assert [n.text() for n in DOC.select("#main > p")] == ["one", "two"]
+    assert [n.text() for n in DOC.select("ul li")] == ["first", "second"]
+    assert [n.get("data-k") for n in DOC.select("[data-k^=v], [data-k$=w]")] == ["v-1", "w"]
+    assert DOC.select_one("li[data-k*=-]").text() == "first"
+    assert DOC.select_one("div.a.b section span").text() == "deep"
+    assert DOC.select_one("#main > span") is None
+    assert DOC.select_one("img").get("src") == "i.png"
+    assert DOC.select_one("li.x").classes == {"x"}
+
+
+def test_text_skips_scripts_and_spaces_blocks():
+    assert "hidden" not in DOC.text()
+    assert DOC.select_one("body > p").text() == "tail & more"
+    assert DOC.select_one("ul").text() == "first second"
+
+
+SOGOU = """<div class="results">
+<div class="vrwrap"><h3 class="vr-title"><a href="/link?url=hedJjaC291">老李梭<em>段子</em></a></h3>
+ <div class="star-wiki">手绘漫画讲段子。</div><div class="citeurl">知乎</div><span class="cite-date">2024-05-01</span></div>
+<div class="rb"><h3><a href="/link?url=x2">第二条</a></h3><p class="str_info">摘要二</p><cite>baike.sogou.com</cite></div>
+<div class="vrwrap"><h3>没有链接的卡片</h3></div>
+</div>"""
+
+WEIXIN = """<ul class="news-list">
+<li><div class="txt-box"><h3><a href="/link?url=dn9a_-gY295K0Rci">老李的段子</a></h3>
+ <p class="txt-info">今天的段子来了</p>
+ <div class="s-p" t="1715000000"><span class="all-time-y2">老李梭段子</span></div></div></li>
+</ul>"""
+
+GOOGLE = """<div id="search"><div class="g"><a href="https://example.com/a"><h3>Example A</h3><cite>example.com</cite></a>
+<div class="VwiC3b">Snippet A</div></div></div>"""
+
+
+def test_sogou_relative_links_and_fields():
+    hits = parse_html(SOGOU, "sogou", base_url="https://www.sogou.com/web?query=x")
+    assert [(h.rank, h.title, h.url) for h in hits] == [
+        (1, "老李梭段子", "https://www.sogou.com/link?url=hedJjaC291"),
+        (2, "第二条", "https://www.sogou.com/link?url=x2")]
+    assert (hits[0].snippet, hits[0].source, hits[0].date) == ("手绘漫画讲段子。", "知乎", "2024-05-01")
+    assert hits[1].source == "baike.sogou.com"
+
+
+def test_weixin_timestamp_date():
+    [hit] = parse_html(WEIXIN, base_url="https://weixin.sogou.com/weixin?type=2&query=x")
+    assert hit.engine == "weixin" and hit.source == "老李梭段子"
+    assert hit.date.startswith("2024-05-0")
+
+
+def test_google_and_limit():
+    [hit] = parse_html(GOOGLE, "google", limit=5)
+    assert (hit.title, hit.url, hit.snippet, hit.source) == ("Example A", "https://example.com/a", "Snippet A",
+                                                           "example.com")
+    assert len(parse_html(SOGOU, "sogou", limit=1)) == 1
+    assert "example.com" in format_hit(hit) and format_hit(hit).startswith("1. Example A")
+
+
+def test_engine_for_url():
+    assert engine_for_url("https://cn.bing.com/search?q=x") == "bing"
+    assert engine_for_url("https://m.baidu.com/s?word=x") == "baidu"
+    assert engine_for_url("https://example.com/") is None
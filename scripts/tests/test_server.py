@@ -0,0 +1,140 @@
+"""JobServer queue behaviour with stub handlers and an in-memory connection (no browser)."""
+import asyncio
+import json
+
+from scraping import server as srv
+
+
+class FakeWriter:
+    def __init__(self):
+        self.lines = []
+
+    def is_closing(self):
+        return False
+
+    def write(self, data):
+        self.lines.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+
+def replies(conn):
+    return {m["id"]: m for m in conn.writer.lines if "id" in m}
+
+
+async def echo(server, job, params):
+    return params["n"]
+
+
+def test_cancel_before_start_keeps_worker(monkeypatch):
+    monkeypatch.setitem(srv.HANDLERS, "echo", echo)
+
+    async def main():
+        server = srv.JobServer(workers=1)
+
+        class Queue(asyncio.PriorityQueue):
+            async def get(self):
+                job = await super().get()
+                if job.params["n"] == 1:
+                    # Lands after the worker creates the task, before the task first runs
+                    asyncio.get_running_loop().call_soon(server.cancel, job)
+                return job
+
+        server.queue = Queue()
+        conn = srv.Connection(None, FakeWriter())
+        for n in (1, 2, 3):
+            server.submit(conn, n, "echo", {"n": n})
+        worker = asyncio.ensure_future(server._worker())
+        for _ in range(50):
+            await asyncio.sleep(0)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return conn
+
+    got = replies(asyncio.run(main()))
+    assert got[1]["error"]["code"] == srv.CANCELLED
+    assert got[2]["result"] == 2 and got[3]["result"] == 3
+
+
+def test_bad_priority_is_invalid_params(monkeypatch):
+    monkeypatch.setitem(srv.HANDLERS, "echo", echo)
+
+    async def main():
+        server = srv.JobServer(workers=1)
+        conn = srv.Connection(None, FakeWriter())
+        await server._handle(conn, json.dumps({"id": 7, "method": "echo", "params": {"n": 1, "priority": "high"}}))
+        return conn, server
+
+    conn, server = asyncio.run(main())
+    assert replies(conn)[7]["error"]["code"] == srv.INVALID_PARAMS
+    assert not server.jobs
+
+
+def test_priority_order(monkeypatch):
+    monkeypatch.setitem(srv.HANDLERS, "echo", echo)
+
+    async def main():
+        server = srv.JobServer(workers=1)
+        conn = srv.Connection(None, FakeWriter())
+        for n, priority in ((1, 5), (2, 0), (3, 5)):
+            server.submit(conn, n, "echo", {"n": n, "priority": priority})
+        worker = asyncio.ensure_future(server._worker())
+        for _ in range(50):
+            await asyncio.sleep(0)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return conn
+
+    order = [m["id"] for m in asyncio.run(main()).writer.lines if "result" in m]
+    assert order == [2, 1, 3]
+
+
+def test_notifications_run_without_replies(monkeypatch):
+    monkeypatch.setitem(srv.HANDLERS, "echo", echo)
+
+    async def main():
+        server = srv.JobServer(workers=1)
+        conn = srv.Connection(None, FakeWriter())
+        # Two notifications on one connection, a bad one, and a call that reuses a pending id
+        for msg in ({"method": "echo", "params": {"n": 1}}, {"method": "echo", "params": {"n": 2}},
+                    {"method": "echo", "params": {"n": 3, "priority": "high"}}, {"method": "nope", "params": {}},
+                    {"id": 9, "method": "echo", "params": {"n": 4}}, {"id": 9, "method": "echo", "params": {"n": 5}}):
+            await server._handle(conn, json.dumps(msg))
+        queued = len(server.jobs)
+        worker = asyncio.ensure_future(server._worker())
+        for _ in range(50):
+            await asyncio.sleep(0)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return conn, server, queued
+
+    conn, server, queued = asyncio.run(main())
+    assert queued == 3 and not server.jobs and not conn.jobs
+    assert server.done == 3
+    answers = [m for m in conn.writer.lines if "result" in m or "error" in m]
+    assert [(m["id"], "result" in m) for m in answers] == [(9, False), (9, True)]
+    assert answers[0]["error"]["code"] == srv.INVALID_REQUEST and answers[1]["result"] == 4
+
+
+def test_cancel_by_call_id(monkeypatch):
+    async def hang(server, job, params):
+        await asyncio.Event().wait()
+
+    monkeypatch.setitem(srv.HANDLERS, "hang", hang)
+
+    async def main():
+        server = srv.JobServer(workers=1)
+        conn = srv.Connection(None, FakeWriter())
+        await server._handle(conn, json.dumps({"id": "a", "method": "hang", "params": {}}))
+        await server._handle(conn, json.dumps({"id": "c", "method": "cancel", "params": {"id": "a"}}))
+        worker = asyncio.ensure_future(server._worker())
+        for _ in range(20):
+            await asyncio.sleep(0)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return conn
+
+    got = replies(asyncio.run(main()))
+    assert got["c"]["result"] is True
+    assert got["a"]["error"]["code"] == srv.CANCELLED
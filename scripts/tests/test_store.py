@@ -0,0 +1,58 @@
+import os
+import sqlite3
+
+import pytest
+
+from scraping.store import VideoStore, file_sha256
+
+
+def video(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_export_is_independent_of_the_store(tmp_path):
+    store = VideoStore(str(tmp_path / "store"))
+    src = video(tmp_path / "dl.mp4", b"a" * 1000)
+    rec = store.add("111", src, desc="d", author="a")
+    out = tmp_path / "out.mp4"
+    assert store.export("111", str(out)).sha256 == rec.sha256
+    assert os.stat(out).st_ino != os.stat(rec.path).st_ino
+    # In-place edits of either user-facing file leave the stored object alone
+    with open(out, "r+b") as f:
+        f.write(b"XX")
+    with open(src, "r+b") as f:
+        f.write(b"YY")
+    assert file_sha256(rec.path) == rec.sha256
+    store.close()
+
+
+def test_changed_object_is_a_miss(tmp_path):
+    store = VideoStore(str(tmp_path / "store"))
+    rec = store.add("111", video(tmp_path / "a.mp4", b"a" * 1000))
+    store.add("222", video(tmp_path / "b.mp4", b"a" * 1000))
+    with open(rec.path, "ab") as f:
+        f.write(b"tail")
+    assert store.export("111", str(tmp_path / "out.mp4")) is None
+    assert store.get("222") is None and not os.path.exists(rec.path)
+    store.close()
+
+
+def test_dedup_and_evict(tmp_path):
+    store = VideoStore(str(tmp_path / "store"), max_bytes=2500)
+    store.add("1", video(tmp_path / "1.mp4", b"x" * 1000))
+    store.add("1b", video(tmp_path / "1b.mp4", b"x" * 1000))
+    assert store.stats()["objects"] == 1 and store.total_bytes() == 1000
+    store.add("2", video(tmp_path / "2.mp4", b"y" * 1000))
+    store.add("3", video(tmp_path / "3.mp4", b"z" * 1000))
+    assert store.get("3") is not None and store.total_bytes() <= 2500
+    assert store.add("", str(tmp_path / "3.mp4")) is None
+    assert store.remove("3") and store.get("3") is None
+    store.close()
+
+
+def test_context_manager_closes(tmp_path):
+    with VideoStore(str(tmp_path / "store")) as store:
+        store.add("1", video(tmp_path / "1.mp4", b"x" * 10))
+    with pytest.raises(sqlite3.ProgrammingError):
+        store.get("1")
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import pytest
+
+from scraping.throttle import BLOCK_FACTOR, ERROR_FACTOR, DomainLimiter, Limits, Scheduler, domain_of
+
+
+@pytest.mark.parametrize("url, domain", [
+    ("https://www.baidu.com/s?wd=x", "baidu.com"),
+    ("https://weixin.sogou.com/weixin?query=x", "sogou.com"),
+    ("https://www.iesdouyin.com/share/video/1", "douyin.com"),
+    ("https://sns-webpic-qc.xhscdn.com/a.jpg", "xiaohongshu.com"),
+    ("https://news.sina.com.cn/a.html", "sina.com.cn"),
+    ("open.feishu.cn:443", "feishu.cn"),
+    ("http://127.0.0.1:8000/v.mp4", None),
+    ("http://localhost/x", None),
+    ("http://[::1]:9000/", None),
+])
+def test_domain_of(url, domain):
+    assert domain_of(url) == domain
+
+
+def test_scheduler_shares_one_limiter_per_domain():
+    sched = Scheduler()
+    lim = sched.limiter("https://www.baidu.com/s")
+    assert sched.limiter("https://m.baidu.com/") is lim
+    assert lim.limits.concurrency == 4
+    assert sched.limiter("https://example.org/").limits.concurrency == 16
+    assert sched.limiter("http://127.0.0.1/") is None
+    assert set(sched.snapshot()) == {"baidu.com", "example.org"}
+
+
+def test_token_bucket_paces_after_burst():
+    lim = DomainLimiter("t", Limits(rate=20, burst=2, concurrency=8, max_rate=20))
+
+    async def take(n):
+        start = time.monotonic()
+        for _ in range(n):
+            await lim.acquire()
+            lim.release()
+        return time.monotonic() - start
+
+    # Two from the bucket, then 4 more at 20/s
+    assert 0.15 <= asyncio.run(take(6)) < 0.6
+
+
+def test_concurrency_cap():
+    sched = Scheduler({"default": Limits(rate=1000, burst=1000, concurrency=2, max_rate=1000)})
+    peak = 0
+
+    async def one():
+        nonlocal peak
+        async with sched.slot("https://example.com/"):
+            peak = max(peak, sched.limiter("example.com").active)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(one() for _ in range(8)))
+
+    asyncio.run(main())
+    assert peak == 2
+    snap = sched.snapshot()["example.com"]
+    assert (snap["active"], snap["waiting"], snap["ok"]) == (0, 0, 8)
+
+
+def test_aimd_outcomes():
+    conf = Limits(rate=2, burst=5, concurrency=4, max_rate=2.1, increase=0.05, cooldown=30)
+    sched = Scheduler({"default": conf})
+    lim = sched.limiter("example.com")
+
+    async def slot(report=None, exc=None):
+        async with sched.slot("example.com") as s:
+            if report:
+                report(s)
+            if exc:
+                raise exc
+
+    asyncio.run(slot())
+    asyncio.run(slot())
+    assert lim.rate == pytest.approx(conf.max_rate)
+    asyncio.run(slot(lambda s: s.status(503)))
+    assert lim.rate == pytest.approx(conf.max_rate * ERROR_FACTOR)
+    with pytest.raises(ValueError):
+        asyncio.run(slot(exc=ValueError()))
+    assert lim.errors == 2
+    rate = lim.rate
+    asyncio.run(slot(lambda s: s.status(429)))
+    assert lim.rate == pytest.approx(rate * BLOCK_FACTOR)
+    snap = lim.snapshot()
+    assert (snap["ok"], snap["blocks"], snap["errors"]) == (2, 1, 2)
+    assert snap["paused"] > 25 and lim.tokens == 0
+
+
+def test_cancel_while_waiting_releases_slot():
+    lim = DomainLimiter("t", Limits(rate=1, burst=0, concurrency=1, max_rate=1))
+
+    async def main():
+        task = asyncio.create_task(lim.acquire())
+        await asyncio.sleep(0.05)
+        assert lim.active == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert lim.active == 0
+
+
+def test_woken_waiter_cancelled_passes_slot_on():
+    lim = DomainLimiter("t", Limits(rate=100, burst=10, concurrency=1, max_rate=100))
+
+    async def main():
+        await lim.acquire()
+        a = asyncio.create_task(lim.acquire())
+        b = asyncio.create_task(lim.acquire())
+        await asyncio.sleep(0.01)
+        assert lim.snapshot()["waiting"] == 2
+        lim.release()
+        a.cancel()   # resolved by release() but cancelled before it resumes
+        with pytest.raises(asyncio.CancelledError):
+            await a
+        await asyncio.wait_for(b, 1)
+        assert lim.active == 1 and lim.snapshot()["waiting"] == 0
+        lim.release()
+
+    asyncio.run(main())
+    assert lim.active == 0
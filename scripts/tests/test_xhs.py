@@ -0,0 +1,64 @@
+"""XHS search API parsing against captured notes / users pages."""
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from scraping.xhs import count_value, parse_notes, parse_users
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("text, value", [
+    ("1.2万", 12000), ("3.4w", 34000), ("10w+", 100000), ("2.5千", 2500), ("1k", 1000),
+    ("1,024", 1024), ("987", 987), (56, 56), ("", 0), (None, 0), ("赞", 0),
+])
+def test_count_value(text, value):
+    assert count_value(text) == value
+
+
+def test_parse_notes():
+    notes, more = parse_notes(fixture("xhs-notes.json"))
+    assert more is True
+    # The interleaved hot_query module is skipped
+    assert [n.id for n in notes] == ["6650a1b2000000001e03c4d5", "6650a1b2000000001e03c4d6"]
+
+    video, normal = notes
+    assert video.title == "三分钟学会手冲咖啡"
+    assert (video.author, video.author_id) == ("咖啡小林", "5f1e2d3c000000000101a2b3")
+    assert video.likes == 12000
+    assert video.cover == "https://sns-webpic-qc.xhscdn.com/default/1.jpg"
+    assert video.type == "video"
+    assert video.xsec_token == "ABk3x+Yz="
+    assert video.url == ("https://www.xiaohongshu.com/explore/6650a1b2000000001e03c4d5"
+                         "?xsec_token=ABk3x%2BYz%3D&xsec_source=pc_search")
+
+    # Fallback keys: empty display_title -> title, nick_name, url_pre; no token -> bare URL
+    assert normal.title == "家用磨豆机横评"
+    assert normal.author == "豆子研究所"
+    assert normal.likes == 987
+    assert normal.cover == "https://sns-webpic-qc.xhscdn.com/pre/2.jpg"
+    assert normal.url == "https://www.xiaohongshu.com/explore/6650a1b2000000001e03c4d6"
+
+
+def test_parse_users():
+    users, more = parse_users(fixture("xhs-users.json").decode("utf-8"))
+    assert more is False
+    lin, lab = users
+    assert lin.to_dict() == {
+        "id": "5f1e2d3c000000000101a2b3", "name": "咖啡小林", "red_id": "coffee_lin",
+        "desc": "每天一杯手冲", "fans": 34000, "notes": 256,
+        "avatar": "https://sns-avatar-qc.xhscdn.com/avatar/1.jpg",
+        "url": "https://www.xiaohongshu.com/user/profile/5f1e2d3c000000000101a2b3",
+    }
+    assert (lab.id, lab.name, lab.desc) == ("60aa11bb000000000100ccdd", "豆子研究所", "器具测评")
+    assert (lab.fans, lab.notes) == (100000, 88)
+    assert lab.url == "https://www.xiaohongshu.com/user/profile/60aa11bb000000000100ccdd"
+
+
+def test_parse_empty_payload():
+    assert parse_notes({"code": 0, "data": {}}) == ([], False)
+    assert parse_users({"code": -1, "data": None}) == ([], False)
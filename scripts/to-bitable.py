@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Upsert collector results (the --jsonl events of the search/download scripts) into a Bitable table.
+
+Usage: python3 search-more.py --jsonl | python3 to-bitable.py --table=tblXXX [events.jsonl]
+           [--key=链接] [--types=serp_hit,xhs_note] [--map=标题=title,链接=url] [--batch=500]
+
+Rows are written in batches while the collector is still running, and are
+upserted on a natural key: the link for SERP hits and XHS notes/users, the
+aweme ID for Douyin. Re-running a collection therefore updates rows instead
+of duplicating them. --map replaces the default columns: 字段=event_field,
+where a url field becomes a link cell. The table id may also come from
+BITABLE_TABLE_ID. Credentials: FEISHU_APP_ID / FEISHU_APP_SECRET /
+BITABLE_APP_TOKEN (env or .env).
+"""
+import asyncio
+import json
+import os
+import sys
+from scraping.bitable import BitableClient, FeishuError, MAX_BATCH
+
+def opt(name, default):
+    for a in sys.argv[1:]:
+        if a.startswith(f"--{name}="):
+            return a.split("=", 1)[1]
+    return default
+
+ARGS = [a for a in sys.argv[1:] if not a.startswith("--")]
+SOURCE = ARGS[0] if ARGS else "-"
+TABLE = opt("table", os.environ.get("BITABLE_TABLE_ID", ""))
+KEY = opt("key", "")
+TYPES = set(filter(None, opt("types", "").split(",")))
+MAP = dict(pair.split("=", 1) for pair in opt("map", "").split(",") if "=" in pair)
+BATCH = int(opt("batch", str(MAX_BATCH)))
+
+PLATFORMS = {"baidu": "百度", "sogou": "搜狗", "weixin": "微信", "bing": "必应", "google": "Google"}
+
+def link(url, text=""):
+    return {"link": url, "text": text or url} if url else None
+
+# event type -> (key column, event -> row)
+MAPPINGS = {
+    "serp_hit": ("链接", lambda e: {
+        "标题": e["title"], "链接": link(e["url"], e["title"]), "摘要": e["snippet"],
+        "来源平台": PLATFORMS.get(e["engine"], e["engine"]), "搜索词": e["query"]}),
+    "serp_merged": ("链接", lambda e: {
+        "标题": e["title"], "链接": link(e["url"], e["title"]), "摘要": e["snippet"],
+        "来源平台": "/".join(PLATFORMS.get(x, x) for x in e["engines"]), "搜索词": e["query"]}),
+    "xhs_note": ("链接", lambda e: {
+        "标题": e["title"], "链接": link(e["url"], e["title"]), "作者": e["author"], "点赞": e["likes"],
+        "来源平台": "小红书", "搜索词": e["keyword"]}),
+    "xhs_user": ("链接", lambda e: {
+        "标题": e["name"], "链接": link(e["url"], e["name"]), "摘要": e["desc"], "粉丝": e["fans"],
+        "来源平台": "小红书", "搜索词": e["keyword"]}),
+    "douyin": ("视频ID", lambda e: {
+        "视频ID": e["aweme_id"], "标题": e["desc"], "作者": e["author"], "链接": link(e["url"], e["desc"]),
+        "来源平台": "抖音"}),
+    "download": ("视频ID", lambda e: {
+        "视频ID": e["aweme_id"], "文件": e["path"], "大小(MB)": round(e["bytes"] / 1024 / 1024, 1),
+        "来源平台": "抖音"}),
+}
+
+def to_row(event):
+    if MAP:
+        row = {col: event.get(field) for col, field in MAP.items()}
+        row = {col: link(v) if isinstance(v, str) and v.startswith("http") else v for col, v in row.items()}
+    else:
+        row = MAPPINGS[event["type"]][1](event)
+    row["抓取时间"] = int(event["ts"] * 1000)
+    return {col: v for col, v in row.items() if v not in (None, "")}
+
+async def events():
+    f = sys.stdin if SOURCE == "-" else open(SOURCE, encoding="utf-8")
+    while True:
+        # Blocking read off the loop so batches can be written while the collector runs
+        line = await asyncio.to_thread(f.readline)
+        if not line:
+            return
+        try:
+            yield json.loads(line)
+        except ValueError:
+            print(f"⚠️ 跳过非 JSON 行: {line.strip()[:80]}")
+
+async def run():
+    if not TABLE:
+        print(__doc__)
+        return
+    seen = 0
+    async with BitableClient() as bt:
+        writers = {}
+        try:
+            async for event in events():
+                kind = event.get("type")
+                if kind not in MAPPINGS or (TYPES and kind not in TYPES):
+                    if kind == "error":
+                        print(f"⚠️ 采集错误 [{event.get('stage')}]: {event.get('message')}")
+                    continue
+                key = KEY or MAPPINGS[kind][0]
+                if key not in writers:
+                    writers[key] = bt.writer(TABLE, key, BATCH)
+                await writers[key].add(to_row(event))
+                seen += 1
+            for key, writer in writers.items():
+                stats = await writer.close()
+                print(f"✅ 按「{key}」写入: 新增 {stats['created']}, 更新 {stats['updated']}, "
+                      f"合并重复 {stats['merged']} ({stats['flushes']} 批)")
+        except FeishuError as e:
+            print(f"❌ 写入失败: {e}")
+            sys.exit(1)
+    print(f"📦 {seen} 条结果 -> {TABLE}")
+
+asyncio.run(run())
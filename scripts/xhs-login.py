@@ -3,26 +3,23 @@
 import asyncio
 import sys
 import json
-from playwright.async_api import async_playwright
+import time
+from scraping import BrowserPool
+from scraping.artifacts import get_artifacts
+from scraping.ready import goto_ready
+from scraping.session import save_qrcode
 
 COOKIE_PATH = "/root/.openclaw/workspace/data/xhs-cookies.json"
 
 async def run():
     action = sys.argv[1] if len(sys.argv) > 1 else "qrcode"
     
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1280, "height": 800},
-            locale="zh-CN"
-        )
-        page = await ctx.new_page()
+    async with BrowserPool(block=False) as pool:
+        page = await pool.acquire("xhs")
 
         if action == "qrcode":
             # Go to XHS and trigger login
-            await page.goto("https://www.xiaohongshu.com", wait_until="domcontentloaded", timeout=30000)
-            await asyncio.sleep(3)
+            await goto_ready(page, "https://www.xiaohongshu.com", "xhs", timeout=30000, detect_blocks=False)
             
             # Click login button if exists
             try:
@@ -33,8 +30,8 @@ async def run():
             except:
                 pass
             
-            # Screenshot the QR code
-            await page.screenshot(path="/tmp/xhs-qrcode.png", full_page=False)
+            # Screenshot just the QR code
+            qr_src = await save_qrcode(page, "xhs", "/tmp/xhs-qrcode.png")
             print("QR code screenshot saved to /tmp/xhs-qrcode.png")
             print("Waiting for scan... (will check every 3 seconds for 120 seconds)")
             
@@ -43,7 +40,7 @@ async def run():
                 await asyncio.sleep(3)
                 # Check if logged in by looking for user-specific elements
                 url = page.url
-                cookies = await ctx.cookies()
+                cookies = await page.context.cookies()
                 logged_in = any(c['name'] == 'web_session' for c in cookies)
                 
                 if logged_in:
@@ -54,19 +51,18 @@ async def run():
                     with open(COOKIE_PATH, 'w') as f:
                         json.dump(cookies, f, ensure_ascii=False, indent=2)
                     print(f"Cookies saved to {COOKIE_PATH}")
-                    
-                    # Take a screenshot to confirm
-                    await page.screenshot(path="/tmp/xhs-loggedin.png", full_page=False)
-                    print("Logged-in screenshot saved to /tmp/xhs-loggedin.png")
+                    # Search scripts pick the login up from the vault
+                    session = await pool.vault.capture("xhs", page.context)
+                    print(f"Session stored in vault (expires {time.strftime('%Y-%m-%d %H:%M', time.localtime(session.expires_at))})")
                     break
                 
-                if i % 5 == 0:
-                    # Refresh QR if needed
-                    await page.screenshot(path="/tmp/xhs-qrcode.png", full_page=False)
+                # Re-shot only when the QR code has rotated
+                src = await save_qrcode(page, "xhs", "/tmp/xhs-qrcode.png", qr_src)
+                if src != qr_src:
+                    qr_src = src
                     print(f"  [{i*3}s] Still waiting... QR refreshed.")
             else:
                 print("\n⏰ Timeout. QR code expired.")
-
-        await browser.close()
+                await get_artifacts().capture(page, "login-timeout", site="xhs")
 
 asyncio.run(run())